@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compares query latency of a default SQLAlchemy engine with the server's
+read-optimized engine profile on a scaled synthetic ERP database.
+
+    python benchmarks/bench_engine_profile.py --customers 50000 --orders 500000
+"""
+
+import argparse
+import json
+import pathlib
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from sql_mcp.engine import create_read_engine, engine_profile_from_env
+
+QUERIES = {
+    "revenue_by_customer": """
+        SELECT c.CustomerID, c.CompanyName, SUM(o.TotalAmount) AS Revenue
+        FROM Customers c JOIN Orders o ON o.CustomerID = c.CustomerID
+        GROUP BY c.CustomerID ORDER BY Revenue DESC LIMIT 20
+    """,
+    "top_products": """
+        SELECT ProductID, SUM(Qty * UnitPrice) AS Sales
+        FROM OrderLines GROUP BY ProductID ORDER BY Sales DESC LIMIT 10
+    """,
+    "recent_orders": """
+        SELECT * FROM Orders WHERE OrderDate >= '2025-01-01'
+        ORDER BY OrderDate DESC LIMIT 100
+    """,
+    "customer_lookup": "SELECT * FROM Customers WHERE CustomerID = 'CU000042'",
+    "company_like": """
+        SELECT CustomerID, CompanyName FROM Customers
+        WHERE CompanyName LIKE '%科技%' LIMIT 50
+    """,
+}
+
+
+def build_database(
+    db_path: pathlib.Path, customers: int, orders: int, lines_per_order: int
+):
+    """Writes a synthetic Customers/Orders/OrderLines database with skewed order ownership."""
+    rng = random.Random(42)
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        PRAGMA journal_mode = OFF;
+        PRAGMA synchronous = OFF;
+        CREATE TABLE Customers (CustomerID TEXT PRIMARY KEY, CompanyName TEXT,
+            City TEXT, Phone TEXT);
+        CREATE TABLE Orders (OrderID TEXT PRIMARY KEY, CustomerID TEXT,
+            OrderDate TEXT, Status TEXT, TotalAmount REAL);
+        CREATE TABLE OrderLines (LineID INTEGER PRIMARY KEY, OrderID TEXT,
+            ProductID TEXT, Qty INTEGER, UnitPrice REAL);
+        """)
+    words = ["台灣", "科技", "電子", "精密", "工業", "能源", "光電", "貿易"]
+    conn.executemany(
+        "INSERT INTO Customers VALUES (?, ?, ?, ?)",
+        (
+            (
+                f"CU{i:06d}",
+                "".join(rng.sample(words, 2)) + "股份有限公司",
+                rng.choice(["台北市", "新竹市", "台中市", "高雄市"]),
+                f"0{rng.randint(2, 8)}-{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+            )
+            for i in range(customers)
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO Orders VALUES (?, ?, ?, ?, ?)",
+        (
+            (
+                f"SO{i:08d}",
+                f"CU{int(customers * rng.random() ** 3):06d}",
+                f"202{rng.randint(3, 5)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                rng.choice(["Open", "Shipped", "Closed"]),
+                round(rng.uniform(1_000, 500_000), 2),
+            )
+            for i in range(orders)
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO OrderLines (OrderID, ProductID, Qty, UnitPrice) VALUES (?, ?, ?, ?)",
+        (
+            (
+                f"SO{i // lines_per_order:08d}",
+                f"P{rng.randint(1, 500):04d}",
+                rng.randint(1, 50),
+                round(rng.uniform(100, 20_000), 2),
+            )
+            for i in range(orders * lines_per_order)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def time_queries(engine, repeat: int) -> Dict[str, List[float]]:
+    timings: Dict[str, List[float]] = {name: [] for name in QUERIES}
+    statements = {name: text(sql) for name, sql in QUERIES.items()}
+    with engine.connect() as conn:
+        for name, statement in statements.items():
+            conn.execute(statement).fetchall()  # warm-up
+    for _ in range(repeat):
+        for name, statement in statements.items():
+            start = time.perf_counter()
+            with engine.connect() as conn:
+                conn.execute(statement).fetchall()
+            timings[name].append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--customers", type=int, default=50_000)
+    parser.add_argument("--orders", type=int, default=500_000)
+    parser.add_argument("--lines-per-order", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--db", type=pathlib.Path, help="Reuse an existing database.")
+    parser.add_argument("--json", type=pathlib.Path, help="Also write results here.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = args.db
+        if db_path is None:
+            db_path = pathlib.Path(temp_dir) / "bench.db"
+            start = time.perf_counter()
+            build_database(db_path, args.customers, args.orders, args.lines_per_order)
+            print(
+                f"Built {db_path.stat().st_size / 2**20:.1f} MiB database "
+                f"in {time.perf_counter() - start:.1f}s"
+            )
+
+        engines = {
+            "default": create_engine(f"sqlite:///{db_path}"),
+            "read-optimized": create_read_engine(db_path, engine_profile_from_env()),
+        }
+        results = {}
+        for label, engine in engines.items():
+            results[label] = time_queries(engine, args.repeat)
+            engine.dispose()
+
+    print(
+        f"\n{'query':<22}{'default p50':>14}{'tuned p50':>12}{'tuned p95':>12}{'speedup':>10}"
+    )
+    summary = {}
+    for name in QUERIES:
+        base = statistics.median(results["default"][name])
+        tuned = statistics.median(results["read-optimized"][name])
+        tuned_p95 = statistics.quantiles(results["read-optimized"][name], n=20)[-1]
+        summary[name] = {"default_p50_ms": base, "tuned_p50_ms": tuned}
+        print(
+            f"{name:<22}{base:>12.2f}ms{tuned:>10.2f}ms{tuned_p95:>10.2f}ms"
+            f"{base / tuned:>9.2f}x"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
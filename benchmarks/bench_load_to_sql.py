@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compares the default load_to_sql path with --fast (and --fast --workers N) on
+a synthetic order_lines.jsonl.
+
+    python benchmarks/bench_load_to_sql.py --rows 2000000 --workers 4
+"""
+
+import argparse
+import json
+import pathlib
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Dict
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "scripts"))
+
+import load_to_sql
+
+SCHEMA = {
+    "tables": {
+        "OrderLines": {
+            "columns": {
+                "LineID": {"type": "INTEGER", "pk": True},
+                "OrderID": {"type": "TEXT"},
+                "ProductID": {"type": "TEXT"},
+                "Qty": {"type": "INTEGER"},
+                "UnitPrice": {"type": "REAL"},
+                "Comments": {"type": "TEXT"},
+            },
+            "indexes": [["OrderID"], ["ProductID"]],
+        }
+    }
+}
+
+
+def write_order_lines(path: pathlib.Path, rows: int):
+    rng = random.Random(42)
+    with path.open("w", encoding="utf-8") as f:
+        for i in range(rows):
+            row = {
+                "LineID": i + 1,
+                "OrderID": f"O2025-{i // 4:07d}",
+                "ProductID": f"P-{rng.randint(1, 500):04d}",
+                "Qty": rng.randint(1, 50),
+                "UnitPrice": round(rng.uniform(100, 20_000), 2),
+                "Comments": rng.choice(["", "急件", "分批出貨", "含安裝"]),
+            }
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def run(
+    data_file: pathlib.Path, db_path: pathlib.Path, fast: bool, workers: int = 1
+) -> Dict[str, float]:
+    """Loads `data_file` and builds its indexes in a fresh database, as main() does."""
+    if db_path.exists():
+        db_path.unlink()
+    conn = sqlite3.connect(db_path)
+    start = time.perf_counter()
+    if fast:
+        load_to_sql.apply_fast_pragmas(conn)
+    load_to_sql.create_tables_from_yaml(SCHEMA, conn)
+    if workers > 1:
+        stats = load_to_sql.load_parallel(
+            [("OrderLines", data_file)], conn, workers, fast=fast
+        )
+    else:
+        stats = load_to_sql.load_jsonl(
+            "OrderLines", data_file, conn, fast=fast, commit=not fast
+        )
+    if fast:
+        load_to_sql.end_fast_load(conn)
+    load_to_sql.create_indexes_from_yaml(SCHEMA, conn)
+    conn.close()
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Also time --fast with this many parser processes.",
+    )
+    parser.add_argument("--json", type=pathlib.Path, help="Also write results here.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = pathlib.Path(temp_dir)
+        data_file = temp_path / "order_lines.jsonl"
+        write_order_lines(data_file, args.rows)
+        db_path = temp_path / "bench.db"
+
+        results = {"default": run(data_file, db_path, fast=False)}
+        parser_loads = load_to_sql._json_loads
+        if parser_loads is not json.loads:
+            # Separate the pragma/batching gain from the parser gain.
+            load_to_sql._json_loads = json.loads
+            results["fast (json)"] = run(data_file, db_path, fast=True)
+            load_to_sql._json_loads = parser_loads
+            results["fast (orjson)"] = run(data_file, db_path, fast=True)
+        else:
+            results["fast (json)"] = run(data_file, db_path, fast=True)
+        if args.workers > 1:
+            results[f"fast x{args.workers}"] = run(
+                data_file, db_path, fast=True, workers=args.workers
+            )
+
+    base = results["default"]["seconds"]
+    print(f"\n{'mode':<16}{'seconds':>10}{'rows/s':>12}{'MB/s':>8}{'speedup':>10}")
+    for label, stats in results.items():
+        print(
+            f"{label:<16}{stats['seconds']:>10.2f}"
+            f"{stats['rows'] / stats['seconds']:>12,.0f}"
+            f"{stats['bytes'] / 2**20 / stats['seconds']:>8.1f}"
+            f"{base / stats['seconds']:>9.2f}x"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
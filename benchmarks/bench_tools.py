@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measures every sql_mcp tool on databases built by make_samples.py --scale:
+p50/p95/p99 latency, rows returned, serialized bytes and peak Python memory.
+
+    python benchmarks/bench_tools.py --scales 0.1,1,10 --json baseline.json
+    python benchmarks/bench_tools.py --scales 0.1,1,10 --baseline baseline.json
+
+--workload replays a captured workload (the query_workload tool's as_workload
+output, SQL_MCP_WORKLOAD_FILE or a slow-log export) as extra execute_query cases.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import pathlib
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+project_root = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "scripts"))
+
+import load_to_sql
+import make_samples
+from sql_mcp import server
+from sql_mcp.advisor import load_workload
+from sql_mcp.cache import ResultCache
+from sql_mcp.catalog import SchemaCatalog
+from sql_mcp.engine import create_read_engine
+
+# Fixed execute_query corpus: (SQL, bind parameters).
+QUERIES: Dict[str, Tuple[str, Dict[str, Any]]] = {
+    "revenue_by_customer": (
+        """
+        SELECT c.CustomerID, c.CompanyName, SUM(o.TotalAmount) AS Revenue
+        FROM Customers c JOIN Orders o ON o.CustomerID = c.CustomerID
+        GROUP BY c.CustomerID ORDER BY Revenue DESC LIMIT 20
+        """,
+        {},
+    ),
+    "top_products": (
+        """
+        SELECT p.ProductID, p.ProductName, SUM(l.Qty * l.UnitPrice) AS Sales
+        FROM OrderLines l JOIN Products p ON p.ProductID = l.ProductID
+        GROUP BY p.ProductID ORDER BY Sales DESC LIMIT 10
+        """,
+        {},
+    ),
+    "monthly_sales": (
+        """
+        SELECT substr(OrderDate, 1, 7) AS Month, COUNT(*) AS Orders,
+               SUM(TotalAmount) AS Revenue
+        FROM Orders WHERE OrderDate >= :since GROUP BY Month ORDER BY Month
+        """,
+        {"since": "2024-01-01"},
+    ),
+    "customer_orders": (
+        """
+        SELECT OrderID, OrderDate, Status, TotalAmount FROM Orders
+        WHERE CustomerID = :customer_id ORDER BY OrderDate DESC
+        """,
+        {"customer_id": "CU002"},
+    ),
+    "recent_orders_page": (
+        "SELECT * FROM Orders WHERE OrderDate >= :since ORDER BY OrderDate DESC",
+        {"since": "2025-01-01"},
+    ),
+    "vip_pipeline": (
+        """
+        SELECT c.CompanyName, o.Name, o.Stage, o.Amount, o.Probability
+        FROM Opportunities o JOIN Customers c ON c.CustomerID = o.CustomerID
+        WHERE c.VIPFlag = 'Y' ORDER BY o.Amount DESC
+        """,
+        {},
+    ),
+    "low_stock": (
+        """
+        SELECT p.ProductID, p.ProductName, i.CurrentStock, i.SafetyStock
+        FROM Inventory i JOIN Products p ON p.ProductID = i.ProductID
+        WHERE i.CurrentStock < i.SafetyStock
+        """,
+        {},
+    ),
+}
+# execute_query options per corpus entry (the default is one unpaginated call).
+QUERY_OPTIONS = {"recent_orders_page": {"page_size": 100}}
+SEARCH_TERMS = ("台灣", "精密", "股份有限公司", "俊凱", "07-")
+CUSTOMER_SAMPLE = 20
+
+
+def build_database(work_dir: pathlib.Path, scale: float, seed: int) -> pathlib.Path:
+    """Generates data at `scale` and loads it with load_to_sql --fast."""
+    data_dir = work_dir / f"data-{scale:g}"
+    db_path = work_dir / f"erp-{scale:g}.db"
+    with contextlib.redirect_stdout(io.StringIO()):
+        make_samples.main(
+            ["--scale", str(scale), "--seed", str(seed), "--out", str(data_dir)]
+        )
+        load_to_sql.SCHEMA_FILE = str(data_dir / "schema.yaml")
+        load_to_sql.DATA_DIR = data_dir
+        load_to_sql.main(["--fast", "--db", str(db_path)])
+    return db_path
+
+
+def point_server_at(db_path: pathlib.Path, schema_path: pathlib.Path, cache: bool):
+    """Swaps the server module's engine, catalog and result cache, as the tests do."""
+    server.engine.dispose()
+    server.engine = create_read_engine(db_path, server.ENGINE_PROFILE)
+    server.catalog = SchemaCatalog(schema_path)
+    server.result_cache = ResultCache(server.RESULT_CACHE_BYTES if cache else 0)
+
+
+def sample_customer_ids(db_path: pathlib.Path) -> List[str]:
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT CustomerID FROM Customers WHERE Status = 'Active' "
+            "ORDER BY CustomerID"
+        ).fetchall()
+    finally:
+        conn.close()
+    step = max(1, len(rows) // CUSTOMER_SAMPLE)
+    return [row[0] for row in rows[::step][:CUSTOMER_SAMPLE]]
+
+
+def cases(
+    customer_ids: List[str], workload: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Callable[[int], Any]]:
+    """Benchmark name → callable taking the iteration number."""
+    result: Dict[str, Callable[[int], Any]] = {
+        "inspect_database": lambda i: server._inspect_database()
+    }
+    for name, (sql, params) in QUERIES.items():
+        options = QUERY_OPTIONS.get(name, {})
+        result[f"execute_query:{name}"] = (
+            lambda i, sql=sql, params=params, options=options: server._execute_query(
+                sql, params=params, **options
+            )
+        )
+    for term in SEARCH_TERMS:
+        result[f"search_customers:{term}"] = (
+            lambda i, term=term: server._search_customers(term)
+        )
+    result["get_customer_info"] = lambda i: server._get_customer_info(
+        customer_ids[i % len(customer_ids)]
+    )
+    for number, item in enumerate(workload or [], 1):
+        result[f"workload:{number} (x{item['count']})"] = (
+            lambda i, item=item: server._execute_query(
+                item["query"], params=item["params"] or None
+            )
+        )
+    return result
+
+
+def count_rows(result: Any) -> Tuple[int, Optional[str]]:
+    """Returns (rows, error message) for any tool result shape."""
+    if isinstance(result, dict):
+        if "error" in result:
+            return 0, result["error"]
+        if "row_count" in result:
+            return result["row_count"], None
+        return 1, None
+    errors = [r["error"] for r in result if isinstance(r, dict) and "error" in r]
+    rows = [r for r in result if not (isinstance(r, dict) and "warning" in r)]
+    return (0, errors[0]) if errors else (len(rows), None)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def measure(func: Callable[[int], Any], repeat: int) -> Dict[str, Any]:
+    result = func(0)  # warm-up: catalog, statement and page caches
+    rows, error = count_rows(result)
+    payload = len(json.dumps(result, ensure_ascii=False, default=str).encode("utf-8"))
+
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(i)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+
+    # tracemalloc slows allocation-heavy code, so memory is measured in a
+    # separate call instead of during the timed runs.
+    tracemalloc.start()
+    try:
+        func(0)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "rows": rows,
+        "bytes": payload,
+        "peak_kib": round(peak / 1024, 1),
+        "error": error,
+    }
+
+
+def print_report(
+    results: Dict[str, Dict[str, Dict[str, Any]]],
+    baseline: Optional[Dict[str, Any]] = None,
+):
+    for scale, scale_results in results.items():
+        print(f"\nscale {scale}")
+        header = f"{'tool':<40}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'rows':>7}{'bytes':>10}{'peak KiB':>10}"
+        if baseline:
+            header += f"{'p50 vs base':>13}"
+        print(header)
+        for name, stats in scale_results.items():
+            line = (
+                f"{name:<40}{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}"
+                f"{stats['p99_ms']:>9.2f}{stats['rows']:>7}{stats['bytes']:>10}"
+                f"{stats['peak_kib']:>10.1f}"
+            )
+            base = (baseline or {}).get(scale, {}).get(name)
+            if base and base["p50_ms"]:
+                line += f"{(stats['p50_ms'] / base['p50_ms'] - 1) * 100:>+12.0f}%"
+            if stats["error"]:
+                line += f"  ! {stats['error']}"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--scales",
+        default="0.1,1",
+        help="Comma-separated make_samples.py --scale values (default: 0.1,1).",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Keep the execute_query result cache on (default: off, every call hits SQLite).",
+    )
+    parser.add_argument(
+        "--workload",
+        type=pathlib.Path,
+        help="Also replay the statements of this JSONL workload file.",
+    )
+    parser.add_argument("--json", type=pathlib.Path, help="Write the results here.")
+    parser.add_argument(
+        "--baseline", type=pathlib.Path, help="Compare p50 with an earlier --json file."
+    )
+    args = parser.parse_args()
+    scales = [float(s) for s in args.scales.split(",")]
+    workload = load_workload(args.workload) if args.workload else []
+    baseline = None
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"]
+
+    results: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = pathlib.Path(temp_dir)
+        for scale in scales:
+            start = time.perf_counter()
+            db_path = build_database(work_dir, scale, args.seed)
+            print(
+                f"Built scale {scale:g}: {db_path.stat().st_size / 2**20:.1f} MiB "
+                f"in {time.perf_counter() - start:.1f}s"
+            )
+            point_server_at(
+                db_path, work_dir / f"data-{scale:g}" / "schema.yaml", args.cache
+            )
+            customer_ids = sample_customer_ids(db_path)
+            results[f"{scale:g}"] = {
+                name: measure(func, args.repeat)
+                for name, func in cases(customer_ids, workload).items()
+            }
+            server.engine.dispose()
+
+    print_report(results, baseline)
+    if args.json:
+        report = {
+            "meta": {
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+                "seed": args.seed,
+                "repeat": args.repeat,
+                "result_cache": args.cache,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            },
+            "results": results,
+        }
+        args.json.write_text(
+            json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8"
+        )
+
+
+if __name__ == "__main__":
+    main()
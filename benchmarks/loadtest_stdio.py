@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Load-tests `python -m sql_mcp.server` over stdio, the way crm_agent starts it,
+with a mixed workload of schema inspection, customer lookups and analytic
+SELECTs.
+
+    # open loop: Poisson arrivals at 50 req/s, at most 16 in flight
+    python benchmarks/loadtest_stdio.py --rate 50 --concurrency 16 --duration 30
+    # closed loop: 8 clients sending back to back
+    python benchmarks/loadtest_stdio.py --concurrency 8 --requests 2000
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import pathlib
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from mcp import ClientSession
+from mcp.client.stdio import StdioServerParameters, stdio_client
+
+project_root = pathlib.Path(__file__).resolve().parent.parent
+
+# Default mix: tool → weight.
+MIX = {
+    "inspect_database": 1,
+    "get_customer_info": 4,
+    "search_customers": 3,
+    "execute_query": 2,
+}
+SEARCH_TERMS = ("台灣", "精密", "股份有限公司", "俊凱", "07-", "Acme")
+ANALYTIC_QUERIES: List[Tuple[str, Dict[str, Any]]] = [
+    (
+        "SELECT c.CustomerID, c.CompanyName, SUM(o.TotalAmount) AS Revenue "
+        "FROM Customers c JOIN Orders o ON o.CustomerID = c.CustomerID "
+        "GROUP BY c.CustomerID ORDER BY Revenue DESC LIMIT 20",
+        {},
+    ),
+    (
+        "SELECT ProductID, SUM(Qty * UnitPrice) AS Sales FROM OrderLines "
+        "GROUP BY ProductID ORDER BY Sales DESC LIMIT 10",
+        {},
+    ),
+    (
+        "SELECT substr(OrderDate, 1, 7) AS Month, SUM(TotalAmount) AS Revenue "
+        "FROM Orders WHERE OrderDate >= :since GROUP BY Month ORDER BY Month",
+        {"since": "2024-01-01"},
+    ),
+    (
+        "SELECT OrderID, OrderDate, TotalAmount FROM Orders "
+        "WHERE CustomerID = :customer_id ORDER BY OrderDate DESC",
+        {"customer_id": "CU002"},
+    ),
+]
+
+
+def parse_mix(spec: Optional[str]) -> Dict[str, float]:
+    """Parses 'tool=weight,...'; unknown tools are rejected."""
+    if not spec:
+        return dict(MIX)
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        if name not in MIX:
+            raise SystemExit(f"Unknown tool in --mix: {name}. Use: {', '.join(MIX)}.")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def make_request(
+    rng: random.Random, mix: Dict[str, float], customer_ids: List[str]
+) -> Tuple[str, Dict[str, Any]]:
+    tool = rng.choices(list(mix), weights=list(mix.values()))[0]
+    if tool == "get_customer_info":
+        return tool, {"customer_id": rng.choice(customer_ids)}
+    if tool == "search_customers":
+        return tool, {"search_term": rng.choice(SEARCH_TERMS)}
+    if tool == "execute_query":
+        query, params = rng.choice(ANALYTIC_QUERIES)
+        return tool, {"query": query, "params": params}
+    return tool, {}
+
+
+def classify(result: Any) -> Optional[str]:
+    """Returns None for a successful call, otherwise an error category."""
+    if result.is_error:
+        return "tool_error"
+    text = result.content[0].text if result.content else ""
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        return "bad_payload"
+    if isinstance(payload, dict) and "error" in payload:
+        return "error_payload"
+    if isinstance(payload, list) and any(
+        isinstance(item, dict) and "error" in item for item in payload
+    ):
+        return "error_payload"
+    return None
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Recorder:
+    """Collects per-tool latencies (from scheduled arrival) and outcomes."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[Tuple[float, float]]] = {}
+        self.errors: Dict[str, Dict[str, int]] = {}
+
+    def add(
+        self, tool: str, latency_ms: float, service_ms: float, error: Optional[str]
+    ):
+        self.samples.setdefault(tool, []).append((latency_ms, service_ms))
+        if error:
+            by_kind = self.errors.setdefault(tool, {})
+            by_kind[error] = by_kind.get(error, 0) + 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        report: Dict[str, Any] = {}
+        everything: List[Tuple[float, float]] = []
+        for tool in sorted(self.samples):
+            everything += self.samples[tool]
+            report[tool] = self._stats(
+                self.samples[tool], self.errors.get(tool, {}), elapsed
+            )
+        all_errors: Dict[str, int] = {}
+        for by_kind in self.errors.values():
+            for kind, count in by_kind.items():
+                all_errors[kind] = all_errors.get(kind, 0) + count
+        report["all"] = self._stats(everything, all_errors, elapsed)
+        return report
+
+    @staticmethod
+    def _stats(
+        samples: List[Tuple[float, float]], errors: Dict[str, int], elapsed: float
+    ) -> Dict[str, Any]:
+        latency = sorted(s[0] for s in samples)
+        service = sorted(s[1] for s in samples)
+        failed = sum(errors.values())
+        return {
+            "requests": len(samples),
+            "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(failed / len(samples), 4) if samples else 0.0,
+            "errors": errors,
+            "p50_ms": round(percentile(latency, 50), 2),
+            "p95_ms": round(percentile(latency, 95), 2),
+            "p99_ms": round(percentile(latency, 99), 2),
+            "max_ms": round(latency[-1], 2) if latency else 0.0,
+            "service_p50_ms": round(percentile(service, 50), 2),
+            "service_p99_ms": round(percentile(service, 99), 2),
+        }
+
+
+async def call(
+    session: ClientSession,
+    semaphore: asyncio.Semaphore,
+    recorder: Recorder,
+    tool: str,
+    arguments: Dict[str, Any],
+    scheduled: float,
+    timeout: float,
+):
+    """Sends one request once a concurrency slot is free and records the outcome."""
+    async with semaphore:
+        sent = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(session.call_tool(tool, arguments), timeout)
+            error = classify(result)
+        except asyncio.TimeoutError:
+            error = "timeout"
+        except Exception:
+            error = "exception"
+        done = time.perf_counter()
+    # Latency counts from the scheduled arrival, so time spent waiting for a
+    # slot is included (no coordinated omission); service time starts at send.
+    recorder.add(tool, (done - scheduled) * 1000, (done - sent) * 1000, error)
+
+
+async def open_loop(session, args, rng, mix, customer_ids, recorder) -> float:
+    """Poisson arrivals at --rate req/s, at most --concurrency in flight."""
+    semaphore = asyncio.Semaphore(args.concurrency)
+    tasks = []
+    start = time.perf_counter()
+    scheduled = start
+    sent = 0
+    while True:
+        scheduled += rng.expovariate(args.rate)
+        if args.requests and sent >= args.requests:
+            break
+        if not args.requests and scheduled - start >= args.duration:
+            break
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        tool, arguments = make_request(rng, mix, customer_ids)
+        tasks.append(
+            asyncio.create_task(
+                call(
+                    session,
+                    semaphore,
+                    recorder,
+                    tool,
+                    arguments,
+                    scheduled,
+                    args.timeout,
+                )
+            )
+        )
+        sent += 1
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - start
+
+
+async def closed_loop(session, args, rng, mix, customer_ids, recorder) -> float:
+    """--concurrency clients, each sending its next request as soon as one returns."""
+    semaphore = asyncio.Semaphore(args.concurrency)
+    start = time.perf_counter()
+    remaining = [args.requests]
+
+    async def client():
+        while True:
+            if args.requests:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            elif time.perf_counter() - start >= args.duration:
+                return
+            tool, arguments = make_request(rng, mix, customer_ids)
+            await call(
+                session,
+                semaphore,
+                recorder,
+                tool,
+                arguments,
+                time.perf_counter(),
+                args.timeout,
+            )
+
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    return time.perf_counter() - start
+
+
+async def fetch_customer_ids(session: ClientSession) -> List[str]:
+    result = await session.call_tool(
+        "execute_query",
+        {"query": "SELECT CustomerID FROM Customers ORDER BY CustomerID LIMIT 500"},
+    )
+    rows = json.loads(result.content[0].text)
+    ids = [row["CustomerID"] for row in rows if "CustomerID" in row]
+    if not ids:
+        raise SystemExit(f"Could not read customer IDs from the server: {rows}")
+    return ids
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    env = dict(os.environ)
+    if args.db:
+        env["SQL_MCP_DB_PATH"] = str(args.db.resolve())
+    if args.schema:
+        env["SQL_MCP_SCHEMA_PATH"] = str(args.schema.resolve())
+    params = StdioServerParameters(
+        command=sys.executable,
+        args=["-m", "sql_mcp.server"],
+        cwd=str(project_root),
+        env=env,
+    )
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    with open(args.server_log or os.devnull, "w", encoding="utf-8") as errlog:
+        async with stdio_client(params, errlog=errlog) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                customer_ids = await fetch_customer_ids(session)
+                warmup = Recorder()
+                for _ in range(args.warmup):
+                    tool, arguments = make_request(rng, mix, customer_ids)
+                    await call(
+                        session,
+                        asyncio.Semaphore(1),
+                        warmup,
+                        tool,
+                        arguments,
+                        time.perf_counter(),
+                        args.timeout,
+                    )
+                recorder = Recorder()
+                loop = open_loop if args.rate > 0 else closed_loop
+                elapsed = await loop(session, args, rng, mix, customer_ids, recorder)
+    return {
+        "config": {
+            "mode": "open" if args.rate > 0 else "closed",
+            "rate": args.rate,
+            "concurrency": args.concurrency,
+            "duration_s": round(elapsed, 2),
+            "mix": mix,
+            "seed": args.seed,
+        },
+        "results": recorder.summary(elapsed),
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    config = report["config"]
+    print(
+        f"{config['mode']} loop, concurrency {config['concurrency']}"
+        + (f", {config['rate']:g} req/s offered" if config["rate"] else "")
+        + f", {config['duration_s']}s"
+    )
+    print(
+        f"{'tool':<20}{'reqs':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+        f"{'p99 ms':>9}{'max ms':>9}{'errors':>8}"
+    )
+    for tool, stats in report["results"].items():
+        print(
+            f"{tool:<20}{stats['requests']:>7}{stats['throughput_rps']:>9.1f}"
+            f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}"
+            f"{stats['max_ms']:>9.1f}{stats['error_rate']:>7.1%}"
+            + (f"  {stats['errors']}" if stats["errors"] else "")
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n")[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split("\n\n", 1)[1],
+    )
+    parser.add_argument(
+        "--db", type=pathlib.Path, help="Database to serve (sets SQL_MCP_DB_PATH)."
+    )
+    parser.add_argument(
+        "--schema",
+        type=pathlib.Path,
+        help="schema.yaml to serve (sets SQL_MCP_SCHEMA_PATH).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Maximum requests in flight (default: 8).",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="Offered load in requests/s with Poisson arrivals; 0 (default) runs a closed loop.",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=30, help="Seconds to run (default: 30)."
+    )
+    parser.add_argument(
+        "--requests", type=int, default=0, help="Stop after this many requests instead."
+    )
+    parser.add_argument(
+        "--mix",
+        help="Tool weights, e.g. 'get_customer_info=4,execute_query=1' "
+        f"(default: {','.join(f'{k}={v}' for k, v in MIX.items())}).",
+    )
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument(
+        "--timeout", type=float, default=30, help="Per-request timeout in seconds."
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--server-log", type=pathlib.Path, help="Write the server's stderr here."
+    )
+    parser.add_argument("--json", type=pathlib.Path, help="Also write the report here.")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
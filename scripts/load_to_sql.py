@@ -14,18 +14,132 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import argparse
+import contextlib
+import datetime
+import gzip
+import hashlib
+import io
 import json
+import multiprocessing
 import os
 import pathlib
+import re
 import sqlite3
-from typing import Any, Dict, List
+import sys
+import time
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import yaml
 
+try:
+    # 可選：orjson 解析 JSON 約比標準庫快 2–3 倍
+    import orjson
+
+    _json_loads: Callable[[bytes], Any] = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    # 可選：讀 .jsonl.zst 需要 zstandard
+    import zstandard
+except ImportError:
+    zstandard = None
+
 DB_PATH = "erp_demo.db"
 SCHEMA_FILE = "data/schema.yaml"
 DATA_DIR = pathlib.Path("data")
 BATCH_SIZE = 1000  # 幾筆一批 executemany，可依機器記憶體調整
+# 全文檢索 (FTS5 trigram) 影子索引：表名 → 可搜尋欄位
+FTS_INDEXES = {"Customers": ("CompanyName", "ContactName", "Phone")}
+FTS_SUFFIX = "_fts"
+# 來源檔：.jsonl，或邊讀邊解壓的 .jsonl.gz / .jsonl.zst；"-" 代表 stdin
+JSONL_PATTERNS = ("*.jsonl", "*.jsonl.gz", "*.jsonl.zst")
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+STDIN = "-"
+# make_samples.py --shards 的分片檔：orders.00.jsonl、orders.01.jsonl …
+_SHARD_SUFFIX_RE = re.compile(r"\.\d+$")
+# --incremental：每個來源檔的 sha256 / 大小 / 筆數記在這張表，沒變的表直接略過
+MANIFEST_TABLE = "_load_manifest"
+STAGE_PREFIX = "_stage_"
+
+# --fast：整批只開一個交易，關掉 journal 與 fsync。中途失敗只會丟掉暫存檔，
+# 現行 DB 不受影響（main() 建好才換上）。
+FAST_PRAGMAS = (
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA locking_mode = EXCLUSIVE",
+    # 64 MiB：TEXT 主鍵亂序寫入時 B-tree 頁面留在記憶體
+    "PRAGMA cache_size = -65536",
+)
+# 建索引前把 cache 調回預設：排序器依 cache_size 決定記憶體中的 run 大小，
+# 256 MiB cache 或 temp_store=MEMORY 反而讓建索引變慢（見 benchmarks/bench_load_to_sql.py）
+DEFAULT_CACHE_PRAGMA = "PRAGMA cache_size = -2000"
+# --fast 依每列平均大小調整 batch：每批約 FAST_BATCH_BYTES 的 JSON
+FAST_BATCH_BYTES = 4 * 1024 * 1024
+FAST_BATCH_ROWS = (1_000, 200_000)
+# --workers：大檔切成約這麼大的區段（對齊換行）分給不同 worker 解析
+PARALLEL_CHUNK_BYTES = 32 * 1024 * 1024
+# 每個 worker 最多幾批在佇列中等待寫入，用來限制記憶體
+PARALLEL_QUEUE_BATCHES = 2
+
+
+# ---------------------------------------------------------------------------
+def _column_list(columns: Union[str, List[str]]) -> List[str]:
+    return [columns] if isinstance(columns, str) else list(columns)
+
+
+def _quoted(columns: List[str]) -> str:
+    return ",".join(f'"{col}"' for col in columns)
+
+
+def _references_sql(ref: Union[str, Dict[str, Any]]) -> str:
+    """Builds a REFERENCES clause from `Table.Column` or {table, columns}."""
+    # 省略欄位 → 參照對方的 PRIMARY KEY
+    if isinstance(ref, str):
+        ref_table, _, ref_column = ref.partition(".")
+        ref_columns = [ref_column] if ref_column else []
+    else:
+        ref_table, ref_columns = ref["table"], _column_list(ref.get("columns", []))
+    columns_sql = f"({_quoted(ref_columns)})" if ref_columns else ""
+    return f'REFERENCES "{ref_table}"{columns_sql}'
+
+
+def declared_indexes(table: str, cfg: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Returns the secondary indexes declared for `table` in schema.yaml.
+
+    Both a column-level `index: true` and entries of the table-level `indexes`
+    list are accepted; an entry is a column name, a list of columns, or a
+    mapping with `columns` and optional `name` and `unique`.
+    """
+    entries: List[Any] = [
+        [col] for col, props in cfg["columns"].items() if props.get("index")
+    ]
+    entries += cfg.get("indexes") or []
+    indexes = []
+    for entry in entries:
+        if not isinstance(entry, dict):
+            entry = {"columns": entry}
+        columns = _column_list(entry["columns"])
+        indexes.append(
+            {
+                "name": entry.get("name") or "_".join(["idx", table, *columns]),
+                "columns": columns,
+                "unique": bool(entry.get("unique")),
+            }
+        )
+    return indexes
 
 
 # ---------------------------------------------------------------------------
@@ -38,88 +152,893 @@ def create_tables_from_yaml(schema: Dict[str, Any], conn: sqlite3.Connection):
             col_type = props.get("type", "TEXT")
             not_null = " NOT NULL" if props.get("not_null") else ""
             default = f" DEFAULT {props['default']}" if "default" in props else ""
-            cols_sql.append(f'"{col}" {col_type}{not_null}{default}')
+            unique = " UNIQUE" if props.get("unique") else ""
+            references = (
+                f" {_references_sql(props['references'])}"
+                if props.get("references")
+                else ""
+            )
+            cols_sql.append(
+                f'"{col}" {col_type}{not_null}{default}{unique}{references}'
+            )
             if props.get("pk"):
                 pk_inline.append(f'"{col}"')
         pk_clause = f", PRIMARY KEY({','.join(pk_inline)})" if pk_inline else ""
-        ddl = (
-            f'CREATE TABLE IF NOT EXISTS "{table}" ({", ".join(cols_sql)}{pk_clause});'
+        # 多欄位外鍵：foreign_keys: [{columns: [...], references: {table, columns}}]
+        fk_clause = "".join(
+            f", FOREIGN KEY({_quoted(_column_list(fk['columns']))}) "
+            f"{_references_sql(fk['references'])}"
+            for fk in cfg.get("foreign_keys") or []
         )
+        # 次要索引不在這裡建，等資料載入後由 create_indexes_from_yaml 一次建好
+        ddl = f'CREATE TABLE IF NOT EXISTS "{table}" ({", ".join(cols_sql)}{pk_clause}{fk_clause});'
         cur.execute(ddl)
         print(f"🛠️  {table} created.")
     conn.commit()
 
 
 # ---------------------------------------------------------------------------
-def load_jsonl(table: str, jsonl_path: pathlib.Path, conn: sqlite3.Connection):
+def _insert_sql(table: str, columns: List[str]) -> str:
+    placeholders = ",".join("?" * len(columns))
+    # Quote column names for SQL
+    return (
+        f'INSERT OR REPLACE INTO "{table}" ({_quoted(columns)}) VALUES ({placeholders})'
+    )
+
+
+def _fast_batch_size(rows_seen: int, bytes_seen: int) -> int:
+    # 窄表一批多塞些列，寬表少些，讓每批記憶體量差不多
+    rows = FAST_BATCH_BYTES * rows_seen // max(bytes_seen, 1)
+    return max(FAST_BATCH_ROWS[0], min(FAST_BATCH_ROWS[1], rows))
+
+
+def is_stream(path: pathlib.Path) -> bool:
+    """True for sources that can only be read front to back: compressed files and stdin."""
+    return str(path) == STDIN or path.suffix in COMPRESSED_SUFFIXES
+
+
+def source_stem(path: pathlib.Path) -> str:
+    """
+    Returns the table part of a source file name: without .jsonl, compression
+    and shard suffixes ('order_lines.03.jsonl.gz' → 'order_lines').
+    """
+    name = path.name
+    for suffix in COMPRESSED_SUFFIXES + (".jsonl",):
+        name = name.removesuffix(suffix)
+    return _SHARD_SUFFIX_RE.sub("", name)
+
+
+@contextlib.contextmanager
+def open_jsonl(path: pathlib.Path) -> Iterator[BinaryIO]:
+    """
+    Opens a JSONL source for line-by-line binary reads.
+
+    .gz and .zst files are decompressed while they are read, and '-' reads
+    stdin, so memory stays bounded by the longest line whatever the input size.
+    """
+    if str(path) == STDIN:
+        yield sys.stdin.buffer
+    elif path.suffix == ".gz":
+        with gzip.open(path, "rb") as f:
+            yield f
+    elif path.suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError(
+                f"Reading {path.name} needs the zstandard package (pip install zstandard)."
+            )
+        with path.open("rb") as raw:
+            reader = zstandard.ZstdDecompressor().stream_reader(raw)
+            # stream_reader 沒有 readline；包一層 BufferedReader 才能逐行讀
+            with io.BufferedReader(reader, buffer_size=1024 * 1024) as f:
+                yield f
+    else:
+        with path.open("rb") as f:
+            yield f
+
+
+def load_jsonl(
+    table: str,
+    jsonl_path: pathlib.Path,
+    conn: sqlite3.Connection,
+    fast: bool = False,
+    commit: bool = True,
+) -> Dict[str, float]:
+    """
+    Inserts the rows of a JSONL source (see `open_jsonl`) into `table`.
+
+    With `fast`, rows are parsed with orjson when it is installed and the batch
+    size follows the average row size (about FAST_BATCH_BYTES of JSON per
+    executemany) instead of the fixed BATCH_SIZE. Pass `commit=False` to keep
+    the caller's transaction open across files.
+
+    Returns:
+        {'rows', 'bytes', 'seconds', 'columns'} for the file.
+    """
+    loads = _json_loads if fast else json.loads
+    batch_size = BATCH_SIZE
+    start = time.perf_counter()
     cur = conn.cursor()
     rows = []
     sql = None
-    with jsonl_path.open(encoding="utf-8") as f:
+    columns: List[str] = []
+    total_rows = total_bytes = 0
+    with open_jsonl(jsonl_path) as f:
         for line in f:
+            total_bytes += len(line)
             if not line.strip():  # 空白行略過
                 continue
-            obj = json.loads(line)
+            obj = loads(line)
             if sql is None:
                 # 第一次遇到此表 → 動態決定欄位與 SQL 模板
                 columns = list(obj.keys())  # Original column names for data extraction
-                quoted_columns_for_sql = [
-                    f'"{col}"' for col in columns
-                ]  # Quote column names for SQL
-                placeholders = ",".join("?" * len(columns))
-                sql = f'INSERT OR REPLACE INTO "{table}" ({",".join(quoted_columns_for_sql)}) VALUES ({placeholders})'
+                sql = _insert_sql(table, columns)
+                if fast:
+                    batch_size = _fast_batch_size(1, len(line))
             rows.append(
-                tuple(obj.get(col) for col in columns)
+                tuple(map(obj.get, columns))
             )  # Use original column names for fetching values
             # 滿 batch 就寫一次
-            if len(rows) >= BATCH_SIZE:
+            if len(rows) >= batch_size:
                 cur.executemany(sql, rows)
+                total_rows += len(rows)
                 rows.clear()
+                if fast:
+                    batch_size = _fast_batch_size(total_rows, total_bytes)
     # 把剩餘不足 batch 的寫入
     if rows:
         cur.executemany(sql, rows)
+        total_rows += len(rows)
+    if commit:
+        conn.commit()
+    seconds = time.perf_counter() - start
+    print(
+        f"✅  {table}: {jsonl_path.name} loaded ({total_rows} rows, "
+        f"{total_rows / seconds:,.0f} rows/s, {total_bytes / 2**20 / seconds:.1f} MB/s)."
+    )
+    return {
+        "rows": total_rows,
+        "bytes": total_bytes,
+        "seconds": seconds,
+        "columns": columns,
+    }
+
+
+def apply_fast_pragmas(conn: sqlite3.Connection):
+    """Switches `conn` to the unsafe, single-writer settings used by --fast."""
+    for pragma in FAST_PRAGMAS:
+        conn.execute(pragma)
+
+
+def end_fast_load(conn: sqlite3.Connection):
+    """Commits the --fast load transaction and restores the cache size for index builds."""
+    conn.commit()
+    conn.execute(DEFAULT_CACHE_PRAGMA)
+
+
+# ---------------------------------------------------------------------------
+def create_indexes_from_yaml(schema: Dict[str, Any], conn: sqlite3.Connection):
+    """
+    Creates the secondary indexes declared in schema.yaml.
+
+    Call this after the bulk load: building each B-tree once from sorted keys
+    is much faster than updating every index on every inserted row.
+    """
+    cur = conn.cursor()
+    existing = {
+        name
+        for (name,) in cur.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+        )
+    }
+    for table, cfg in schema["tables"].items():
+        for index in declared_indexes(table, cfg):
+            columns = ", ".join(index["columns"])
+            if index["name"] in existing:
+                # 增量模式沿用現行 DB，索引多半已在
+                print(f"📇 {index['name']} exists on {table}({columns}).")
+                continue
+            unique = "UNIQUE " if index["unique"] else ""
+            try:
+                cur.execute(
+                    f'CREATE {unique}INDEX IF NOT EXISTS "{index["name"]}" '
+                    f'ON "{table}" ({_quoted(index["columns"])})'
+                )
+            except sqlite3.IntegrityError as e:
+                # 資料本身違反 UNIQUE → 只警告，不中斷整批匯入
+                print(f"⚠️  Could not create {index['name']} on {table}: {e}")
+                continue
+            print(f"📇 {index['name']} created on {table}({columns}).")
+    conn.commit()
+
+
+def check_foreign_keys(conn: sqlite3.Connection) -> int:
+    """Reports rows whose foreign keys point at missing parents; returns their count."""
+    # SQLite 預設不強制外鍵，匯入時不擋資料，載入後再統一檢查
+    violations: Dict[str, int] = {}
+    try:
+        rows = conn.execute("PRAGMA foreign_key_check").fetchall()
+    except sqlite3.OperationalError:
+        # "foreign key mismatch"：某個 references 指向非鍵欄位，整個 PRAGMA 失敗
+        # → 逐表檢查，跳過出問題的表，其餘照常回報
+        rows = []
+        tables = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND name NOT LIKE 'sqlite_%'"
+        ).fetchall()
+        for (table,) in tables:
+            try:
+                rows += conn.execute(f'PRAGMA foreign_key_check("{table}")').fetchall()
+            except sqlite3.OperationalError as e:
+                print(
+                    f"⚠️  Could not check foreign keys of {table}: {e}. A "
+                    "schema.yaml reference must point at a primary key or UNIQUE column.",
+                    file=sys.stderr,
+                )
+    for table, _, parent, _ in rows:
+        key = f"{table} → {parent}"
+        violations[key] = violations.get(key, 0) + 1
+    for key, count in violations.items():
+        print(f"⚠️  {key}: {count} rows reference missing keys.")
+    return sum(violations.values())
+
+
+# ---------------------------------------------------------------------------
+def build_fts_indexes(
+    schema: Dict[str, Any],
+    conn: sqlite3.Connection,
+    tables: Optional[List[str]] = None,
+):
+    """
+    Builds external-content FTS5 trigram indexes over the searchable columns,
+    only for `tables` when given.
+    """
+    cur = conn.cursor()
+    for table, columns in FTS_INDEXES.items():
+        if table not in schema["tables"] or (
+            tables is not None and table not in tables
+        ):
+            continue
+        declared = schema["tables"][table]["columns"]
+        fts_columns = [col for col in columns if col in declared]
+        if not fts_columns:
+            continue
+        fts_table = f"{table}{FTS_SUFFIX}"
+        quoted_columns = ", ".join(f'"{col}"' for col in fts_columns)
+        try:
+            cur.execute(f'DROP TABLE IF EXISTS "{fts_table}"')
+            # trigram 分詞讓「俊凱王」這類中文名稱也能做子字串比對
+            cur.execute(
+                f'CREATE VIRTUAL TABLE "{fts_table}" USING fts5({quoted_columns}, '
+                f"content='{table}', content_rowid='rowid', tokenize='trigram')"
+            )
+            cur.execute(
+                f'INSERT INTO "{fts_table}"("{fts_table}") VALUES (\'rebuild\')'
+            )
+        except sqlite3.OperationalError as e:
+            # 舊版 SQLite 沒有 FTS5 或 trigram → 伺服器會退回 LIKE 查詢
+            print(f"⚠️  Could not build FTS index for {table}: {e}")
+            continue
+        print(f"🔎 {fts_table} built over {', '.join(fts_columns)}.")
     conn.commit()
-    print(f"✅  {table}: {jsonl_path.name} loaded ({cur.rowcount} rows).")
 
 
 # ---------------------------------------------------------------------------
-def main():
-    # Delete existing database file for a clean run
-    if pathlib.Path(DB_PATH).exists():
+def split_jsonl(path: pathlib.Path, chunk_bytes: int) -> List[Tuple[int, int]]:
+    """
+    Splits a file into byte ranges of about `chunk_bytes` (see `_read_range`).
+    Compressed files cannot be seeked into and stay one range.
+    """
+    size = path.stat().st_size
+    if is_stream(path):
+        return [(0, size)]
+    ranges = [
+        (start, min(start + chunk_bytes, size)) for start in range(0, size, chunk_bytes)
+    ]
+    return ranges or [(0, 0)]
+
+
+def _read_range(path: pathlib.Path, start: int, end: int) -> Iterator[bytes]:
+    """Yields every line that starts inside the byte range [start, end)."""
+    if is_stream(path):
+        # 壓縮檔只會有一個區段（見 split_jsonl）：整個解壓讀完
+        with open_jsonl(path) as f:
+            yield from f
+        return
+    with path.open("rb") as f:
+        if start:
+            # 從前一個 byte 讀到行尾：start 剛好是行首時只會吃掉前一行的 \n
+            f.seek(start - 1)
+            f.readline()
+        position = f.tell()
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            yield line
+
+
+def _parse_worker(tasks, batches, fast: bool):
+    """Worker process: turns (table, path, start, end) tasks into row batches."""
+    loads = _json_loads if fast else json.loads
+    for table, path, start, end in iter(tasks.get, None):
         try:
-            os.remove(DB_PATH)
-            print(f"🧹 Deleted existing database: {DB_PATH}")
-        except OSError as e:
-            print(f"Error deleting database {DB_PATH}: {e}")
-            # Optionally, decide if you want to exit if DB can't be deleted
-            # return
+            columns = None
+            rows = []
+            rows_sent = bytes_read = 0
+            batch_size = BATCH_SIZE
+            for line in _read_range(path, start, end):
+                bytes_read += len(line)
+                if not line.strip():  # 空白行略過
+                    continue
+                obj = loads(line)
+                if columns is None:
+                    columns = tuple(obj.keys())
+                rows.append(tuple(map(obj.get, columns)))
+                if len(rows) >= batch_size:
+                    batches.put(("rows", table, columns, rows))
+                    rows_sent += len(rows)
+                    rows = []
+                    # 批次越大，跨行程 pickle 的固定成本越低
+                    batch_size = _fast_batch_size(rows_sent, bytes_read)
+            if rows:
+                batches.put(("rows", table, columns, rows))
+                rows_sent += len(rows)
+            batches.put(("done", str(path), rows_sent, bytes_read))
+        except Exception as e:
+            batches.put(("error", str(path), f"{type(e).__name__}: {e}"))
+    batches.put(("exit",))
 
-    schema = yaml.safe_load(pathlib.Path(SCHEMA_FILE).read_text(encoding="utf-8"))
-    conn = sqlite3.connect(DB_PATH)
 
-    # 1) 建表
-    create_tables_from_yaml(schema, conn)
+def load_parallel(
+    files: List[Tuple[str, pathlib.Path]],
+    conn: sqlite3.Connection,
+    workers: int,
+    fast: bool = False,
+    chunk_bytes: int = PARALLEL_CHUNK_BYTES,
+) -> Dict[str, float]:
+    """
+    Loads (table, path) JSONL files with `workers` parser processes and one writer.
+
+    Files are cut into newline-aligned byte ranges of about `chunk_bytes`, so
+    one large file is parsed by several workers as well. Parsed batches come
+    back through a bounded queue and are written by this process on `conn`,
+    because SQLite allows only one writer at a time. Without `fast`, the
+    transaction is committed as each file completes.
+
+    Returns:
+        {'rows', 'bytes', 'seconds'} over all files, plus 'files': rows per path.
+    """
+    ctx = multiprocessing.get_context()
+    tasks = ctx.Queue()
+    batches = ctx.Queue(maxsize=workers * PARALLEL_QUEUE_BATCHES)
+    stats: Dict[str, Dict[str, Any]] = {}
+    jobs = []
+    for table, path in files:
+        ranges = split_jsonl(path, chunk_bytes)
+        stats[str(path)] = {
+            "table": table,
+            "name": path.name,
+            "pending": len(ranges),
+            "rows": 0,
+            "bytes": 0,
+        }
+        jobs += [(table, path, start, end) for start, end in ranges]
+    # 大區段先做，收尾時比較不會只剩一個 worker 在忙
+    jobs.sort(key=lambda job: job[3] - job[2], reverse=True)
+    for job in jobs:
+        tasks.put(job)
+    for _ in range(workers):
+        tasks.put(None)
+
+    start = time.perf_counter()
+    processes = [
+        ctx.Process(target=_parse_worker, args=(tasks, batches, fast), daemon=True)
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    cur = conn.cursor()
+    statements: Dict[Tuple[str, Tuple[str, ...]], str] = {}
+    errors = []
+    running = workers
+    try:
+        while running:
+            message = batches.get()
+            if message[0] == "rows":
+                _, table, columns, rows = message
+                sql = statements.get((table, columns))
+                if sql is None:
+                    sql = statements[(table, columns)] = _insert_sql(table, columns)
+                cur.executemany(sql, rows)
+            elif message[0] == "done":
+                _, key, rows, nbytes = message
+                file_stats = stats[key]
+                file_stats["rows"] += rows
+                file_stats["bytes"] += nbytes
+                file_stats["pending"] -= 1
+                if file_stats["pending"] == 0:
+                    if not fast:
+                        conn.commit()
+                    seconds = time.perf_counter() - start
+                    print(
+                        f"✅  {file_stats['table']}: {file_stats['name']} loaded "
+                        f"({file_stats['rows']} rows, "
+                        f"{file_stats['rows'] / seconds:,.0f} rows/s, "
+                        f"{file_stats['bytes'] / 2**20 / seconds:.1f} MB/s since start)."
+                    )
+            elif message[0] == "error":
+                errors.append(f"{message[1]}: {message[2]}")
+            else:
+                running -= 1
+    except BaseException:
+        # 寫入端出錯時 worker 可能卡在滿的佇列上，直接結束它們
+        for process in processes:
+            process.terminate()
+        raise
+    for process in processes:
+        process.join()
+    if errors:
+        raise RuntimeError("Parallel load failed:\n" + "\n".join(errors))
+    if not fast:
+        conn.commit()
+    return {
+        "rows": sum(s["rows"] for s in stats.values()),
+        "bytes": sum(s["bytes"] for s in stats.values()),
+        "seconds": time.perf_counter() - start,
+        "files": {key: s["rows"] for key, s in stats.items()},
+    }
+
+
+# ---------------------------------------------------------------------------
+def file_digest(path: pathlib.Path) -> str:
+    """Returns the sha256 hex digest of `path`."""
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def file_stat(path: pathlib.Path) -> Tuple[int, int]:
+    """Returns the size in bytes and modification time in nanoseconds of `path`."""
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def ensure_manifest(conn: sqlite3.Connection):
+    """Creates the manifest table, or adds the mtime column to an older one."""
+    conn.execute(
+        f'CREATE TABLE IF NOT EXISTS "{MANIFEST_TABLE}" ('
+        "file TEXT PRIMARY KEY, table_name TEXT, sha256 TEXT, "
+        "size INTEGER, mtime_ns INTEGER, rows INTEGER, loaded_at TEXT)"
+    )
+    columns = {row[1] for row in conn.execute(f'PRAGMA table_info("{MANIFEST_TABLE}")')}
+    if "mtime_ns" not in columns:
+        conn.execute(f'ALTER TABLE "{MANIFEST_TABLE}" ADD COLUMN mtime_ns INTEGER')
+
+
+def read_manifest(conn: sqlite3.Connection) -> Dict[str, Dict[str, Any]]:
+    """
+    Returns the load manifest as {file: {table, sha256, size, mtime_ns, rows,
+    loaded_at}}, or {} when `conn` has no manifest. Never writes, so it is
+    safe on a read-only connection to the live database.
+    """
+    columns = {row[1] for row in conn.execute(f'PRAGMA table_info("{MANIFEST_TABLE}")')}
+    if not columns:
+        return {}
+    mtime = "mtime_ns" if "mtime_ns" in columns else "NULL"
+    return {
+        file: {
+            "table": table,
+            "sha256": sha256,
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "rows": rows,
+            "loaded_at": loaded_at,
+        }
+        for file, table, sha256, size, mtime_ns, rows, loaded_at in conn.execute(
+            f"SELECT file, table_name, sha256, size, {mtime}, rows, loaded_at "
+            f'FROM "{MANIFEST_TABLE}"'
+        )
+    }
+
+
+def record_manifest(
+    conn: sqlite3.Connection,
+    file: str,
+    table: Optional[str],
+    sha256: Optional[str],
+    stat: Tuple[int, int],
+    rows: Optional[int] = None,
+):
+    """
+    Upserts one manifest entry (`table` is None for schema.yaml itself).
+
+    `stat` is the (size, mtime_ns) of the file taken before it was read;
+    `sha256` is None when the file was loaded without being hashed.
+    """
+    loaded_at = datetime.datetime.now(datetime.timezone.utc).isoformat(
+        timespec="seconds"
+    )
+    conn.execute(
+        f'INSERT OR REPLACE INTO "{MANIFEST_TABLE}" '
+        "(file, table_name, sha256, size, mtime_ns, rows, loaded_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (file, table, sha256, stat[0], stat[1], rows, loaded_at),
+    )
+
+
+def _primary_key(conn: sqlite3.Connection, table: str) -> List[str]:
+    info = conn.execute(f'PRAGMA main.table_info("{table}")').fetchall()
+    return [row[1] for row in sorted(info, key=lambda row: row[5]) if row[5]]
+
+
+def merge_table(
+    table: str,
+    paths: List[pathlib.Path],
+    conn: sqlite3.Connection,
+    fast: bool = False,
+) -> Dict[str, Any]:
+    """
+    Replaces the contents of `table` with the rows of `paths`, touching only
+    what differs.
+
+    The files are loaded into a TEMP staging table; rows whose primary key is
+    no longer staged are deleted, and the staged rows are applied with one
+    INSERT ... SELECT ... ON CONFLICT DO UPDATE that skips rows whose values
+    did not change. Tables without a primary key are emptied and refilled.
+    The caller commits.
+
+    Returns:
+        {'rows': staged rows, 'files': rows per path, 'upserted', 'deleted'}.
+    """
+    stage = f"{STAGE_PREFIX}{table}"
+    conn.execute(f'DROP TABLE IF EXISTS temp."{stage}"')
+    conn.execute(f'CREATE TEMP TABLE "{stage}" AS SELECT * FROM main."{table}" WHERE 0')
+    columns: List[str] = []
+    files: Dict[str, int] = {}
+    for path in paths:
+        stats = load_jsonl(stage, path, conn, fast=fast, commit=False)
+        files[str(path)] = stats["rows"]
+        columns += [col for col in stats["columns"] if col not in columns]
+
+    pk = _primary_key(conn, table)
+    deleted = upserted = 0
+    if columns:
+        quoted = _quoted(columns)
+        before = conn.total_changes
+        if pk:
+            conn.execute(f'CREATE INDEX temp."{stage}_pk" ON "{stage}" ({_quoted(pk)})')
+            match = " AND ".join(f's."{col}" = "{table}"."{col}"' for col in pk)
+            deleted = conn.execute(
+                f'DELETE FROM main."{table}" WHERE NOT EXISTS '
+                f'(SELECT 1 FROM "{stage}" AS s WHERE {match})'
+            ).rowcount
+            before = conn.total_changes
+            values = [col for col in columns if col not in pk]
+            if values:
+                assignments = ", ".join(f'"{col}" = excluded."{col}"' for col in values)
+                changed = " OR ".join(
+                    f'"{table}"."{col}" IS NOT excluded."{col}"' for col in values
+                )
+                on_conflict = f"DO UPDATE SET {assignments} WHERE {changed}"
+            else:
+                on_conflict = "DO NOTHING"
+            # WHERE true：讓 SQLite 把 ON CONFLICT 解析成 upsert 而不是 JOIN 條件
+            conn.execute(
+                f'INSERT INTO main."{table}" ({quoted}) '
+                f'SELECT {quoted} FROM "{stage}" WHERE true ORDER BY rowid '
+                f"ON CONFLICT ({_quoted(pk)}) {on_conflict}"
+            )
+        else:
+            deleted = conn.execute(f'DELETE FROM main."{table}"').rowcount
+            before = conn.total_changes
+            conn.execute(
+                f'INSERT INTO main."{table}" ({quoted}) SELECT {quoted} FROM "{stage}"'
+            )
+        upserted = conn.total_changes - before
+    else:
+        # 來源檔全空（或被刪光）→ 表也清空
+        deleted = conn.execute(f'DELETE FROM main."{table}"').rowcount
+    conn.execute(f'DROP TABLE temp."{stage}"')
+    return {
+        "rows": sum(files.values()),
+        "files": files,
+        "upserted": upserted,
+        "deleted": deleted,
+    }
+
+
+def load_incremental(
+    files: List[Tuple[str, pathlib.Path]],
+    conn: sqlite3.Connection,
+    fast: bool = False,
+    prune: bool = True,
+) -> List[str]:
+    """
+    Brings an existing database up to date with `files` using the load manifest.
+
+    A table is skipped when the set of files feeding it matches the manifest
+    and none of them changed; otherwise all of its files are merged with
+    merge_table(). A file whose size and mtime match its manifest entry is
+    taken as unchanged without reading it; any other file is hashed and
+    compared by sha256. With `prune` (when `files` is the whole data
+    directory), a table whose files all disappeared is emptied.
+
+    Returns:
+        The names of the tables that were merged.
+    """
+    ensure_manifest(conn)
+    manifest = read_manifest(conn)
+    by_table: Dict[str, List[pathlib.Path]] = {}
+    for table, path in files:
+        by_table.setdefault(table, []).append(path)
+    for entry in manifest.values() if prune else ():
+        if entry["table"]:
+            by_table.setdefault(entry["table"], [])
+
+    merged = []
+    for table, paths in by_table.items():
+        previous = {
+            file: entry for file, entry in manifest.items() if entry["table"] == table
+        }
+        current: Dict[str, Tuple[Optional[str], Tuple[int, int]]] = {}
+        restat = []  # 內容沒變但 mtime 變了：更新 manifest，下次免再 hash
+        for path in paths:
+            file, stat = str(path), file_stat(path)
+            entry = previous.get(file)
+            if entry and (entry["size"], entry["mtime_ns"]) == stat:
+                current[file] = (entry["sha256"], stat)
+                continue
+            current[file] = (file_digest(path), stat)
+            if entry and entry["sha256"] == current[file][0]:
+                restat.append(file)
+        if previous.keys() == current.keys() and all(
+            previous[file]["sha256"] == sha256 for file, (sha256, _) in current.items()
+        ):
+            for file in restat:
+                record_manifest(
+                    conn, file, table, *current[file], previous[file]["rows"]
+                )
+            if restat and not fast:
+                conn.commit()
+            print(f"⏭️  {table}: unchanged, skipped.")
+            continue
+        stats = merge_table(table, paths, conn, fast=fast)
+        for file in previous.keys() - current.keys():
+            conn.execute(f'DELETE FROM "{MANIFEST_TABLE}" WHERE file = ?', (file,))
+        for file, (sha256, stat) in current.items():
+            record_manifest(conn, file, table, sha256, stat, stats["files"][file])
+        if not fast:
+            conn.commit()
+        print(
+            f"🔁 {table}: {stats['upserted']} rows inserted or updated, "
+            f"{stats['deleted']} deleted ({stats['rows']} rows in source)."
+        )
+        merged.append(table)
+    return merged
+
+
+# ---------------------------------------------------------------------------
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Load data/*.jsonl into the SQLite demo database."
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        type=pathlib.Path,
+        help="JSONL sources to load instead of data/*.jsonl[.gz|.zst]: .jsonl, "
+        ".jsonl.gz or .jsonl.zst files, or - for stdin (needs --table).",
+    )
+    parser.add_argument(
+        "--table",
+        help="Load every input into this table instead of matching file names.",
+    )
+    parser.add_argument(
+        "--fast",
+        action="store_true",
+        help="One transaction, no journal or fsync, large cache, adaptive batches "
+        "(and orjson if installed). A failed run only discards its temporary file.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Parser processes feeding the single SQLite writer (default: 1, no subprocesses).",
+    )
+    parser.add_argument(
+        "--db",
+        default=DB_PATH,
+        help=f"Database to create or update (default: {DB_PATH}). It is built in a "
+        "temporary file next to it and renamed into place when complete.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Keep the existing database: skip tables whose files are unchanged "
+        "and merge the rest (inserts, updates and deletions). Falls back to a "
+        "full rebuild when schema.yaml changed.",
+    )
+    args = parser.parse_args(argv)
+    if args.table and not args.inputs:
+        # 否則會建出空的 DB 並換掉現行檔
+        parser.error("--table requires input files.")
+    if any(str(path) == STDIN for path in args.inputs):
+        if not args.table:
+            parser.error("reading stdin (-) needs --table.")
+        if args.workers > 1 or args.incremental:
+            parser.error(
+                "stdin (-) cannot be combined with --workers or --incremental."
+            )
+    return args
+
+
+def find_sources(
+    schema: Dict[str, Any],
+    inputs: Optional[List[pathlib.Path]] = None,
+    table: Optional[str] = None,
+) -> List[Tuple[str, pathlib.Path]]:
+    """
+    Returns the (table, path) pairs to load: `inputs`, or every JSONL source in
+    DATA_DIR. Without `table`, each file goes to the schema table whose name
+    matches its stem, ignoring case, underscores and compression suffixes.
+    """
+    if table:
+        if table not in schema["tables"]:
+            raise SystemExit(f"Table {table} is not defined in {SCHEMA_FILE}.")
+        return [(table, path) for path in inputs or []]
 
-    # 2) 依資料夾自動匯入
     # Create a mapping from a normalized (lowercase, no underscores) table name to schema-defined table name
     table_name_map = {
         name.lower().replace("_", ""): name for name in schema["tables"].keys()
     }
+    if not inputs:
+        inputs = sorted(
+            path for pattern in JSONL_PATTERNS for path in DATA_DIR.glob(pattern)
+        )
 
-    for jsonl_file in DATA_DIR.glob("*.jsonl"):
+    files = []
+    for jsonl_file in inputs:
         # Normalize the file stem (lowercase, no underscores)
-        normalized_file_stem = jsonl_file.stem.lower().replace("_", "")
+        normalized_file_stem = source_stem(jsonl_file).lower().replace("_", "")
         actual_table_name = table_name_map.get(normalized_file_stem)
 
         if actual_table_name:
-            load_jsonl(actual_table_name, jsonl_file, conn)
+            files.append((actual_table_name, jsonl_file))
         else:
             print(
                 f"⚠️  No table definition found in schema for {jsonl_file.name}. Skipping."
             )
+    return files
+
+
+def _populate(
+    conn: sqlite3.Connection,
+    args: argparse.Namespace,
+    schema: Dict[str, Any],
+    schema_path: pathlib.Path,
+    schema_digest: Tuple[str, Tuple[int, int]],
+    incremental: bool,
+):
+    """Runs the load steps on `conn`, which holds the database being built."""
+    if args.fast:
+        apply_fast_pragmas(conn)
+
+    # 1) 建表
+    create_tables_from_yaml(schema, conn)
+
+    # 2) 依資料夾（或指定的來源）自動匯入
+    files = find_sources(schema, args.inputs, args.table)
+
+    load_start = time.perf_counter()
+    changed_tables: Optional[List[str]] = None
+    ensure_manifest(conn)
+    if incremental:
+        changed_tables = load_incremental(
+            files, conn, fast=args.fast, prune=not args.inputs
+        )
+    else:
+        # 讀檔前先記下 size 與 mtime；全量載入不做 sha256，免得每個檔再讀一遍。
+        # 之後 --incremental 遇到 size、mtime 都相符的檔就不必 hash
+        stats_before = {
+            str(path): file_stat(path) for _, path in files if str(path) != STDIN
+        }
+        totals: Dict[str, Any] = {"rows": 0, "bytes": 0, "files": {}}
+        if args.workers > 1:
+            totals = load_parallel(files, conn, args.workers, fast=args.fast)
+        else:
+            for actual_table_name, jsonl_file in files:
+                stats = load_jsonl(
+                    actual_table_name,
+                    jsonl_file,
+                    conn,
+                    fast=args.fast,
+                    commit=not args.fast,
+                )
+                totals["rows"] += stats["rows"]
+                totals["bytes"] += stats["bytes"]
+                totals["files"][str(jsonl_file)] = stats["rows"]
+        for actual_table_name, jsonl_file in files:
+            if str(jsonl_file) == STDIN:
+                continue  # stdin 沒有檔案可比對
+            record_manifest(
+                conn,
+                str(jsonl_file),
+                actual_table_name,
+                None,
+                stats_before[str(jsonl_file)],
+                totals["files"][str(jsonl_file)],
+            )
+        print(
+            f"📦 Loaded {totals['rows']} rows ({totals['bytes'] / 2**20:.1f} MB) "
+            f"in {time.perf_counter() - load_start:.2f}s."
+        )
+    record_manifest(conn, str(schema_path), None, *schema_digest)
+    if args.fast:
+        end_fast_load(conn)
+    else:
+        conn.commit()
+    if incremental:
+        print(
+            f"📦 {len(changed_tables)} of {len({t for t, _ in files})} tables changed "
+            f"in {time.perf_counter() - load_start:.2f}s."
+        )
+
+    # 3) 次要索引：資料載入後才建
+    create_indexes_from_yaml(schema, conn)
+
+    # 4) 全文檢索索引（增量模式只重建有變動的表）
+    build_fts_indexes(schema, conn, tables=changed_tables)
+
+    # 5) 外鍵檢查
+    check_foreign_keys(conn)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    schema_path = pathlib.Path(SCHEMA_FILE)
+    schema_digest = (file_digest(schema_path), file_stat(schema_path))
+    schema = yaml.safe_load(schema_path.read_text(encoding="utf-8"))
+
+    # 先建到同目錄的暫存檔，完成後 os.replace 原子換上：
+    # 執行中的伺服器只會看到舊檔或新檔，不會讀到寫一半的 DB
+    db_path = pathlib.Path(args.db)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    build_path = db_path.with_name(f".{db_path.name}.{os.getpid()}.tmp")
+    build_path.unlink(missing_ok=True)
+
+    incremental = args.incremental and db_path.exists()
+    if incremental:
+        # 唯讀開啟：換上之前現行 DB 一個位元組都不能改
+        live = sqlite3.connect(f"{db_path.resolve().as_uri()}?mode=ro", uri=True)
+        if (
+            read_manifest(live).get(str(schema_path), {}).get("sha256")
+            != schema_digest[0]
+        ):
+            # 欄位或型別可能變了，合併不安全 → 整個重建
+            print("♻️  schema.yaml changed since the last load; rebuilding everything.")
+            incremental = False
+        conn = sqlite3.connect(build_path)
+        if incremental:
+            # 從現行 DB 複製一份再合併，現行檔在換上前都不會被改動
+            live.backup(conn)
+        live.close()
+    else:
+        conn = sqlite3.connect(build_path)
 
-    conn.close()
-    print(f"🎉 All done → {DB_PATH}")
+    try:
+        _populate(conn, args, schema, schema_path, schema_digest, incremental)
+        conn.close()
+        if args.fast:
+            # synchronous=OFF 從未 fsync；換上前補一次，免得斷電後換上殘缺檔
+            with open(build_path, "rb") as f:
+                os.fsync(f.fileno())
+        os.replace(build_path, db_path)
+    except BaseException:
+        conn.close()
+        build_path.unlink(missing_ok=True)
+        raise
+    print(f"🎉 All done → {db_path}")
 
 
 if __name__ == "__main__":
@@ -12,22 +12,34 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import argparse
+import concurrent.futures
+import datetime
+import itertools
 import json
 import pathlib
+import random
 import shutil
 import textwrap
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-base_dir = pathlib.Path("data")
-if base_dir.exists():
-    shutil.rmtree(base_dir)
-base_dir.mkdir(parents=True, exist_ok=True)
+DATA_DIR = pathlib.Path("data")
 
 
-def wjsonl(name, rows):
-    with (base_dir / name).open("w", encoding="utf-8") as f:
-        for r in rows:
-            json.dump(r, f, ensure_ascii=False)
-            f.write("\n")
+def _write_rows(f, rows) -> int:
+    count = 0
+    for r in rows:
+        f.write(json.dumps(r, ensure_ascii=False))
+        f.write("\n")
+        count += 1
+    return count
+
+
+def wjsonl(name, rows, out_dir: pathlib.Path = DATA_DIR) -> int:
+    """Writes `rows` (any iterable, consumed lazily) to out_dir/name; returns the row count."""
+    with (out_dir / name).open("w", encoding="utf-8") as f:
+        return _write_rows(f, rows)
 
 
 # CONTACTS
@@ -581,15 +593,359 @@ inventory = [
     },
 ]
 
-wjsonl("contacts.jsonl", contacts)
-wjsonl("customers.jsonl", customers)
-wjsonl("products.jsonl", products)
-wjsonl("orders.jsonl", orders)
-wjsonl("order_lines.jsonl", order_lines)
-wjsonl("opportunities.jsonl", opps)
-wjsonl("inventory.jsonl", inventory)
+# ---------------------------------------------------------------------------
+# --scale：合成資料。每 1.0 倍的筆數（OrderLines 平均每張訂單約 3.4 筆），
+# --scale 100 約 500 萬筆。
+SCALE_ROWS = {
+    "customers": 1_000,
+    "products": 200,
+    "orders": 10_000,
+    "opportunities": 2_000,
+}
+PROSPECT_FRACTION = 0.15
+# 客戶下單量依 Zipf 分佈：指數 1.2 時前 1%（VIP）拿走過半訂單，且規模越大越集中
+CUSTOMER_ZIPF = 1.2
+VIP_FRACTION = 0.01
+PRODUCT_ZIPF = 1.0
+LINES_PER_ORDER = (1, 2, 3, 4, 5, 6, 8)
+LINES_WEIGHTS = (20, 22, 18, 14, 10, 8, 8)
+MAX_LINES_PER_ORDER = max(LINES_PER_ORDER)
+# 合成 LineID = 基底 + 訂單序號 × 每單上限 + 行號：不必依序產生也不會重複
+LINE_ID_BASE = 1_000
+ORDER_DATES = (datetime.date(2022, 1, 1), datetime.date(2025, 6, 30))
+REGISTERED_DATES = (datetime.date(2019, 1, 1), datetime.date(2025, 6, 30))
+
+SURNAMES = "陳林黃張李王吳劉蔡楊許鄭謝郭洪曾邱廖賴周"
+GIVEN_NAME_CHARS = "家俊志明雅婷怡君宗翰佩珊冠宇詩涵承恩欣建宏淑芬傑美玲文華"
+CITIES = (
+    ("台北市", "中正區", "100", "02"),
+    ("台北市", "內湖區", "114", "02"),
+    ("新北市", "板橋區", "220", "02"),
+    ("桃園市", "中壢區", "320", "03"),
+    ("新竹市", "東區", "300", "03"),
+    ("台中市", "西屯區", "407", "04"),
+    ("台南市", "永康區", "710", "06"),
+    ("高雄市", "前鎮區", "806", "07"),
+)
+STREETS = (
+    "中山路",
+    "中正路",
+    "民生路",
+    "建國路",
+    "復興路",
+    "光復路",
+    "成功路",
+    "和平路",
+)
+COMPANY_PREFIXES = (
+    "台灣",
+    "永豐",
+    "大同",
+    "新光",
+    "華新",
+    "東元",
+    "正新",
+    "宏達",
+    "合盛",
+    "志聯",
+)
+COMPANY_CORES = (
+    ("精密", "製造業"),
+    ("電機", "製造業"),
+    ("鋼鐵", "製造業"),
+    ("化工", "製造業"),
+    ("光電", "科技業"),
+    ("半導體", "科技業"),
+    ("資訊", "科技業"),
+    ("能源", "公用事業"),
+    ("物流", "服務業"),
+    ("營造", "營建業"),
+)
+COMPANY_SUFFIXES = ("股份有限公司", "有限公司", "工業股份有限公司")
+DEPARTMENTS = (
+    ("Sales", "業務主任"),
+    ("Purchasing", "採購專員"),
+    ("Engineering", "工程師"),
+    ("Operations", "廠務經理"),
+    ("Finance", "財務副理"),
+)
+PREFERRED = ("Email", "LINE", "Mobile")
+# (代碼, 品名, 類別, 牌價範圍)
+PRODUCT_LINES = (
+    ("IM", "三相感應馬達", "工業用馬達", (20_000, 200_000)),
+    ("VFD", "變頻器", "工業控制", (8_000, 90_000)),
+    ("SRV", "伺服馬達", "運動控制", (15_000, 120_000)),
+    ("PLC", "可程式控制器", "工業控制", (12_000, 60_000)),
+    ("GBX", "減速機", "傳動元件", (6_000, 80_000)),
+)
+ORIGINS = ("台灣", "日本", "德國", "中國", "美國")
+# (階段, 成交機率 %, 權重)
+STAGES = (
+    ("Lead", 10, 30),
+    ("Qualified", 30, 25),
+    ("Proposal", 60, 20),
+    ("Negotiation", 80, 10),
+    ("Won", 100, 8),
+    ("Lost", 0, 7),
+)
+
+
+def _rng(seed: int, name: str) -> random.Random:
+    # 字串種子經 sha512 轉換，不受 PYTHONHASHSEED 影響，每次輸出都一樣
+    return random.Random(f"{seed}:{name}")
+
+
+def _count(scale: float, table: str) -> int:
+    return max(1, round(SCALE_ROWS[table] * scale))
+
+
+def _random_date(rng: random.Random, span: Tuple[datetime.date, datetime.date]) -> str:
+    start, end = span[0].toordinal(), span[1].toordinal()
+    return datetime.date.fromordinal(rng.randint(start, end)).isoformat()
+
+
+def customer_id(index: int, active: bool) -> str:
+    return f"CU{index + 1:07d}" if active else f"PC{index + 1:07d}"
+
+
+def build_plan(scale: float, seed: int) -> Dict[str, Any]:
+    """
+    Draws the facts that several tables share: which customers are active
+    buyers, their order weights and VIP flags, and product prices and weights.
+
+    Everything is a flat list indexed by customer or product number, so memory
+    grows with the number of customers and products, never with orders.
+    """
+    rng = _rng(seed, "plan")
+    n_customers = _count(scale, "customers")
+    n_products = _count(scale, "products")
+    active = [rng.random() >= PROSPECT_FRACTION for _ in range(n_customers)]
+    buyers = [i for i in range(n_customers) if active[i]] or [0]
+    active[buyers[0]] = True
+    # Zipf 排名隨機指派給客戶，大客戶不會全擠在編號前段
+    ranks = list(range(1, len(buyers) + 1))
+    rng.shuffle(ranks)
+    customer_rank = [0] * n_customers
+    for i, rank in zip(buyers, ranks):
+        customer_rank[i] = rank
+    product_ranks = list(range(1, n_products + 1))
+    rng.shuffle(product_ranks)
+    product_line = [rng.randrange(len(PRODUCT_LINES)) for _ in range(n_products)]
+    prices = []
+    for line in product_line:
+        low, high = PRODUCT_LINES[line][3]
+        # 對數均勻：低價品多、高價品少
+        prices.append(round(low * (high / low) ** rng.random(), -2))
+    return {
+        "scale": scale,
+        "seed": seed,
+        "customers": n_customers,
+        "products": n_products,
+        "orders": _count(scale, "orders"),
+        "opportunities": _count(scale, "opportunities"),
+        "active": active,
+        "customer_rank": customer_rank,
+        "vip_ranks": max(1, int(len(buyers) * VIP_FRACTION)),
+        "buyers": buyers,
+        "buyer_weights": list(
+            itertools.accumulate(customer_rank[i] ** -CUSTOMER_ZIPF for i in buyers)
+        ),
+        "product_line": product_line,
+        "prices": prices,
+        "product_weights": list(
+            itertools.accumulate(r**-PRODUCT_ZIPF for r in product_ranks)
+        ),
+    }
+
+
+def _people(seed: int, count: int) -> Iterator[Tuple[str, str, str, str]]:
+    """Yields (LastName, FirstName, Department, Title); contacts and customers replay it."""
+    rng = _rng(seed, "people")
+    for _ in range(count):
+        department, title = rng.choice(DEPARTMENTS)
+        yield (
+            rng.choice(SURNAMES),
+            "".join(rng.choices(GIVEN_NAME_CHARS, k=2)),
+            department,
+            title,
+        )
+
+
+def gen_contacts(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    rng = _rng(plan["seed"], "contacts")
+    people = _people(plan["seed"], plan["customers"])
+    for i, (last, first, department, title) in enumerate(people):
+        yield {
+            "ContactID": f"C{i + 1:07d}",
+            "LastName": last,
+            "FirstName": first,
+            "Email": f"contact{i + 1:07d}@example.com.tw",
+            "Mobile": f"09{rng.randint(10, 99)}-{rng.randint(0, 999):03d}-{rng.randint(0, 999):03d}",
+            "Preferred": rng.choice(PREFERRED),
+            "Department": department,
+            "Title": title,
+            "Active": "Y" if rng.random() < 0.95 else "N",
+            "Timezone": "Asia/Taipei",
+        }
+
+
+def gen_customers(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    rng = _rng(plan["seed"], "customers")
+    people = _people(plan["seed"], plan["customers"])
+    buyers = len(plan["buyers"])
+    for i, (last, first, _, title) in enumerate(people):
+        active = plan["active"][i]
+        rank = plan["customer_rank"][i]
+        city, region, postal_code, area = rng.choice(CITIES)
+        core, kind = rng.choice(COMPANY_CORES)
+        name = rng.choice(COMPANY_PREFIXES) + core + rng.choice(COMPANY_SUFFIXES)
+        if not active:
+            level = None
+        elif rank <= max(1, buyers // 10):
+            level = "A"
+        elif rank <= buyers // 2:
+            level = "B"
+        else:
+            level = "C"
+        phone = f"{area}-{rng.randint(2000, 8999)}-{rng.randint(0, 9999):04d}"
+        yield {
+            "CustomerID": customer_id(i, active),
+            "CompanyName": name,
+            "UBN": f"{rng.randrange(10**8):08d}" if active else None,
+            "Type": kind,
+            "Address": f"{rng.choice(STREETS)} {rng.randint(1, 300)} 號",
+            "City": city,
+            "Region": region,
+            "PostalCode": postal_code,
+            "Country": "台灣",
+            "ContactID": f"C{i + 1:07d}" if active else None,
+            "ContactName": first + last if active else None,
+            "ContactTitle": title if active else None,
+            "Email": f"sales{i + 1:07d}@example.com.tw" if active else None,
+            "Phone": phone if active else None,
+            "Fax": phone[:-1] + str((int(phone[-1]) + 1) % 10) if active else None,
+            "RegisteredDate": _random_date(rng, REGISTERED_DATES),
+            "Level": level,
+            "Status": "Active" if active else "Prospect",
+            "VIPFlag": "Y" if active and rank <= plan["vip_ranks"] else "N",
+        }
+
+
+def product_id(plan: Dict[str, Any], index: int) -> str:
+    return f"P-{PRODUCT_LINES[plan['product_line'][index]][0]}{index + 1:06d}"
+
+
+def gen_products(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    rng = _rng(plan["seed"], "products")
+    for i, line in enumerate(plan["product_line"]):
+        code, label, category, _ = PRODUCT_LINES[line]
+        rating = rng.choice((0.75, 1.5, 2.2, 3.7, 5.5, 7.5, 11, 15, 22, 37, 55))
+        yield {
+            "ProductID": product_id(plan, i),
+            "ProductName": f"{rating:g} kW {label}",
+            "Category": category,
+            "Model": f"{code}-{rating:g}KW-{i + 1:06d}",
+            "Origin": rng.choice(ORIGINS),
+            "ListPrice": plan["prices"][i],
+        }
+
+
+def gen_inventory(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    rng = _rng(plan["seed"], "inventory")
+    for i in range(plan["products"]):
+        if rng.random() < 0.1:  # 約一成品項沒有庫存紀錄
+            continue
+        safety = rng.randint(5, 50)
+        yield {
+            "ProductID": product_id(plan, i),
+            "CurrentStock": max(0, int(rng.gauss(safety * 2, safety))),
+            "SafetyStock": safety,
+            "LastReplenished": _random_date(
+                rng, (datetime.date(2025, 1, 1), ORDER_DATES[1])
+            ),
+        }
+
+
+def gen_orders_with_lines(
+    plan: Dict[str, Any], start: int = 0, stop: Optional[int] = None
+) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """
+    Yields (order, lines) for orders start..stop-1.
 
-schema = textwrap.dedent("""\
+    The random stream depends only on the seed and `start`, so each shard
+    (see `write_order_shard`) is reproducible on its own, whichever process
+    generates it.
+    """
+    stop = plan["orders"] if stop is None else stop
+    rng = _rng(plan["seed"], f"orders:{start}")
+    buyers, buyer_weights = plan["buyers"], plan["buyer_weights"]
+    products = range(plan["products"])
+    product_weights, prices = plan["product_weights"], plan["prices"]
+    first_day, last_day = ORDER_DATES[0].toordinal(), ORDER_DATES[1].toordinal()
+    for n in range(start, stop):
+        customer = rng.choices(buyers, cum_weights=buyer_weights)[0]
+        day = rng.randint(first_day, last_day)
+        if rng.random() < 0.02:
+            status, ship_day = "Cancelled", None
+        elif last_day - day < 20:
+            status, ship_day = "InProcess", None
+        else:
+            ship_day = day + rng.randint(3, 40)
+            status = "Shipped" if last_day - day < 45 else "Closed"
+        order_id = f"SO{n + 1:08d}"
+        lines = []
+        count = rng.choices(LINES_PER_ORDER, LINES_WEIGHTS)[0]
+        picked = rng.choices(products, cum_weights=product_weights, k=count)
+        for j, product in enumerate(picked):
+            lines.append(
+                {
+                    "LineID": LINE_ID_BASE + n * MAX_LINES_PER_ORDER + j,
+                    "OrderID": order_id,
+                    "ProductID": product_id(plan, product),
+                    "Qty": rng.choice((1, 1, 2, 2, 3, 4, 5, 10, 20)),
+                    "UnitPrice": round(prices[product] * rng.uniform(0.85, 1.0)),
+                }
+            )
+        yield (
+            {
+                "OrderID": order_id,
+                "CustomerID": customer_id(customer, True),
+                "OrderDate": datetime.date.fromordinal(day).isoformat(),
+                "ShipDate": (
+                    datetime.date.fromordinal(ship_day).isoformat()
+                    if ship_day
+                    else None
+                ),
+                "Status": status,
+                "TotalAmount": sum(l["Qty"] * l["UnitPrice"] for l in lines),
+                "Currency": "TWD",
+                "Comments": rng.choice(("", "", "", "急件", "分批出貨", "含安裝")),
+            },
+            lines,
+        )
+
+
+def gen_opportunities(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    rng = _rng(plan["seed"], "opportunities")
+    stage_weights = [weight for _, _, weight in STAGES]
+    for n in range(plan["opportunities"]):
+        customer = rng.randrange(plan["customers"])
+        stage, probability, _ = rng.choices(STAGES, stage_weights)[0]
+        core, _ = rng.choice(COMPANY_CORES)
+        yield {
+            "OpportunityID": f"OP{n + 1:08d}",
+            "CustomerID": customer_id(customer, plan["active"][customer]),
+            "Name": f"{core}產線{rng.choice(('升級', '擴建', '節能改善', '汰換'))}",
+            "Stage": stage,
+            "Amount": round(10 ** rng.uniform(5, 7), -3),
+            "Probability": probability,
+            "CloseDate": _random_date(
+                rng, (datetime.date(2025, 7, 1), datetime.date(2026, 6, 30))
+            ),
+        }
+
+
+SCHEMA = textwrap.dedent("""\
 tables:
   Contacts:
     description: "Master table for contact personnel. Stores essential information for individuals associated with customers or internal departments."
@@ -617,7 +973,7 @@ tables:
       Region:       {type: TEXT}
       PostalCode:   {type: TEXT}
       Country:      {type: TEXT}
-      ContactID:    {type: TEXT}
+      ContactID:    {type: TEXT, references: Contacts.ContactID, index: true}
       ContactName:  {type: TEXT}
       ContactTitle: {type: TEXT}
       Email:        {type: TEXT}
@@ -642,20 +998,22 @@ tables:
     description: "Tracks customer sales orders from creation through fulfillment. Contains header-level information for each transaction."
     columns:
       OrderID:      {type: TEXT, pk: true}
-      CustomerID:   {type: TEXT}
+      CustomerID:   {type: TEXT, references: Customers.CustomerID}
       OrderDate:    {type: TEXT}
       ShipDate:     {type: TEXT}
       Status:       {type: TEXT}
       TotalAmount:  {type: REAL}
       Currency:     {type: TEXT}
       Comments:     {type: TEXT}
+    indexes:
+      - {columns: [CustomerID, OrderDate]}
 
   OrderLines:
     description: "Details individual line items within each customer order. Links products to orders and specifies quantities and agreed-upon unit prices."
     columns:
       LineID:       {type: INTEGER, pk: true}
-      OrderID:      {type: TEXT}
-      ProductID:    {type: TEXT}
+      OrderID:      {type: TEXT, references: Orders.OrderID, index: true}
+      ProductID:    {type: TEXT, references: Products.ProductID, index: true}
       Qty:          {type: INTEGER}
       UnitPrice:    {type: REAL}
 
@@ -663,7 +1021,7 @@ tables:
     description: "Manages potential sales deals and tracks their progression through the sales pipeline. Includes valuation, probability, and forecasted close dates."
     columns:
       OpportunityID: {type: TEXT, pk: true}
-      CustomerID:   {type: TEXT}
+      CustomerID:   {type: TEXT, references: Customers.CustomerID, index: true}
       Name:         {type: TEXT}
       Stage:        {type: TEXT}
       Amount:       {type: REAL}
@@ -673,12 +1031,163 @@ tables:
   Inventory:
     description: "Monitors current stock levels, safety stock thresholds, and replenishment history for all products. Essential for supply chain management and order fulfillment."
     columns:
-      ProductID:    {type: TEXT, pk: true}
+      ProductID:    {type: TEXT, pk: true, references: Products.ProductID}
       CurrentStock: {type: INTEGER}
       SafetyStock:  {type: INTEGER}
       LastReplenished: {type: TEXT}
 """).strip()
 
-(base_dir / "schema.yaml").write_text(schema, encoding="utf-8")
 
-print("Sample CRM SQLite data prepared at", base_dir)
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Write the demo ERP sample data (JSONL) and schema.yaml."
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=0,
+        help="Also generate synthetic rows: 1.0 is about 50k rows (10k orders), "
+        "100 about 5M. Default 0 writes only the hand-written demo records.",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=42, help="Random seed for --scale (default: 42)."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes writing shards and tables in parallel (default: 1).",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=0,
+        help="Split orders and order_lines into this many files, e.g. "
+        "orders.00.jsonl (default: one per worker). Output depends on --seed "
+        "and --shards, not on --workers.",
+    )
+    parser.add_argument(
+        "--out",
+        type=pathlib.Path,
+        default=DATA_DIR,
+        help="Output directory (default: data).",
+    )
+    return parser.parse_args(argv)
+
+
+# 小表各寫成一個檔；Orders / OrderLines 依 --shards 切成 orders.00.jsonl … 分片
+TABLES = {
+    "contacts.jsonl": (contacts, gen_contacts),
+    "customers.jsonl": (customers, gen_customers),
+    "products.jsonl": (products, gen_products),
+    "opportunities.jsonl": (opps, gen_opportunities),
+    "inventory.jsonl": (inventory, gen_inventory),
+}
+
+
+def shard_name(table: str, shard: int, shards: int) -> str:
+    """'orders.jsonl' for a single shard, else 'orders.03.jsonl' (load_to_sql strips the number)."""
+    if shards == 1:
+        return f"{table}.jsonl"
+    return f"{table}.{shard:0{max(2, len(str(shards - 1)))}d}.jsonl"
+
+
+def write_table(
+    name: str, plan: Optional[Dict[str, Any]], out_dir: pathlib.Path
+) -> Dict[str, int]:
+    """Writes one small table: the hand-written records, then the synthetic rows."""
+    handwritten, generate = TABLES[name]
+    # 手寫的示範資料永遠在前面，Agent 的範例問題（CU002 等）照樣能用
+    rows: Iterable[Dict[str, Any]] = handwritten
+    if plan is not None:
+        rows = itertools.chain(handwritten, generate(plan))
+    return {name: wjsonl(name, rows, out_dir)}
+
+
+def write_order_shard(
+    plan: Optional[Dict[str, Any]], shard: int, shards: int, out_dir: pathlib.Path
+) -> Dict[str, int]:
+    """
+    Writes the orders and order lines of one shard in a single pass.
+
+    Shard k holds orders k*n/shards .. (k+1)*n/shards-1 and its random stream
+    is seeded from that range, so the same --seed and --shards give the same
+    files whatever the number of workers. Shard 0 also holds the hand-written
+    records.
+    """
+    orders_name = shard_name("orders", shard, shards)
+    lines_name = shard_name("order_lines", shard, shards)
+    counts = {orders_name: 0, lines_name: 0}
+    with (
+        (out_dir / orders_name).open("w", encoding="utf-8") as orders_file,
+        (out_dir / lines_name).open("w", encoding="utf-8") as lines_file,
+    ):
+        if shard == 0:
+            counts[orders_name] += _write_rows(orders_file, orders)
+            counts[lines_name] += _write_rows(lines_file, order_lines)
+        if plan is not None:
+            total = plan["orders"]
+            start, stop = shard * total // shards, (shard + 1) * total // shards
+            for order, lines in gen_orders_with_lines(plan, start, stop):
+                counts[orders_name] += _write_rows(orders_file, (order,))
+                counts[lines_name] += _write_rows(lines_file, lines)
+    return counts
+
+
+# 每個 worker 行程只收一次 plan（幾個大 list），不必隨每個任務 pickle
+_worker_plan: Dict[str, Any] = {}
+
+
+def _init_worker(plan: Optional[Dict[str, Any]]):
+    _worker_plan["plan"] = plan
+
+
+def _run_task(task: Tuple[str, Any, int, pathlib.Path]) -> Dict[str, int]:
+    kind, arg, shards, out_dir = task
+    plan = _worker_plan["plan"]
+    if kind == "table":
+        return write_table(arg, plan, out_dir)
+    return write_order_shard(plan, arg, shards, out_dir)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    base_dir = args.out
+    if base_dir.exists():
+        shutil.rmtree(base_dir)
+    base_dir.mkdir(parents=True, exist_ok=True)
+
+    plan = build_plan(args.scale, args.seed) if args.scale > 0 else None
+    shards = max(1, args.shards or args.workers) if plan is not None else 1
+    tasks = [("orders", shard, shards, base_dir) for shard in range(shards)]
+    tasks += [("table", name, shards, base_dir) for name in TABLES]
+
+    start = time.perf_counter()
+    counts: Dict[str, int] = {}
+    if args.workers > 1:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=args.workers, initializer=_init_worker, initargs=(plan,)
+        ) as pool:
+            for result in pool.map(_run_task, tasks):
+                counts.update(result)
+    else:
+        _init_worker(plan)
+        for task in tasks:
+            counts.update(_run_task(task))
+    seconds = time.perf_counter() - start
+    if plan is not None:
+        for name in sorted(counts):
+            print(f"✅  {name}: {counts[name]:,} rows")
+        total = sum(counts.values())
+        print(
+            f"📦 {total:,} rows in {seconds:.1f}s ({total / seconds:,.0f} rows/s, "
+            f"{shards} shard(s), {args.workers} worker(s))."
+        )
+
+    (base_dir / "schema.yaml").write_text(SCHEMA, encoding="utf-8")
+
+    print("Sample CRM SQLite data prepared at", base_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,31 +3,37 @@
 # Exit immediately if a command exits with a non-zero status.
 set -e
 
-# Run data generation and loading scripts
-echo "Generating sample data..."
-python scripts/make_samples.py
-echo "Loading data into SQLite..."
-python scripts/load_to_sql.py
-
 # Define paths
 SQL_MCP_DIR="sql_mcp"
 SQL_MCP_DATA_DIR="$SQL_MCP_DIR/data"
-SOURCE_DB_FILE="erp_demo.db"
+TARGET_DB_FILE="$SQL_MCP_DATA_DIR/erp_demo.db"
 SOURCE_SCHEMA_FILE="data/schema.yaml" # Assuming schema.yaml is in the root data directory
 
 # Create sql_mcp/data directory if it doesn't exist
 echo "Setting up sql_mcp data directory..."
 mkdir -p "$SQL_MCP_DATA_DIR"
 
-# Move database and copy schema
-echo "Moving database file to $SQL_MCP_DATA_DIR/$SOURCE_DB_FILE"
-mv "$SOURCE_DB_FILE" "$SQL_MCP_DATA_DIR/"
+# Run data generation and loading scripts
+echo "Generating sample data..."
+python scripts/make_samples.py
+
+# The loader builds a temp file next to the target and renames it into place;
+# a running sql_mcp.server switches to the new file on its next tool call.
+# Extra arguments (e.g. --incremental, --fast) are passed through.
+echo "Loading data into SQLite..."
+python scripts/load_to_sql.py --db "$TARGET_DB_FILE" "$@"
 
+# Copy the schema right after the new database is renamed into place (via a
+# temp file + rename, so it is never half written). The server's catalog is
+# stamped with both the database file and schema.yaml's mtime, so a call that
+# lands between the two renames is redescribed once the schema arrives. A
+# failed load leaves both the old database and the old schema in place.
 if [ -f "$SOURCE_SCHEMA_FILE" ]; then
     echo "Copying schema file to $SQL_MCP_DATA_DIR/schema.yaml"
-    cp "$SOURCE_SCHEMA_FILE" "$SQL_MCP_DATA_DIR/"
+    cp "$SOURCE_SCHEMA_FILE" "$SQL_MCP_DATA_DIR/.schema.yaml.tmp"
+    mv "$SQL_MCP_DATA_DIR/.schema.yaml.tmp" "$SQL_MCP_DATA_DIR/schema.yaml"
 else
     echo "Warning: Schema file $SOURCE_SCHEMA_FILE not found. Skipping copy."
 fi
 
-echo "SQL MCP database setup complete in $SQL_MCP_DATA_DIR" 
\ No newline at end of file
+echo "SQL MCP database setup complete in $SQL_MCP_DATA_DIR"
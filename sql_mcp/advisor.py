@@ -0,0 +1,641 @@
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Index advisor for the SQLite database behind the MCP server.
+
+Runs EXPLAIN QUERY PLAN on SELECT statements, reports full table scans and
+temporary B-tree sorts, and recommends CREATE INDEX statements for the columns
+the statements filter, join and sort on. Given a workload file, the CLI also
+measures every recommendation on a scratch copy of the database:
+
+    python -m sql_mcp.advisor --db sql_mcp/data/erp_demo.db --workload workload.jsonl
+
+A workload file holds one JSON object per line, {"query": "...", "params":
+{...}, "count": N}; 'params' and 'count' (the query's weight) are optional.
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache import normalize_sql
+
+# SQLite >= 3.36 prints 'SCAN o'; older releases print 'SCAN TABLE Orders AS o'.
+_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\S+)(?: AS \S+)?$")
+_AUTOMATIC_INDEX_RE = re.compile(
+    r"^SEARCH (?:TABLE )?(\S+)(?: AS \S+)? USING AUTOMATIC (?:PARTIAL )?"
+    r"(?:COVERING )?INDEX \(([^)]*)\)"
+)
+_TEMP_BTREE_RE = re.compile(r"^USE TEMP B-TREE FOR (.+)$")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_]\w*")
+_SOURCE_RE = re.compile(
+    r"(?:\bFROM\b|\bJOIN\b|,)\s*([A-Za-z_]\w*)(?:\s+(?:AS\s+)?([A-Za-z_]\w*))?",
+    re.IGNORECASE,
+)
+_CLAUSE_RE = re.compile(
+    r"\b(WHERE|ON|GROUP\s+BY|ORDER\s+BY|HAVING|LIMIT|JOIN|UNION|EXCEPT|INTERSECT)\b",
+    re.IGNORECASE,
+)
+_COLUMN_REF = r"(?:([A-Za-z_]\w*)\.)?([A-Za-z_]\w*)"
+_LEFT_PREDICATE_RE = re.compile(
+    _COLUMN_REF + r"\s*(==|=|<=|>=|<|>|\bIN\b|\bIS\b|\bBETWEEN\b)", re.IGNORECASE
+)
+_RIGHT_PREDICATE_RE = re.compile(
+    r"(==|=|<=|>=|<|>)\s*" + _COLUMN_REF + r"\b(?!\s*[.(])", re.IGNORECASE
+)
+_SORT_TERM_RE = re.compile(
+    r"^\s*" + _COLUMN_REF + r"(?:\s+COLLATE\s+\w+)?(?:\s+(?:ASC|DESC))?\s*$",
+    re.IGNORECASE,
+)
+_EQUALITY_OPS = ("=", "==", "IN", "IS")
+_NOT_AN_ALIAS = {
+    "WHERE", "JOIN", "ON", "LEFT", "RIGHT", "INNER", "OUTER", "CROSS", "NATURAL",
+    "FULL", "GROUP", "ORDER", "LIMIT", "HAVING", "USING", "UNION", "EXCEPT",
+    "INTERSECT", "WINDOW", "INDEXED", "NOT",
+}  # fmt: skip
+
+WorkloadItem = Dict[str, Any]
+
+
+def load_workload(path: Path) -> List[WorkloadItem]:
+    """Reads a JSONL workload file into {'query', 'params', 'count'} items."""
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not isinstance(record, dict) or not record.get("query"):
+                raise ValueError(
+                    f"{path}:{line_number}: expected an object with a 'query' key."
+                )
+            items.append(
+                {
+                    "query": record["query"],
+                    "params": record.get("params") or {},
+                    "count": int(record.get("count", 1)),
+                }
+            )
+    return items
+
+
+class QueryLog:
+    """
+    Bounded, thread-safe record of recently executed statements and how often
+    each ran; the default workload of the `recommend_indexes` tool.
+    """
+
+    def __init__(self, max_entries: int = 200):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, WorkloadItem]" = OrderedDict()
+
+    def record(self, query: str, params: Optional[Dict[str, Any]] = None) -> None:
+        if self.max_entries <= 0:
+            return
+        key = normalize_sql(query)
+        with self._lock:
+            entry = self._entries.pop(key, None) or {"query": key, "count": 0}
+            entry["params"] = dict(params or {})
+            entry["count"] += 1
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def workload(self) -> List[WorkloadItem]:
+        with self._lock:
+            return [dict(entry) for entry in self._entries.values()]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _quote(identifier: str) -> str:
+    if _IDENTIFIER_RE.fullmatch(identifier):
+        return identifier
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class _Schema:
+    """Lazily loaded columns and index keys of the tables in one SQLite database."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.tables = {
+            name.lower(): name
+            for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )
+        }
+        self._columns: Dict[str, Dict[str, str]] = {}
+        self._indexes: Dict[str, List[Tuple[str, ...]]] = {}
+
+    def resolve(self, name: str) -> Optional[str]:
+        return self.tables.get(name.lower())
+
+    def columns(self, table: str) -> Dict[str, str]:
+        """Maps the lower-cased column names of `table` to their actual casing."""
+        if table not in self._columns:
+            rows = self.conn.execute(
+                "SELECT name FROM pragma_table_info(?)", (table,)
+            ).fetchall()
+            self._columns[table] = {name.lower(): name for (name,) in rows}
+        return self._columns[table]
+
+    def indexes(self, table: str) -> List[Tuple[str, ...]]:
+        """Returns the lower-cased key columns of every index on `table`."""
+        if table not in self._indexes:
+            keys = []
+            pk = self.conn.execute(
+                "SELECT name, type FROM pragma_table_info(?) WHERE pk > 0", (table,)
+            ).fetchall()
+            if len(pk) == 1 and pk[0][1].upper() == "INTEGER":
+                # An INTEGER PRIMARY KEY is the rowid, which is always indexed.
+                keys.append((pk[0][0].lower(),))
+            for (index_name,) in self.conn.execute(
+                "SELECT name FROM pragma_index_list(?)", (table,)
+            ).fetchall():
+                key = self.conn.execute(
+                    "SELECT name FROM pragma_index_info(?) ORDER BY seqno",
+                    (index_name,),
+                ).fetchall()
+                keys.append(tuple((name or "").lower() for (name,) in key))
+            self._indexes[table] = keys
+        return self._indexes[table]
+
+    def is_indexed(self, table: str, columns: List[str]) -> bool:
+        """Reports whether an existing index has `columns` as its leading keys."""
+        wanted = tuple(column.lower() for column in columns)
+        return any(key[: len(wanted)] == wanted for key in self.indexes(table))
+
+
+def explain(
+    conn: sqlite3.Connection, query: str, params: Optional[Dict[str, Any]] = None
+) -> List[str]:
+    """Returns the EXPLAIN QUERY PLAN detail lines of `query`."""
+    # Plans do not depend on the bound values; unbound names are planned as NULL.
+    bind = defaultdict(lambda: None, params or {})
+    # EXPLAIN programs never check the schema cookie, so a plan held in the
+    # driver's statement cache would outlive a CREATE INDEX; key it on the version.
+    version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    rows = conn.execute(
+        f"EXPLAIN QUERY PLAN /* schema {version} */ {normalize_sql(query)}", bind
+    ).fetchall()
+    return [row[3] for row in rows]
+
+
+def _sources(sql: str, schema: _Schema) -> Dict[str, str]:
+    """Maps every table name and alias in the FROM/JOIN lists to its table."""
+    sources = {}
+    for match in _SOURCE_RE.finditer(sql):
+        table = schema.resolve(match.group(1))
+        if table is None:
+            continue
+        sources[table.lower()] = table
+        alias = match.group(2)
+        if alias and alias.upper() not in _NOT_AN_ALIAS:
+            sources[alias.lower()] = table
+    return sources
+
+
+def _clauses(sql: str) -> List[Tuple[str, str]]:
+    """Splits SQL into (keyword, body) segments at clause keywords."""
+    matches = list(_CLAUSE_RE.finditer(sql))
+    clauses = []
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(sql)
+        clauses.append(
+            (" ".join(match.group(1).upper().split()), sql[match.end() : end])
+        )
+    return clauses
+
+
+def _owner(
+    qualifier: Optional[str], column: str, sources: Dict[str, str], schema: _Schema
+) -> Optional[Tuple[str, str]]:
+    """Resolves a (possibly qualified) column reference to (table, column)."""
+    if qualifier:
+        table = sources.get(qualifier.lower())
+        actual = schema.columns(table).get(column.lower()) if table else None
+        return (table, actual) if actual else None
+    owners = [t for t in set(sources.values()) if column.lower() in schema.columns(t)]
+    if len(owners) != 1:
+        return None
+    return owners[0], schema.columns(owners[0])[column.lower()]
+
+
+def _column_usage(
+    sql: str, sources: Dict[str, str], schema: _Schema
+) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Collects, per table, the columns used in equality predicates ('eq'), range
+    predicates ('range'), and the GROUP BY ('group') and ORDER BY ('order') keys.
+    """
+    usage: Dict[str, Dict[str, List[str]]] = defaultdict(
+        lambda: {"eq": [], "range": [], "group": [], "order": []}
+    )
+
+    def add(kind: str, qualifier: Optional[str], column: str) -> None:
+        owner = _owner(qualifier, column, sources, schema)
+        if owner and owner[1] not in usage[owner[0]][kind]:
+            usage[owner[0]][kind].append(owner[1])
+
+    for keyword, body in _clauses(sql):
+        if keyword in ("WHERE", "ON"):
+            for match in _LEFT_PREDICATE_RE.finditer(body):
+                op = match.group(3).upper()
+                add("eq" if op in _EQUALITY_OPS else "range", *match.group(1, 2))
+            for match in _RIGHT_PREDICATE_RE.finditer(body):
+                op = match.group(1)
+                add("eq" if op in _EQUALITY_OPS else "range", *match.group(2, 3))
+        elif keyword in ("GROUP BY", "ORDER BY"):
+            owners = []
+            for term in body.split(","):
+                match = _SORT_TERM_RE.match(term)
+                owners.append(
+                    _owner(*match.group(1, 2), sources, schema) if match else None
+                )
+            # An index only avoids the sort if every key comes from one table.
+            if owners and all(owners) and len({t for t, _ in owners}) == 1:
+                kind = "group" if keyword == "GROUP BY" else "order"
+                for table, column in owners:
+                    if column not in usage[table][kind]:
+                        usage[table][kind].append(column)
+    return usage
+
+
+def _index_columns(
+    usage: Dict[str, List[str]], sort_key: Optional[str] = None
+) -> List[str]:
+    """Orders index keys: equality columns, then sort keys, else one range column."""
+    columns = list(usage["eq"])
+    sort = usage[sort_key] if sort_key else (usage["order"] or usage["group"])
+    tail = [c for c in sort if c not in columns]
+    if not tail:
+        tail = [c for c in usage["range"] if c not in columns][:1]
+    return columns + tail
+
+
+def analyze_query(
+    conn: sqlite3.Connection,
+    query: str,
+    params: Optional[Dict[str, Any]] = None,
+    schema: Optional[_Schema] = None,
+) -> Dict[str, Any]:
+    """
+    Explains one query and lists its plan problems and candidate indexes.
+
+    Returns:
+        A dictionary with 'query', 'plan' (detail lines), 'issues' (one
+        dictionary per full scan, automatic index or temp B-tree, with 'type'
+        and 'detail') and 'candidates' ({'table', 'columns', 'reason'}).
+    """
+    schema = schema or _Schema(conn)
+    plan = explain(conn, query, params)
+    sql = _STRING_RE.sub("''", normalize_sql(query))
+    sources = _sources(sql, schema)
+    usage = _column_usage(sql, sources, schema)
+    tables = set(sources.values())
+    issues: List[Dict[str, Any]] = []
+    candidates: List[Dict[str, Any]] = []
+
+    def table_of(name: str) -> Optional[str]:
+        return sources.get(name.lower()) or schema.resolve(name)
+
+    for detail in plan:
+        scan = _SCAN_RE.match(detail)
+        automatic = _AUTOMATIC_INDEX_RE.match(detail)
+        temp_btree = _TEMP_BTREE_RE.match(detail)
+        if scan and table_of(scan.group(1)):
+            table = table_of(scan.group(1))
+            issues.append({"type": "full_scan", "table": table, "detail": detail})
+            columns = _index_columns(usage[table]) if table in usage else []
+            reason = f"full scan of {table}"
+        elif automatic and table_of(automatic.group(1)):
+            # SQLite builds a throwaway index on every execution; make it permanent.
+            table = table_of(automatic.group(1))
+            issues.append({"type": "automatic_index", "table": table, "detail": detail})
+            columns = [
+                schema.columns(table).get(c.lower(), c)
+                for c in re.findall(r"(\w+)\s*[=<>]", automatic.group(2))
+            ]
+            reason = f"automatic index on {table}"
+        elif temp_btree:
+            purpose = temp_btree.group(1)
+            issues.append({"type": "temp_btree", "purpose": purpose, "detail": detail})
+            sort_key = {"GROUP BY": "group", "ORDER BY": "order"}.get(purpose)
+            if len(tables) != 1 or sort_key is None:
+                continue
+            table = next(iter(tables))
+            if table not in usage or not usage[table][sort_key]:
+                continue
+            columns = _index_columns(usage[table], sort_key)
+            reason = f"temp B-tree for {purpose}"
+        else:
+            continue
+        if columns:
+            candidates.append({"table": table, "columns": columns, "reason": reason})
+
+    return {
+        "query": normalize_sql(query),
+        "plan": plan,
+        "issues": issues,
+        "candidates": candidates,
+    }
+
+
+def index_name(table: str, columns: List[str]) -> str:
+    return "idx_" + "_".join([table, *columns])
+
+
+def recommend_indexes(
+    conn: sqlite3.Connection, workload: List[WorkloadItem]
+) -> Dict[str, Any]:
+    """
+    Analyzes a workload and merges its candidate indexes into recommendations.
+
+    Candidates already served by an existing index (same leading columns) are
+    dropped. Recommendations are ordered by 'weight', the summed 'count' of
+    the queries that would use them; an index whose columns lead a longer
+    recommendation on the same table is merged into it.
+
+    Returns:
+        A dictionary with 'queries' (per-query analysis, or 'error') and
+        'recommendations' ({'table', 'columns', 'name', 'sql', 'reasons',
+        'queries', 'weight'}).
+    """
+    schema = _Schema(conn)
+    analyses = []
+    recommendations: "OrderedDict[Tuple[str, Tuple[str, ...]], Dict[str, Any]]" = (
+        OrderedDict()
+    )
+    for item in workload:
+        count = item.get("count", 1)
+        try:
+            analysis = analyze_query(conn, item["query"], item.get("params"), schema)
+        except sqlite3.Error as e:
+            analyses.append({"query": item["query"], "count": count, "error": str(e)})
+            continue
+        analysis["count"] = count
+        analyses.append(analysis)
+        for candidate in analysis.pop("candidates"):
+            table, columns = candidate["table"], candidate["columns"]
+            if schema.is_indexed(table, columns):
+                continue
+            key = (table, tuple(c.lower() for c in columns))
+            rec = recommendations.get(key)
+            if rec is None:
+                name = index_name(table, columns)
+                rec = recommendations[key] = {
+                    "table": table,
+                    "columns": columns,
+                    "name": name,
+                    "sql": f"CREATE INDEX IF NOT EXISTS {_quote(name)} ON "
+                    f"{_quote(table)} ({', '.join(_quote(c) for c in columns)})",
+                    "reasons": [],
+                    "_queries": {},
+                }
+            if candidate["reason"] not in rec["reasons"]:
+                rec["reasons"].append(candidate["reason"])
+            rec["_queries"][len(analyses)] = count
+    return {
+        "queries": analyses,
+        "recommendations": _merge_prefixes(list(recommendations.values())),
+    }
+
+
+def _merge_prefixes(recommendations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Folds each recommendation into a longer one on the same table that starts
+    with the same columns, since that index serves both, and fills in
+    'queries' and 'weight'.
+    """
+    merged = []
+    for rec in sorted(recommendations, key=lambda r: len(r["columns"]), reverse=True):
+        prefix = [c.lower() for c in rec["columns"]]
+        target = next(
+            (
+                m
+                for m in merged
+                if m["table"] == rec["table"]
+                and [c.lower() for c in m["columns"][: len(prefix)]] == prefix
+            ),
+            None,
+        )
+        if target is None:
+            merged.append(rec)
+            continue
+        target["reasons"] += [r for r in rec["reasons"] if r not in target["reasons"]]
+        target["_queries"].update(rec["_queries"])
+    for rec in merged:
+        query_counts = rec.pop("_queries")
+        rec["queries"] = len(query_counts)
+        rec["weight"] = sum(query_counts.values())
+    return sorted(merged, key=lambda r: r["weight"], reverse=True)
+
+
+def _time_query(conn: sqlite3.Connection, item: WorkloadItem, repeat: int) -> float:
+    """Returns the median wall time of `item` over `repeat` runs, in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(item["query"], item.get("params") or {}).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def _weighted_ms(workload: List[WorkloadItem], timings: List[float]) -> float:
+    return sum(item.get("count", 1) * ms for item, ms in zip(workload, timings))
+
+
+def estimate_benefits(
+    db_path: Path,
+    workload: List[WorkloadItem],
+    recommendations: List[Dict[str, Any]],
+    repeat: int = 5,
+) -> Dict[str, Any]:
+    """
+    Measures each recommendation against the workload on a scratch copy of the database.
+
+    The database is copied with SQLite's backup API, so the original file is
+    never written. Each index is created alone, the queries on its table are
+    re-timed, and the index is dropped again; a 'benefit' dictionary with
+    'build_ms', 'workload_ms_before', 'workload_ms_after' and 'saved_pct' is
+    added to every recommendation in place. Workload times are weighted by 'count'.
+    Queries that cannot run, e.g. because their parameters are missing from the
+    workload, are left out of the timings.
+
+    Returns:
+        A summary with the workload time before and with all indexes applied,
+        plus 'skipped_queries'.
+    """
+    source = sqlite3.connect(
+        f"file:{Path(db_path).resolve().as_posix()}?mode=ro", uri=True
+    )
+    with tempfile.TemporaryDirectory(prefix="sql-mcp-advisor-") as temp_dir:
+        scratch = sqlite3.connect(Path(temp_dir) / "scratch.db")
+        try:
+            source.backup(scratch)
+            source.close()
+            timed, baseline, skipped = [], [], []
+            for item in workload:
+                try:
+                    baseline.append(_time_query(scratch, item, repeat))
+                    timed.append(item)
+                except sqlite3.Error as e:
+                    skipped.append({"query": item["query"], "error": str(e)})
+            workload = timed
+            before = _weighted_ms(workload, baseline)
+            for rec in recommendations:
+                start = time.perf_counter()
+                scratch.execute(rec["sql"])
+                build_ms = (time.perf_counter() - start) * 1000
+                timings = [
+                    (
+                        _time_query(scratch, item, repeat)
+                        if rec["table"].lower() in item["query"].lower()
+                        else base
+                    )
+                    for item, base in zip(workload, baseline)
+                ]
+                scratch.execute(f"DROP INDEX {_quote(rec['name'])}")
+                after = _weighted_ms(workload, timings)
+                rec["benefit"] = {
+                    "build_ms": round(build_ms, 2),
+                    "workload_ms_before": round(before, 2),
+                    "workload_ms_after": round(after, 2),
+                    "saved_pct": (
+                        round(100 * (before - after) / before, 1) if before else 0.0
+                    ),
+                }
+            for rec in recommendations:
+                scratch.execute(rec["sql"])
+            after = _weighted_ms(
+                workload, [_time_query(scratch, item, repeat) for item in workload]
+            )
+        finally:
+            scratch.close()
+    return {
+        "workload_ms_before": round(before, 2),
+        "workload_ms_with_all": round(after, 2),
+        "saved_pct": round(100 * (before - after) / before, 1) if before else 0.0,
+        "skipped_queries": skipped,
+    }
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    for analysis in report["queries"]:
+        if analysis.get("error"):
+            print(f"! {analysis['query']}\n    error: {analysis['error']}")
+        elif analysis["issues"]:
+            print(f"* {analysis['query']}  (x{analysis['count']})")
+            for issue in analysis["issues"]:
+                print(f"    {issue['type']}: {issue['detail']}")
+    if not report["recommendations"]:
+        print("\nNo new indexes recommended.")
+        return
+    print("\nRecommended indexes:")
+    for rec in report["recommendations"]:
+        print(f"  {rec['sql']};")
+        print(
+            f"      {rec['queries']} queries, weight {rec['weight']}: "
+            f"{'; '.join(rec['reasons'])}"
+        )
+        benefit = rec.get("benefit")
+        if benefit:
+            print(
+                f"      workload {benefit['workload_ms_before']:.1f} ms -> "
+                f"{benefit['workload_ms_after']:.1f} ms ({benefit['saved_pct']}% saved), "
+                f"build {benefit['build_ms']:.0f} ms"
+            )
+    summary = report.get("summary")
+    if summary:
+        print(
+            f"\nAll indexes: workload {summary['workload_ms_before']:.1f} ms -> "
+            f"{summary['workload_ms_with_all']:.1f} ms ({summary['saved_pct']}% saved)"
+        )
+        for skipped in summary["skipped_queries"]:
+            print(f"  not timed: {skipped['query']} ({skipped['error']})")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("queries", nargs="*", help="SELECT statements to analyze.")
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=Path(__file__).parent / "data" / "erp_demo.db",
+        help="SQLite database (default: sql_mcp/data/erp_demo.db).",
+    )
+    parser.add_argument("--workload", type=Path, help="JSONL workload file.")
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Timed runs per query when estimating."
+    )
+    parser.add_argument(
+        "--no-estimate",
+        action="store_true",
+        help="Skip benefit estimation for --workload.",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args(argv)
+
+    workload = load_workload(args.workload) if args.workload else []
+    workload += [{"query": q, "params": {}, "count": 1} for q in args.queries]
+    if not workload:
+        parser.error("give queries to analyze or a --workload file")
+    if not args.db.exists():
+        parser.error(f"database not found: {args.db}")
+
+    conn = sqlite3.connect(f"file:{args.db.resolve().as_posix()}?mode=ro", uri=True)
+    try:
+        report = recommend_indexes(conn, workload)
+    finally:
+        conn.close()
+    if args.workload and not args.no_estimate and report["recommendations"]:
+        runnable = [
+            item
+            for item, analysis in zip(workload, report["queries"])
+            if not analysis.get("error")
+        ]
+        report["summary"] = estimate_benefits(
+            args.db, runnable, report["recommendations"], args.repeat
+        )
+        report["recommendations"].sort(
+            key=lambda r: r["benefit"]["workload_ms_before"]
+            - r["benefit"]["workload_ms_after"],
+            reverse=True,
+        )
+
+    if args.json:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        _print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+# Approximate per-row overhead of a tuple in the cache, in bytes.
+_ROW_OVERHEAD = sys.getsizeof(())
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Collapses runs of whitespace outside quoted strings and drops a trailing ';'.
+
+    Letter case is preserved: SQLite reports result column names as written,
+    so 'SELECT orderid' and 'SELECT OrderID' are different results.
+    """
+    out: List[str] = []
+    quote: Optional[str] = None
+    pending_space = False
+    for ch in query.strip().rstrip(";").strip():
+        if quote:
+            out.append(ch)
+            if ch == quote:
+                quote = None
+            continue
+        if ch.isspace():
+            pending_space = True
+            continue
+        if pending_space and out:
+            out.append(" ")
+        pending_space = False
+        if ch in ("'", '"', "`", "["):
+            quote = "]" if ch == "[" else ch
+        out.append(ch)
+    return "".join(out)
+
+
+def freeze_params(params: Optional[Dict[str, Any]]) -> Tuple[Tuple[str, Any], ...]:
+    """Returns a hashable, order-independent form of bound parameters."""
+    if not params:
+        return ()
+    return tuple(sorted((key, repr(value)) for key, value in params.items()))
+
+
+def estimate_result_size(columns: List[str], rows: List[tuple]) -> int:
+    """Approximates the memory held by a cached (columns, rows) result, in bytes."""
+    size = sys.getsizeof(rows) + sum(sys.getsizeof(c) for c in columns)
+    for row in rows:
+        size += _ROW_OVERHEAD + 8 * len(row)
+        for value in row:
+            size += sys.getsizeof(value)
+    return size
+
+
+class ResultCache:
+    """
+    LRU cache of query results bounded by approximate memory size.
+
+    Entries are tagged with a database stamp (see `server._database_stamp`);
+    when a lookup sees a different stamp the whole cache is dropped, so results
+    never outlive the database file they were read from.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_fraction: float = 0.25):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = int(max_bytes * max_entry_fraction)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._stamp: Any = None
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: Hashable, stamp: Any) -> Optional[Any]:
+        """Returns the cached value for `key`, or None on a miss."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._check_stamp(stamp)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int, stamp: Any) -> bool:
+        """Stores `value`; returns False if it is too large to cache."""
+        if not self.enabled or size > self.max_entry_bytes:
+            return False
+        with self._lock:
+            self._check_stamp(stamp)
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._drop_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _check_stamp(self, stamp: Any) -> None:
+        if stamp != self._stamp:
+            if self._entries:
+                self.invalidations += 1
+            self._drop_all()
+            self._stamp = stamp
+
+    def _drop_all(self) -> None:
+        self._entries.clear()
+        self.current_bytes = 0
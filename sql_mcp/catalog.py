@@ -0,0 +1,266 @@
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+# System schemas that never hold user tables.
+POSTGRES_SYSTEM_SCHEMAS = (
+    "pg_catalog",
+    "information_schema",
+    "pg_toast",
+    "pg_temp_1",
+    "pg_toast_temp_1",
+)
+
+# Shadow tables that SQLite creates alongside every FTS5 virtual table.
+FTS5_SHADOW_SUFFIXES = ("_data", "_idx", "_content", "_docsize", "_config")
+# Bookkeeping tables written by scripts/load_to_sql.py, not business data.
+LOADER_TABLES = ("_load_manifest",)
+_FTS5_CONTENT_RE = re.compile(r"content\s*=\s*['\"]?([^'\",\s)]+)", re.IGNORECASE)
+
+
+def load_yaml_tables(schema_path: Path) -> Dict[str, Any]:
+    """Returns the 'tables' mapping of schema.yaml, or {} if it is missing or invalid."""
+    try:
+        with open(schema_path, "r", encoding="utf-8") as f:
+            schema_data = yaml.safe_load(f) or {}
+        return schema_data.get("tables", {}) or {}
+    except Exception as e:
+        # If schema.yaml is not found or is invalid, proceed without it.
+        # stdout carries the MCP stdio protocol.
+        print(f"Could not load or parse {schema_path}: {e}", file=sys.stderr)
+        return {}
+
+
+class CatalogSnapshot:
+    """
+    An immutable view of the database schema at one point in time.
+
+    Attributes:
+        tables: One dictionary per user table, in inspection order, with
+            'schema_name', 'table_name', 'description', 'columns', 'indexes'
+            and 'foreign_keys'.
+        fts_indexes: Maps a lower-cased content table name to the FTS5 table
+            that indexes it (SQLite only).
+    """
+
+    def __init__(
+        self,
+        tables: List[Dict[str, Any]],
+        fts_indexes: Optional[Dict[str, str]] = None,
+    ):
+        self.tables = tables
+        self.fts_indexes = fts_indexes or {}
+        self._by_lower_name = {t["table_name"].lower(): t for t in tables}
+
+    def resolve(self, table_name: str) -> Optional[str]:
+        """Returns the actual casing of `table_name` in the database, or None if absent."""
+        table = self._by_lower_name.get(table_name.lower())
+        return table["table_name"] if table else None
+
+    def table(self, table_name: str) -> Optional[Dict[str, Any]]:
+        """Returns the catalog entry of `table_name` (case-insensitive), or None if absent."""
+        return self._by_lower_name.get(table_name.lower())
+
+    def fts_index(self, table_name: str) -> Optional[str]:
+        """Returns the FTS5 table indexing `table_name`, or None if there is none."""
+        return self.fts_indexes.get(table_name.lower())
+
+
+class SchemaCatalog:
+    """
+    Process-wide cache of table metadata shared by all MCP tools.
+
+    The catalog is built on first use and rebuilt only when schema.yaml's mtime
+    or SQLite's `PRAGMA schema_version` changes, so the per-call cost is a
+    `stat()` and a single pragma instead of a YAML parse plus a full
+    SQLAlchemy inspection.
+    """
+
+    def __init__(self, schema_path: Path):
+        self.schema_path = Path(schema_path)
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._stamp: Optional[Tuple[Any, ...]] = None
+
+    def get(self, engine: Engine) -> CatalogSnapshot:
+        """Returns the current snapshot, rebuilding it if the schema has changed."""
+        stamp = self._current_stamp(engine)
+        snapshot = self._snapshot
+        if snapshot is not None and stamp == self._stamp:
+            return snapshot
+        with self._lock:
+            # Another thread may have rebuilt the snapshot while we waited.
+            if self._snapshot is not None and stamp == self._stamp:
+                return self._snapshot
+            snapshot = self._build(engine)
+            self._snapshot, self._stamp = snapshot, stamp
+            return snapshot
+
+    def invalidate(self) -> None:
+        """Drops the cached snapshot; the next `get()` rebuilds it."""
+        with self._lock:
+            self._snapshot, self._stamp = None, None
+
+    def _current_stamp(self, engine: Engine) -> Tuple[Any, ...]:
+        try:
+            yaml_mtime = self.schema_path.stat().st_mtime_ns
+        except OSError:
+            yaml_mtime = None
+        schema_version = None
+        if engine.name == "sqlite":
+            with engine.connect() as conn:
+                schema_version = conn.exec_driver_sql("PRAGMA schema_version").scalar()
+        # A swapped-in database file gets a new engine and may reuse the old
+        # schema_version, so the engine is part of the stamp too.
+        return (engine, yaml_mtime, schema_version)
+
+    def _build(self, engine: Engine) -> CatalogSnapshot:
+        yaml_tables = load_yaml_tables(self.schema_path)
+        inspector = inspect(engine)
+        tables: List[Dict[str, Any]] = []
+        fts_indexes: Dict[str, str] = {}
+        hidden_tables = set(LOADER_TABLES)
+        if engine.name == "sqlite":
+            fts_indexes = self._sqlite_fts_indexes(engine)
+            # FTS5 virtual tables and their shadow tables are search
+            # infrastructure, not user tables.
+            for fts_table in fts_indexes.values():
+                hidden_tables.add(fts_table)
+                hidden_tables.update(
+                    f"{fts_table}{suffix}" for suffix in FTS5_SHADOW_SUFFIXES
+                )
+
+        # Get all schema names. For SQLite, this will usually just be ['main'].
+        # For PostgreSQL, it can include 'public' and user-defined schemas.
+        for schema in inspector.get_schema_names():
+            if engine.name == "postgresql" and schema in POSTGRES_SYSTEM_SCHEMAS:
+                continue
+            if engine.name == "sqlite" and schema != "main":
+                continue
+
+            for table_name in inspector.get_table_names(schema=schema):
+                if table_name in hidden_tables:
+                    continue
+                yaml_columns = yaml_tables.get(table_name, {}).get("columns", {}) or {}
+                columns = [
+                    {
+                        "name": col["name"],
+                        "type": str(col["type"]),
+                        "nullable": col.get("nullable", True),
+                        "primary_key": bool(col.get("primary_key")),
+                        "description": (yaml_columns.get(col["name"]) or {}).get(
+                            "description"
+                        ),
+                    }
+                    for col in inspector.get_columns(table_name, schema=schema)
+                ]
+                tables.append(
+                    {
+                        "schema_name": schema,
+                        "table_name": table_name,
+                        "description": self._describe(
+                            engine, schema, table_name, yaml_tables
+                        ),
+                        "columns": columns,
+                        "indexes": self._indexes(inspector, schema, table_name),
+                        "foreign_keys": [
+                            {
+                                "columns": fk["constrained_columns"],
+                                "references_table": fk["referred_table"],
+                                "references_columns": fk["referred_columns"],
+                            }
+                            for fk in inspector.get_foreign_keys(
+                                table_name, schema=schema
+                            )
+                        ],
+                    }
+                )
+        return CatalogSnapshot(tables, fts_indexes)
+
+    @staticmethod
+    def _indexes(inspector, schema: str, table_name: str) -> List[Dict[str, Any]]:
+        """Lists secondary indexes and UNIQUE constraints; primary keys are in 'columns'."""
+        indexes = [
+            {
+                "name": index["name"],
+                "columns": index["column_names"],
+                "unique": bool(index["unique"]),
+            }
+            for index in inspector.get_indexes(table_name, schema=schema)
+        ]
+        indexed = {(tuple(i["columns"]), i["unique"]) for i in indexes}
+        for constraint in inspector.get_unique_constraints(table_name, schema=schema):
+            if (tuple(constraint["column_names"]), True) not in indexed:
+                indexes.append(
+                    {
+                        "name": constraint["name"],
+                        "columns": constraint["column_names"],
+                        "unique": True,
+                    }
+                )
+        return indexes
+
+    @staticmethod
+    def _sqlite_fts_indexes(engine: Engine) -> Dict[str, str]:
+        """Maps each external-content FTS5 table's content table to the FTS5 table."""
+        with engine.connect() as conn:
+            rows = conn.exec_driver_sql(
+                "SELECT name, sql FROM sqlite_master "
+                "WHERE type = 'table' AND sql LIKE 'CREATE VIRTUAL TABLE%USING fts5%'"
+            ).all()
+        fts_indexes = {}
+        for name, sql in rows:
+            match = _FTS5_CONTENT_RE.search(sql or "")
+            if match and match.group(1):
+                fts_indexes[match.group(1).lower()] = name
+        return fts_indexes
+
+    @staticmethod
+    def _describe(
+        engine: Engine, schema: str, table_name: str, yaml_tables: Dict[str, Any]
+    ) -> str:
+        description = "No description available"
+        if engine.name == "postgresql":
+            # Table comments are more reliably supported in PostgreSQL
+            try:
+                comment_query = text(
+                    "SELECT obj_description(oid, 'pg_class') FROM pg_class WHERE relname = :table AND relnamespace = (SELECT oid FROM pg_namespace WHERE nspname = :schema)"
+                )
+                with engine.connect() as conn:
+                    result = conn.execute(
+                        comment_query, {"table": table_name, "schema": schema}
+                    ).scalar_one_or_none()
+                if result:
+                    description = result
+            except Exception:
+                # If getting comment fails, stick to the default
+                pass
+        elif engine.name == "sqlite":
+            if table_name in yaml_tables:
+                description = yaml_tables[table_name].get(
+                    "description",
+                    "Defined in schema.yaml; description pending.",
+                )
+            else:
+                description = "No description available (not in schema.yaml)"
+        return description
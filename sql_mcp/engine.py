@@ -0,0 +1,214 @@
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Union
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.pool import QueuePool
+
+# Read-path defaults for the server engine. Every key can be overridden with
+# the matching SQL_MCP_<KEY> environment variable (e.g. SQL_MCP_MMAP_SIZE).
+ENGINE_PROFILE_DEFAULTS: Dict[str, Any] = {
+    # 'rw' (plain file), 'ro' (mode=ro URI) or 'immutable' (immutable=1 URI;
+    # no locking or change detection, only for files nothing writes to).
+    "mode": "ro",
+    # PRAGMA query_only: reject writes even if the file is writable.
+    "query_only": True,
+    # PRAGMA mmap_size in bytes: serve reads from the OS page cache without copies.
+    "mmap_size": 256 * 1024 * 1024,
+    # PRAGMA cache_size in KiB of page cache per connection; 0 keeps SQLite's
+    # 2 MiB default. With mmap on, a larger cache mostly grows the sorter's
+    # in-memory runs, which made GROUP BY over OrderLines slower in
+    # benchmarks/bench_engine_profile.py.
+    "cache_size_kib": 0,
+    # PRAGMA temp_store: DEFAULT, FILE or MEMORY. MEMORY had the same effect as
+    # a larger cache on big sorts, so it is opt-in.
+    "temp_store": "DEFAULT",
+    # QueuePool size; matches the number of DB worker threads.
+    "pool_size": 4,
+    # Prepared statements the sqlite3 driver keeps per connection (Python's
+    # default is 128); repeated query shapes skip SQLite's parse and plan.
+    "cached_statements": 256,
+}
+
+ENGINE_MODES = ("rw", "ro", "immutable")
+# Byte offsets 18/19 of the SQLite header hold the file format versions; 2 means WAL.
+_SQLITE_HEADER_WAL = 2
+
+
+def engine_profile_from_env(**overrides: Any) -> Dict[str, Any]:
+    """Returns the engine profile: defaults, then SQL_MCP_* env vars, then `overrides`."""
+    profile = dict(ENGINE_PROFILE_DEFAULTS)
+    for key, default in ENGINE_PROFILE_DEFAULTS.items():
+        raw = os.environ.get(f"SQL_MCP_{key.upper()}")
+        if raw is None:
+            continue
+        if isinstance(default, bool):
+            profile[key] = raw.strip().lower() in ("1", "true", "yes", "on")
+        elif isinstance(default, int):
+            profile[key] = int(raw)
+        else:
+            profile[key] = raw.strip()
+    profile.update(overrides)
+    if profile["mode"] not in ENGINE_MODES:
+        raise ValueError(
+            f"Unknown engine mode '{profile['mode']}'. Use one of: {', '.join(ENGINE_MODES)}."
+        )
+    return profile
+
+
+def is_wal_database(db_path: Union[str, Path]) -> bool:
+    """Reports whether the SQLite file at `db_path` is in WAL journal mode."""
+    try:
+        with open(db_path, "rb") as f:
+            header = f.read(20)
+    except OSError:
+        return False
+    return len(header) == 20 and header[18] == _SQLITE_HEADER_WAL
+
+
+def sqlite_file_path(engine: Engine) -> Optional[str]:
+    """Returns the filesystem path behind a SQLite engine, or None for other engines."""
+    database = engine.url.database
+    if engine.name != "sqlite" or not database or database == ":memory:":
+        return None
+    if database.startswith("file:"):
+        database = database[len("file:") :]
+    return database
+
+
+def create_read_engine(
+    db_path: Union[str, Path], profile: Optional[Dict[str, Any]] = None
+) -> Engine:
+    """
+    Creates a SQLAlchemy engine tuned for the server's read-only workload.
+
+    Args:
+        db_path: Path to the SQLite database file.
+        profile: Engine profile (see ENGINE_PROFILE_DEFAULTS); defaults to
+            `engine_profile_from_env()`.
+
+    Returns:
+        An Engine whose connections apply the profile's pragmas on connect.
+    """
+    profile = profile or engine_profile_from_env()
+    db_path = Path(db_path).resolve()
+    mode = profile["mode"]
+    if mode == "immutable" and is_wal_database(db_path):
+        # immutable=1 skips the WAL file entirely and would serve stale pages.
+        # stdout carries the MCP stdio protocol.
+        print(
+            f"{db_path} is in WAL mode; using mode=ro instead of immutable.",
+            file=sys.stderr,
+        )
+        mode = "ro"
+
+    if mode == "rw":
+        url = f"sqlite:///{db_path}"
+    else:
+        flag = "mode=ro" if mode == "ro" else "immutable=1"
+        url = f"sqlite:///file:{db_path.as_posix()}?{flag}&uri=true"
+
+    engine = create_engine(
+        url,
+        connect_args={"cached_statements": profile["cached_statements"]},
+        poolclass=QueuePool,
+        pool_size=profile["pool_size"],
+        # Room for a catalog refresh while every worker holds a connection.
+        max_overflow=profile["pool_size"],
+        pool_pre_ping=False,
+    )
+
+    pragmas = [
+        f"PRAGMA mmap_size = {int(profile['mmap_size'])}",
+        f"PRAGMA temp_store = {profile['temp_store']}",
+    ]
+    if profile["cache_size_kib"]:
+        pragmas.append(f"PRAGMA cache_size = {-int(profile['cache_size_kib'])}")
+    if profile["query_only"]:
+        pragmas.append("PRAGMA query_only = ON")
+
+    @event.listens_for(engine, "connect")
+    def _apply_read_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    return engine
+
+
+class QueryGuard:
+    """
+    SQLite progress handler that enforces a wall-clock deadline and a budget of
+    virtual-machine instructions for one statement.
+
+    SQLite calls the guard every `interval` VM instructions; returning non-zero
+    makes the running statement fail with "interrupted", which leaves the
+    connection usable. After an interruption `reason` is 'deadline' or
+    'vm_budget'.
+    """
+
+    def __init__(
+        self,
+        timeout_ms: Optional[int],
+        max_vm_steps: Optional[int],
+        interval: int = 10_000,
+    ):
+        self.interval = interval
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout_ms / 1000 if timeout_ms else None
+        self.max_calls = max(1, max_vm_steps // interval) if max_vm_steps else None
+        self.calls = 0
+        self.reason: Optional[str] = None
+
+    def __call__(self) -> int:
+        self.calls += 1
+        if self.max_calls is not None and self.calls > self.max_calls:
+            self.reason = "vm_budget"
+            return 1
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.reason = "deadline"
+            return 1
+        return 0
+
+    @property
+    def elapsed_ms(self) -> int:
+        return int((time.monotonic() - self.started) * 1000)
+
+    @property
+    def vm_steps(self) -> int:
+        return self.calls * self.interval
+
+    @contextmanager
+    def installed(self, connection: Connection) -> Iterator["QueryGuard"]:
+        """Installs the guard on a SQLAlchemy connection for the duration of the block."""
+        raw = connection.connection.driver_connection
+        if not hasattr(raw, "set_progress_handler"):
+            yield self
+            return
+        raw.set_progress_handler(self, self.interval)
+        try:
+            yield self
+        finally:
+            # The connection goes back to the pool; never leave the handler on it.
+            raw.set_progress_handler(None, 0)
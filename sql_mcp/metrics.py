@@ -0,0 +1,371 @@
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+In-process metrics for the MCP tools: per-tool call counts, errors, rows and
+bytes returned, and latency histograms for the whole call and for each phase
+(validate, catalog, connect, execute, fetch, serialize).
+
+A tool call is opened with `ToolMetrics.call()`; code running inside it, also
+on the database thread pool as long as the context is copied there, marks its
+phases with the module-level `phase()` and reports rows with `add_rows()`.
+Outside a call both are no-ops. Response sizes are reported separately with
+`ToolMetrics.add_bytes()` by the layer that encodes the response, so nothing
+is serialized twice just to be measured.
+"""
+
+import contextlib
+import contextvars
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds of the latency buckets, in seconds (Prometheus convention).
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+PHASES = ("validate", "catalog", "connect", "execute", "fetch", "serialize")
+
+_NO_PHASE = contextlib.nullcontext()
+
+
+class Histogram:
+    """Cumulative-bucket histogram of non-negative values, with sum, count and max."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Estimates the q-quantile by linear interpolation inside its bucket."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, bucket_count in enumerate(self.counts):
+            upper = self.buckets[i] if i < len(self.buckets) else self.max
+            if bucket_count and seen + bucket_count >= target:
+                estimate = lower + (upper - lower) * (target - seen) / bucket_count
+                return min(estimate, self.max)
+            seen += bucket_count
+            lower = upper
+        return self.max
+
+    def summary_ms(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.sum * 1000, 3),
+            "mean_ms": round(self.sum * 1000 / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5) * 1000, 3),
+            "p95_ms": round(self.quantile(0.95) * 1000, 3),
+            "p99_ms": round(self.quantile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class ToolCall:
+    """Timings and counters of one in-flight tool call."""
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.start = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.rows = 0
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+
+_current_call: contextvars.ContextVar[Optional[ToolCall]] = contextvars.ContextVar(
+    "sql_mcp_tool_call", default=None
+)
+
+
+def phase(name: str):
+    """Times a phase of the current tool call; a no-op outside one."""
+    call = _current_call.get()
+    return call.phase(name) if call is not None else _NO_PHASE
+
+
+def add_rows(count: int) -> None:
+    """Adds to the rows read by the current tool call."""
+    call = _current_call.get()
+    if call is not None:
+        call.rows += count
+
+
+def is_error(result: Any) -> bool:
+    """True for the {'error': ...} and [{'error': ...}] shapes the tools return."""
+    if isinstance(result, dict):
+        return "error" in result
+    if isinstance(result, list):
+        return any(isinstance(item, dict) and "error" in item for item in result)
+    return False
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _ToolStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.bytes = 0
+        self.max_bytes = 0
+        self.latency = Histogram()
+        self.phases: Dict[str, Histogram] = {}
+
+
+class ToolMetrics:
+    """
+    Thread-safe registry of per-tool metrics.
+
+    With `textfile` set, the registry is also written in the Prometheus text
+    exposition format, at most every `interval` seconds after a call and on
+    `flush()`. The file is replaced atomically, so it can be read by the
+    node_exporter textfile collector or scraped with a file_sd sidecar.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        textfile: Optional[str] = None,
+        interval: float = 10.0,
+    ):
+        self.enabled = enabled
+        self.textfile = textfile
+        self.interval = interval
+        self.started = time.time()
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._tools: Dict[str, _ToolStats] = {}
+        self._last_write = 0.0
+
+    @contextlib.contextmanager
+    def call(self, tool: str) -> Iterator[Optional[ToolCall]]:
+        """Opens a tool call; pass the result to `finish()` before leaving."""
+        if not self.enabled:
+            yield None
+            return
+        call = ToolCall(tool)
+        token = _current_call.set(call)
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield call
+        finally:
+            _current_call.reset(token)
+            with self._lock:
+                self.in_flight -= 1
+
+    def finish(self, call: Optional[ToolCall], result: Any) -> Any:
+        """Records `call` and returns `result` unchanged; see `add_bytes()` for its size."""
+        if call is not None:
+            self.record(call, is_error(result))
+        return result
+
+    def add_bytes(self, tool: str, size: int) -> None:
+        """Adds the size of one encoded `tool` response, measured by whoever encoded it."""
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._tools.get(tool)
+            if stats is None:
+                stats = self._tools[tool] = _ToolStats()
+            stats.bytes += size
+            stats.max_bytes = max(stats.max_bytes, size)
+
+    def record(self, call: ToolCall, error: bool) -> None:
+        elapsed = time.perf_counter() - call.start
+        with self._lock:
+            stats = self._tools.get(call.tool)
+            if stats is None:
+                stats = self._tools[call.tool] = _ToolStats()
+            stats.calls += 1
+            stats.errors += error
+            stats.rows += call.rows
+            stats.latency.observe(elapsed)
+            for name, seconds in call.phases.items():
+                histogram = stats.phases.get(name)
+                if histogram is None:
+                    histogram = stats.phases[name] = Histogram()
+                histogram.observe(seconds)
+            due = self.textfile and time.monotonic() - self._last_write >= self.interval
+            if due:
+                self._last_write = time.monotonic()
+        if due:
+            self.write_textfile()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            tools = {}
+            for name, stats in sorted(self._tools.items()):
+                tools[name] = {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "error_rate": (
+                        round(stats.errors / stats.calls, 4) if stats.calls else 0.0
+                    ),
+                    "rows": stats.rows,
+                    "bytes": stats.bytes,
+                    "max_bytes": stats.max_bytes,
+                    "latency": stats.latency.summary_ms(),
+                    "phases": {
+                        phase_name: stats.phases[phase_name].summary_ms()
+                        for phase_name in PHASES + tuple(sorted(stats.phases))
+                        if phase_name in stats.phases
+                    },
+                }
+            return {
+                "enabled": self.enabled,
+                "uptime_s": round(time.time() - self.started, 1),
+                "in_flight": self.in_flight,
+                "tools": tools,
+            }
+
+    def to_prometheus(self) -> str:
+        """Renders the registry in the Prometheus text exposition format."""
+        lines: List[str] = []
+
+        def header(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name: str, labels: str, h: Histogram):
+            cumulative = 0
+            for bound, count in zip(h.buckets + (float("inf"),), h.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {h.sum!r}")
+            lines.append(f"{name}_count{{{labels}}} {h.count}")
+
+        with self._lock:
+            tools = sorted(self._tools.items())
+            header("sql_mcp_tool_calls_total", "counter", "Tool calls.")
+            for name, stats in tools:
+                lines.append(
+                    f'sql_mcp_tool_calls_total{{tool="{_label(name)}"}} {stats.calls}'
+                )
+            header(
+                "sql_mcp_tool_errors_total",
+                "counter",
+                "Tool calls that returned an error.",
+            )
+            for name, stats in tools:
+                lines.append(
+                    f'sql_mcp_tool_errors_total{{tool="{_label(name)}"}} {stats.errors}'
+                )
+            header("sql_mcp_tool_rows_total", "counter", "Rows read from the database.")
+            for name, stats in tools:
+                lines.append(
+                    f'sql_mcp_tool_rows_total{{tool="{_label(name)}"}} {stats.rows}'
+                )
+            header(
+                "sql_mcp_tool_response_bytes_total",
+                "counter",
+                "Bytes of JSON returned to the client.",
+            )
+            for name, stats in tools:
+                lines.append(
+                    f'sql_mcp_tool_response_bytes_total{{tool="{_label(name)}"}} {stats.bytes}'
+                )
+            header("sql_mcp_tool_duration_seconds", "histogram", "Tool call latency.")
+            for name, stats in tools:
+                histogram(
+                    "sql_mcp_tool_duration_seconds",
+                    f'tool="{_label(name)}"',
+                    stats.latency,
+                )
+            header(
+                "sql_mcp_tool_phase_duration_seconds",
+                "histogram",
+                "Time spent in each phase of a tool call.",
+            )
+            for name, stats in tools:
+                for phase_name, h in sorted(stats.phases.items()):
+                    histogram(
+                        "sql_mcp_tool_phase_duration_seconds",
+                        f'tool="{_label(name)}",phase="{_label(phase_name)}"',
+                        h,
+                    )
+            header("sql_mcp_tool_in_flight", "gauge", "Tool calls currently running.")
+            lines.append(f"sql_mcp_tool_in_flight {self.in_flight}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Optional[str] = None) -> None:
+        """Writes `to_prometheus()` to `path` (default: `textfile`) atomically."""
+        path = path or self.textfile
+        if not path:
+            return
+        temp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
+            os.replace(temp, path)
+        except OSError:
+            # Metrics must never fail a tool call.
+            with contextlib.suppress(OSError):
+                os.remove(temp)
+
+    def flush(self) -> None:
+        self.write_textfile()
+
+
+def metrics_from_env() -> ToolMetrics:
+    """Builds the registry from SQL_MCP_METRICS, SQL_MCP_METRICS_FILE and SQL_MCP_METRICS_INTERVAL."""
+    return ToolMetrics(
+        enabled=os.environ.get("SQL_MCP_METRICS", "1").strip().lower()
+        in ("1", "true", "yes", "on"),
+        textfile=os.environ.get("SQL_MCP_METRICS_FILE") or None,
+        interval=float(os.environ.get("SQL_MCP_METRICS_INTERVAL", "10")),
+    )
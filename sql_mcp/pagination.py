@@ -0,0 +1,228 @@
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Keyset pagination for execute_query.
+
+A paginated query needs a top-level ORDER BY. When every ORDER BY term names
+a result column (by name, alias or position), the next page starts at the
+sort key of the last row returned instead of at an OFFSET:
+
+    SELECT * FROM (<query>) WHERE <sort key >= last key> ORDER BY <keys>
+    LIMIT :_page_limit OFFSET :_page_offset
+
+The OFFSET then only skips the rows already returned that share the last key,
+so ties in the sort key are neither repeated nor dropped, and SQLite can push
+the key predicate down into the query instead of producing and discarding
+every earlier row.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+_ORDER_BY_RE = re.compile(r"\border\s+by\b", re.IGNORECASE)
+_ORDER_END_RE = re.compile(r"\b(?:limit|offset)\b", re.IGNORECASE)
+_ORDER_TERM_RE = re.compile(
+    r"^(?P<expr>.+?)(?P<collate>\s+collate\s+\S+)?(?:\s+(?P<dir>asc|desc))?"
+    r"(?:\s+nulls\s+(?P<nulls>first|last))?$",
+    re.IGNORECASE | re.DOTALL,
+)
+_IDENTIFIER_RE = re.compile(
+    r'^(?:"(?P<dq>(?:[^"]|"")+)"|`(?P<bq>[^`]+)`|\[(?P<sq>[^\]]+)\]|(?P<bare>[A-Za-z_][A-Za-z0-9_$]*))$'
+)
+_CLOSING_QUOTE = {"'": "'", '"': '"', "`": "`", "[": "]"}
+# Python types of sort-key values a cursor can carry.
+_KEY_TYPES = (str, int, float, type(None))
+
+
+def _mask_sql(query: str) -> str:
+    """
+    Returns `query` with quoted text, comments and parenthesized parts replaced
+    by spaces, so top-level keywords and commas keep their positions.
+    """
+    masked = list(query)
+    i, depth, length = 0, 0, len(query)
+    while i < length:
+        char = query[i]
+        if char in _CLOSING_QUOTE:
+            end = query.find(_CLOSING_QUOTE[char], i + 1)
+            end = length - 1 if end < 0 else end
+        elif query.startswith("--", i):
+            end = query.find("\n", i)
+            end = length - 1 if end < 0 else end
+        elif query.startswith("/*", i):
+            end = query.find("*/", i + 2)
+            end = length - 1 if end < 0 else end + 1
+        else:
+            if char == "(":
+                depth += 1
+            if depth:
+                masked[i] = " "
+            if char == ")" and depth:
+                depth -= 1
+            i += 1
+            continue
+        masked[i : end + 1] = " " * (end + 1 - i)
+        i = end + 1
+    return "".join(masked)
+
+
+def order_by_terms(query: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Parses the top-level ORDER BY of `query`; None if it has none.
+
+    Each term has 'expr' (the expression text), 'desc', 'nulls' ('first',
+    'last' or None when not given) and 'collate' (True if it has a COLLATE).
+    """
+    query = query.strip().rstrip(";")
+    masked = _mask_sql(query)
+    matches = list(_ORDER_BY_RE.finditer(masked))
+    if not matches:
+        return None
+    start = matches[-1].end()
+    end_match = _ORDER_END_RE.search(masked, start)
+    end = end_match.start() if end_match else len(query)
+    bounds = [start] + [
+        start + i + 1 for i, c in enumerate(masked[start:end]) if c == ","
+    ]
+    terms = []
+    for left, right in zip(bounds, bounds[1:] + [end + 1]):
+        match = _ORDER_TERM_RE.match(query[left : right - 1].strip())
+        if match is None:
+            return None
+        terms.append(
+            {
+                "expr": match.group("expr").strip(),
+                "desc": (match.group("dir") or "").lower() == "desc",
+                "nulls": (match.group("nulls") or "").lower() or None,
+                "collate": bool(match.group("collate")),
+            }
+        )
+    return terms
+
+
+def _identifier(expr: str) -> Optional[str]:
+    match = _IDENTIFIER_RE.match(expr)
+    if match is None:
+        return None
+    if match.group("dq") is not None:
+        return match.group("dq").replace('""', '"')
+    return match.group("bq") or match.group("sq") or match.group("bare")
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def keyset_columns(
+    terms: List[Dict[str, Any]], columns: List[str]
+) -> Optional[List[str]]:
+    """
+    Maps each ORDER BY term to the result column it sorts by, or returns None
+    when a term is an expression, uses COLLATE, or names an ambiguous column.
+    """
+    names = []
+    for term in terms:
+        if term["collate"]:
+            return None
+        if term["expr"].isdigit():
+            index = int(term["expr"]) - 1
+            if not 0 <= index < len(columns):
+                return None
+            name = columns[index]
+        else:
+            identifier = _identifier(term["expr"])
+            if identifier is None:
+                return None
+            matching = [c for c in columns if c.lower() == identifier.lower()]
+            if len(matching) != 1:
+                return None
+            name = matching[0]
+        if columns.count(name) != 1:
+            return None
+        names.append(name)
+    return names
+
+
+def keyset_statement(
+    query: str,
+    terms: List[Dict[str, Any]],
+    names: List[str],
+    values: List[Any],
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Wraps `query` to return the rows from sort key `values` on (inclusive), in
+    ORDER BY order; the caller adds :_page_limit and :_page_offset.
+    """
+    params: Dict[str, Any] = {}
+    alternatives, equal = [], []
+    for i, (term, name, value) in enumerate(zip(terms, names, values)):
+        column, param = quote_identifier(name), f":_page_k{i}"
+        params[f"_page_k{i}"] = value
+        # SQLite sorts NULL first ascending and last descending.
+        nulls_last = (term["nulls"] or ("last" if term["desc"] else "first")) == "last"
+        if i == len(names) - 1 and value is not None and not nulls_last:
+            # The last key, inclusive, as one range the query can seek to.
+            alternatives.append(
+                " AND ".join(
+                    equal + [f"{column} {'<=' if term['desc'] else '>='} {param}"]
+                )
+            )
+            break
+        if value is None:
+            after = "0" if nulls_last else f"{column} IS NOT NULL"
+        else:
+            after = f"{column} {'<' if term['desc'] else '>'} {param}"
+            if nulls_last:
+                after = f"({after} OR {column} IS NULL)"
+        alternatives.append(" AND ".join(equal + [after]))
+        equal.append(f"{column} IS {param}")
+    else:
+        alternatives.append(" AND ".join(equal))
+    order = ", ".join(
+        f"{quote_identifier(name)} {'DESC' if term['desc'] else 'ASC'}"
+        + (f" NULLS {term['nulls'].upper()}" if term["nulls"] else "")
+        for term, name in zip(terms, names)
+    )
+    statement = (
+        f"SELECT * FROM ({query.strip().rstrip(';')}) "
+        f"WHERE {' OR '.join(f'({a})' for a in alternatives)} "
+        f"ORDER BY {order} LIMIT :_page_limit OFFSET :_page_offset"
+    )
+    return statement, params
+
+
+def next_keyset(
+    names: List[str],
+    columns: List[str],
+    rows: List[tuple],
+    previous: Optional[Dict[str, Any]],
+) -> Optional[Dict[str, Any]]:
+    """
+    Returns the keyset state after a page of `rows`: 'c' (key columns), 'v'
+    (the last row's key) and 'e' (rows returned so far with that key), or
+    None if the key holds values a cursor cannot carry.
+    """
+    indexes = [columns.index(name) for name in names]
+    last = [rows[-1][i] for i in indexes]
+    if not all(isinstance(value, _KEY_TYPES) for value in last):
+        return None
+    equal = 0
+    for row in reversed(rows):
+        if [row[i] for i in indexes] != last:
+            break
+        equal += 1
+    if previous and equal == len(rows) and previous["v"] == last:
+        equal += previous["e"]
+    return {"c": names, "v": last, "e": equal}
@@ -0,0 +1,326 @@
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Per-call profiles of selected MCP tools.
+
+With SQL_MCP_PROFILE=execute_query,search_customers (or 'all'), each call of
+those tools is profiled on the database thread that runs it. Every profiled
+call writes two files to SQL_MCP_PROFILE_DIR:
+
+    <time>-<tool>-<n>.pstats     python -m pstats, snakeviz, ...
+    <time>-<tool>-<n>.collapsed  flamegraph.pl, speedscope, inferno
+
+SQL_MCP_PROFILE_MODE picks the profiler: 'cprofile' (deterministic, exact call
+counts, slows Python-heavy code) or 'sample' (stack samples every
+SQL_MCP_PROFILE_INTERVAL_MS from a helper thread; low overhead). A process
+can run one cProfile at a time (since Python 3.12 it is a sys.monitoring
+tool), so a call that overlaps another cProfile'd call on the database pool is
+sampled instead. The pstats
+file of a sampled call and the collapsed file of a cProfile call are derived
+from the other data, so their times are estimates. Calls faster than
+SQL_MCP_PROFILE_MIN_MS are not written.
+
+When SQL_MCP_PROFILE is unset, `ToolProfiler.wrap()` returns the function
+itself, so tool calls run exactly as without this module.
+"""
+
+import cProfile
+import functools
+import itertools
+import marshal
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+PROFILE_MODES = ("cprofile", "sample")
+
+# Held while a cProfile is active; only one can be per process.
+_cprofile_lock = threading.Lock()
+
+# pstats function key: (filename, first line, function name).
+FunctionKey = Tuple[str, int, str]
+
+
+def _label(key: FunctionKey) -> str:
+    filename, line, name = key
+    if filename == "~":  # built-in
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def collapsed_from_pstats(
+    stats: Dict[FunctionKey, tuple], max_depth: int = 64, min_seconds: float = 1e-6
+) -> Dict[str, float]:
+    """
+    Derives collapsed stacks ('a;b;c' → seconds of self time) from cProfile data.
+
+    cProfile only keeps caller→callee edges, not whole stacks, so a function's
+    time on each path is its edge time split in proportion to how much of its
+    parent's time that path holds, as flameprof does. Recursive cycles are cut.
+    """
+    callees: Dict[FunctionKey, List[FunctionKey]] = defaultdict(list)
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller in callers:
+            callees[caller].append(func)
+    roots = [func for func, entry in stats.items() if not entry[4]]
+    stacks: Dict[str, float] = defaultdict(float)
+
+    def visit(
+        func: FunctionKey, path: List[FunctionKey], self_s: float, total_s: float
+    ):
+        path = path + [func]
+        if self_s >= min_seconds:
+            stacks[";".join(_label(f) for f in path)] += self_s
+        if len(path) >= max_depth or total_s < min_seconds:
+            return
+        func_total = stats[func][3]
+        share = total_s / func_total if func_total else 0.0
+        for callee in callees.get(func, ()):
+            if callee in path:
+                continue
+            _, _, edge_tt, edge_ct = stats[callee][4][func][:4]
+            visit(callee, path, edge_tt * share, edge_ct * share)
+
+    for root in roots:
+        _, _, tt, ct, _ = stats[root]
+        visit(root, [], tt, ct)
+    return dict(stacks)
+
+
+def pstats_from_samples(
+    samples: Dict[Tuple[FunctionKey, ...], List[float]],
+) -> Dict[FunctionKey, tuple]:
+    """
+    Builds a pstats-compatible dict from stack samples (root first) mapped to
+    [sample count, seconds].
+
+    Self time is the time a function was on top, cumulative time the time it
+    appeared anywhere in the stack; call counts are sample counts, not calls.
+    """
+    # func → [samples, seconds] on top of the stack / anywhere in it.
+    own: Dict[FunctionKey, List[float]] = defaultdict(lambda: [0, 0.0])
+    total: Dict[FunctionKey, List[float]] = defaultdict(lambda: [0, 0.0])
+    # callee → caller → [samples, self seconds, cumulative seconds].
+    edges: Dict[FunctionKey, Dict[FunctionKey, List[float]]] = defaultdict(
+        lambda: defaultdict(lambda: [0, 0.0, 0.0])
+    )
+    for stack, (count, seconds) in samples.items():
+        for bucket in (own[stack[-1]], *(total[func] for func in set(stack))):
+            bucket[0] += count
+            bucket[1] += seconds
+        for caller, callee in set(zip(stack, stack[1:])):
+            edges[callee][caller][0] += count
+            edges[callee][caller][2] += seconds
+        if len(stack) > 1:
+            edges[stack[-1]][stack[-2]][1] += seconds
+    stats: Dict[FunctionKey, tuple] = {}
+    for func, (count, seconds) in total.items():
+        callers = {
+            caller: (n, n, self_s, total_s)
+            for caller, (n, self_s, total_s) in edges[func].items()
+        }
+        stats[func] = (count, count, own[func][1], seconds, callers)
+    return stats
+
+
+class _StackSampler:
+    """
+    Samples the stacks of one thread that are rooted at `root_code`.
+
+    Each sample is weighted by the wall time since the previous one, so the
+    totals stay right when the GIL delays the sampler past its interval.
+    """
+
+    def __init__(self, thread_id: int, interval: float, root_code: Any):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root_code = root_code
+        self.samples: Dict[Tuple[FunctionKey, ...], List[float]] = defaultdict(
+            lambda: [0, 0.0]
+        )
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="sql-mcp-profiler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                if code is self.root_code:
+                    sample = self.samples[tuple(reversed(stack))]
+                    sample[0] += 1
+                    sample[1] += now - last
+                    break
+                frame = frame.f_back
+            last = now
+
+
+class ToolProfiler:
+    """Wraps selected tool implementations in a per-call profiler."""
+
+    def __init__(
+        self,
+        tools: Optional[FrozenSet[str]],
+        out_dir: Path,
+        mode: str = "cprofile",
+        min_ms: float = 0.0,
+        interval_ms: float = 1.0,
+    ):
+        if mode not in PROFILE_MODES:
+            raise ValueError(
+                f"Unknown profile mode '{mode}'. Use one of: {', '.join(PROFILE_MODES)}."
+            )
+        self.tools = tools  # None: every tool
+        self.out_dir = Path(out_dir)
+        self.mode = mode
+        self.min_ms = min_ms
+        self.interval = interval_ms / 1000
+        self.written = 0
+        self._sequence = itertools.count(1)
+
+    def selects(self, tool: str) -> bool:
+        return self.tools is None or tool in self.tools
+
+    def wrap(self, tool: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """Decorator for the implementation of `tool`; the identity if it is not selected."""
+
+        def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+            if not self.selects(tool):
+                return func
+
+            @functools.wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if self.mode == "cprofile" and _cprofile_lock.acquire(blocking=False):
+                    try:
+                        return self._run_cprofile(tool, func, args, kwargs)
+                    finally:
+                        _cprofile_lock.release()
+                return self._run_sampled(tool, func, args, kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def _run_cprofile(
+        self, tool: str, func: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]
+    ) -> Any:
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            return profile.runcall(func, *args, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms >= self.min_ms:
+                profile.create_stats()
+                stats = profile.stats
+                self._write(
+                    tool, stats, collapsed_from_pstats(stats), elapsed_ms, "cprofile"
+                )
+
+    def _run_sampled(
+        self, tool: str, func: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]
+    ) -> Any:
+        sampler = _StackSampler(threading.get_ident(), self.interval, func.__code__)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sampler.stop()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms >= self.min_ms:
+                collapsed = {
+                    ";".join(_label(f) for f in stack): seconds
+                    for stack, (_, seconds) in sampler.samples.items()
+                }
+                self._write(
+                    tool,
+                    pstats_from_samples(sampler.samples),
+                    collapsed,
+                    elapsed_ms,
+                    "sample",
+                )
+
+    def _write(
+        self,
+        tool: str,
+        stats: Dict[FunctionKey, tuple],
+        collapsed: Dict[str, float],
+        elapsed_ms: float,
+        mode: str,
+    ) -> None:
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{tool}-{next(self._sequence):05d}"
+        try:
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.out_dir / f"{stem}.pstats", "wb") as f:
+                marshal.dump(stats, f)
+            with open(self.out_dir / f"{stem}.collapsed", "w", encoding="utf-8") as f:
+                for stack, seconds in sorted(collapsed.items()):
+                    # Collapsed-stack counts are integers; use microseconds.
+                    micros = round(seconds * 1_000_000)
+                    if micros:
+                        f.write(f"{stack} {micros}\n")
+        except OSError as e:
+            # stdout carries the MCP stdio protocol.
+            print(f"Cannot write profile {stem}: {e}", file=sys.stderr)
+            return
+        self.written += 1
+        print(
+            f"Profiled {tool} ({elapsed_ms:.1f} ms, {mode}): "
+            f"{self.out_dir / stem}.{{pstats,collapsed}}",
+            file=sys.stderr,
+        )
+
+
+def profiler_from_env() -> Optional[ToolProfiler]:
+    """
+    Builds the profiler from SQL_MCP_PROFILE, SQL_MCP_PROFILE_MODE,
+    SQL_MCP_PROFILE_DIR, SQL_MCP_PROFILE_MIN_MS and SQL_MCP_PROFILE_INTERVAL_MS,
+    or returns None when SQL_MCP_PROFILE is unset or empty.
+    """
+    selection = os.environ.get("SQL_MCP_PROFILE", "").strip()
+    if not selection:
+        return None
+    names = frozenset(name.strip() for name in selection.split(",") if name.strip())
+    return ToolProfiler(
+        None if names & {"all", "*"} else names,
+        Path(
+            os.environ.get(
+                "SQL_MCP_PROFILE_DIR",
+                Path(tempfile.gettempdir()) / "sql_mcp_profiles",
+            )
+        ),
+        mode=os.environ.get("SQL_MCP_PROFILE_MODE", "cprofile").strip().lower(),
+        min_ms=float(os.environ.get("SQL_MCP_PROFILE_MIN_MS", "0")),
+        interval_ms=float(os.environ.get("SQL_MCP_PROFILE_INTERVAL_MS", "1")),
+    )
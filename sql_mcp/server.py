@@ -12,27 +12,507 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import atexit
+import base64
+import contextlib
+import contextvars
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Annotated, Any, Callable, Dict, List, Optional, Tuple, Union
 
-import yaml
 from fastmcp import FastMCP
-from sqlalchemy import create_engine, inspect, text
+from fastmcp.server.dependencies import get_context
+from fastmcp.server.middleware import Middleware
+from pydantic import Field
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql.elements import TextClause
+
+from .advisor import QueryLog, analyze_query, recommend_indexes as _advise
+from .cache import ResultCache, estimate_result_size, freeze_params, normalize_sql
+from .catalog import SchemaCatalog
+from .engine import (
+    QueryGuard,
+    create_read_engine,
+    engine_profile_from_env,
+    sqlite_file_path,
+)
+from .pagination import keyset_columns, keyset_statement, next_keyset, order_by_terms
+from .metrics import add_rows, is_error, metrics_from_env, phase as _metrics_phase
+from .profiling import profiler_from_env
+from .slowlog import slow_log_from_env
+from .tracing import instrument_sqlalchemy, parse_traceparent, tracer_from_env
+from .workload import ORDER_KEYS, WorkloadStats
+
+
+def get_db_path() -> Path:
+    """Returns the SQLite database path; SQL_MCP_DB_PATH overrides the bundled file."""
+    script_dir = Path(__file__).parent
+    return Path(os.environ.get("SQL_MCP_DB_PATH", script_dir / "data" / "erp_demo.db"))
 
 
 def get_db_config() -> str:
     """Returns the database connection string."""
     # In a real application, you might get this from environment variables,
     # a config file, or a secrets manager.
-    script_dir = Path(__file__).parent
-    db_path = script_dir / "data" / "erp_demo.db"
-    return f"sqlite:///{db_path}"
+    return f"sqlite:///{get_db_path()}"
+
+
+# Threads that run blocking database work for the async tools. A slow query
+# occupies one worker while the others keep serving concurrent tool calls.
+DB_WORKERS = int(os.environ.get("SQL_MCP_DB_WORKERS", "4"))
+_db_executor = ThreadPoolExecutor(
+    max_workers=DB_WORKERS, thread_name_prefix="sql-mcp-db"
+)
 
+# Read-optimized engine profile (see sql_mcp/engine.py and the README for
+# defaults). The pool is sized to the worker threads unless set explicitly.
+ENGINE_PROFILE = engine_profile_from_env()
+if "SQL_MCP_POOL_SIZE" not in os.environ:
+    ENGINE_PROFILE["pool_size"] = DB_WORKERS
 
 DATABASE_URL = get_db_config()
-engine = create_engine(DATABASE_URL)
+engine = create_read_engine(get_db_path(), ENGINE_PROFILE)
+SCHEMA_PATH = Path(
+    os.environ.get(
+        "SQL_MCP_SCHEMA_PATH", Path(__file__).parent / "data" / "schema.yaml"
+    )
+)
+catalog = SchemaCatalog(SCHEMA_PATH)
+
+# Hard server-side cap on rows returned by one execute_query call, paginated or not.
+MAX_RESULT_ROWS = int(os.environ.get("SQL_MCP_MAX_ROWS", "1000"))
+# Default and maximum execute_query deadline in milliseconds.
+QUERY_TIMEOUT_MS = int(os.environ.get("SQL_MCP_QUERY_TIMEOUT_MS", "10000"))
+MAX_QUERY_TIMEOUT_MS = int(os.environ.get("SQL_MCP_MAX_QUERY_TIMEOUT_MS", "60000"))
+# SQLite VM instructions one execute_query may run; 0 disables the budget.
+MAX_VM_STEPS = int(os.environ.get("SQL_MCP_MAX_VM_STEPS", str(2_000_000_000)))
+# Compiled text() constructs kept for repeated query shapes.
+STATEMENT_CACHE_SIZE = int(os.environ.get("SQL_MCP_STATEMENT_CACHE_SIZE", "256"))
+# Bind parameter names reserved for pagination.
+_RESERVED_PARAM_PREFIX = "_page_"
+_PARAM_TYPES = (str, int, float, bool, type(None))
+# Page size used when a continuation cursor is given without a page_size.
+DEFAULT_PAGE_SIZE = 100
+# Rows pulled from the DB-API cursor per fetchmany() call.
+FETCH_BATCH_SIZE = 256
+# Memory budget of the execute_query result cache; 0 disables caching.
+RESULT_CACHE_BYTES = int(
+    os.environ.get("SQL_MCP_RESULT_CACHE_BYTES", str(64 * 1024 * 1024))
+)
+result_cache = ResultCache(RESULT_CACHE_BYTES)
+# Distinct statements remembered as the default workload of recommend_indexes.
+QUERY_LOG_SIZE = int(os.environ.get("SQL_MCP_QUERY_LOG_SIZE", "200"))
+query_log = QueryLog(QUERY_LOG_SIZE)
+# Per-tool latency, phase, row and byte metrics (see sql_mcp/metrics.py);
+# SQL_MCP_METRICS_FILE also dumps them in the Prometheus text format.
+metrics = metrics_from_env()
+atexit.register(lambda: metrics.flush())
+# execute_query statements slower than SQL_MCP_SLOW_QUERY_MS, with their plans,
+# go to the JSONL file named by SQL_MCP_SLOW_LOG (see sql_mcp/slowlog.py).
+slow_log = slow_log_from_env()
+# Running aggregates per execute_query fingerprint (see sql_mcp/workload.py);
+# SQL_MCP_WORKLOAD_FILE receives them as a replayable workload on exit.
+WORKLOAD_SIZE = int(os.environ.get("SQL_MCP_WORKLOAD_SIZE", "1000"))
+WORKLOAD_FILE = os.environ.get("SQL_MCP_WORKLOAD_FILE") or None
+workload_stats = WorkloadStats(WORKLOAD_SIZE)
+
+
+def _export_workload() -> None:
+    if WORKLOAD_FILE:
+        try:
+            workload_stats.export(WORKLOAD_FILE)
+        except OSError as e:
+            print(f"Cannot write workload file {WORKLOAD_FILE}: {e}", file=sys.stderr)
+
+
+atexit.register(_export_workload)
+
+# Per-call cProfile or sampling profiles of the tools named in SQL_MCP_PROFILE
+# (see sql_mcp/profiling.py). Unselected tools are not wrapped at all.
+profiler = profiler_from_env()
+
+
+def _profiled(tool: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Profiles the implementation of `tool` when SQL_MCP_PROFILE selects it."""
+    if profiler is None:
+        return lambda func: func
+    return profiler.wrap(tool)
+
+
+# Spans per tool call, phase and SQL statement, appended to SQL_MCP_TRACE_FILE
+# and parented to the caller's traceparent (see sql_mcp/tracing.py).
+tracer = tracer_from_env()
+if tracer.enabled:
+    instrument_sqlalchemy()
+
+
+def phase(name: str):
+    """Times a phase of the current tool call and, when tracing, records it as a span."""
+    if not tracer.enabled:
+        return _metrics_phase(name)
+    return _traced_phase(name)
+
+
+@contextlib.contextmanager
+def _traced_phase(name: str):
+    with _metrics_phase(name), tracer.span(name):
+        yield
+
+
+# Tools wrapped by _instrumented; only their responses are measured, so
+# server_stats never shows up in its own report.
+_instrumented_tools = set()
+
+
+class _ResponseBytes(Middleware):
+    """Adds the size of each tool response, as FastMCP encoded it, to the tool's metrics."""
+
+    async def on_call_tool(self, context, call_next):
+        result = await call_next(context)
+        if context.message.name not in _instrumented_tools:
+            return result
+        size = 0
+        for block in result.content:
+            text = getattr(block, "text", None)
+            if text is not None:
+                # isascii() is O(1) on CPython, so only non-ASCII text is re-encoded.
+                size += len(text) if text.isascii() else len(text.encode("utf-8"))
+        metrics.add_bytes(context.message.name, size)
+        return result
+
+
+mcp = FastMCP(name="sql-mcp-server", middleware=[_ResponseBytes()])
+
+
+async def _run_db(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Runs blocking database work on the bounded thread pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    # Copy the context so the worker sees the caller's tool-call metrics.
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _db_executor, functools.partial(context.run, func, *args, **kwargs)
+    )
+
+
+# Advertised by every instrumented tool while tracing, so an agent can hand
+# over its span; without tracing, tool schemas stay as they are.
+_TRACE_CONTEXT = inspect.Parameter(
+    "trace_context",
+    inspect.Parameter.KEYWORD_ONLY,
+    default=None,
+    annotation=Annotated[
+        Optional[str],
+        Field(
+            description="W3C traceparent of the calling agent's span. Set by the agent runtime; leave unset."
+        ),
+    ],
+)
+
+
+def _request_traceparent() -> Optional[str]:
+    """The traceparent in the `_meta` of the MCP request being served, if any."""
+    try:
+        meta = get_context().request_context.meta
+    except (RuntimeError, AttributeError):
+        return None
+    if isinstance(meta, dict):
+        return meta.get("traceparent")
+    return getattr(meta, "traceparent", None)
+
+
+def _instrumented(tool: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Records latency, phases and rows of every call to an async tool (response
+    bytes come from _ResponseBytes) and, when tracing, a span parented to the
+    caller's `trace_context` argument or `_meta` traceparent. The argument is
+    only in the tool schema when SQL_MCP_TRACE_FILE is set.
+    """
+    name = tool.__name__
+    _instrumented_tools.add(name)
+
+    @functools.wraps(tool)
+    async def wrapper(*args: Any, trace_context: Optional[str] = None, **kwargs: Any):
+        registry = metrics
+        parent = None
+        if tracer.enabled:
+            parent = parse_traceparent(trace_context) or parse_traceparent(
+                _request_traceparent()
+            )
+        with (
+            registry.call(name) as call,
+            tracer.span(name, parent, **{"mcp.tool": name}) as span,
+        ):
+            try:
+                result = await tool(*args, **kwargs)
+            except Exception:
+                if call is not None:
+                    registry.record(call, error=True)
+                raise
+            if span is not None and is_error(result):
+                span.error = "tool returned an error"
+            return registry.finish(call, result)
+
+    if not tracer.enabled:
+        return wrapper
+    signature = inspect.signature(tool)
+    wrapper.__signature__ = signature.replace(
+        parameters=[*signature.parameters.values(), _TRACE_CONTEXT]
+    )
+    wrapper.__annotations__ = {
+        **tool.__annotations__,
+        "trace_context": _TRACE_CONTEXT.annotation,
+    }
+    return wrapper
+
+
+def _jsonable(value: Any) -> Any:
+    """Converts date/time values to ISO strings; other values pass through."""
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def _file_identity(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino)
+
+
+# (engine, identity of its file) as last seen by get_engine().
+_engine_identity: Tuple[Optional[Engine], Optional[Tuple[int, int]]] = (None, None)
+_engine_lock = threading.Lock()
+# Times get_engine() switched to a replaced database file.
+database_reloads = 0
+
+
+def get_engine() -> Engine:
+    """
+    Returns the engine for the current database file.
+
+    scripts/load_to_sql.py builds a new database next to the served one and
+    renames it into place. When the file at the engine's path has a new
+    (device, inode), a fresh engine is opened on it and the catalog and result
+    cache are dropped before any query reaches the new file. The old engine is
+    disposed: idle connections close now, and queries still running on it
+    finish against the old file, whose connections close when they return.
+    """
+    global engine, _engine_identity, database_reloads
+    current = engine
+    db_file = sqlite_file_path(current)
+    if db_file is None:
+        return current
+    identity = _file_identity(db_file)
+    known_engine, known_identity = _engine_identity
+    if known_engine is current and identity in (known_identity, None):
+        return current
+    with _engine_lock:
+        if engine is not current:
+            # Another thread already switched.
+            return engine
+        known_engine, known_identity = _engine_identity
+        if known_engine is not current or known_identity is None:
+            # First call, or the engine was replaced from outside.
+            _engine_identity = (current, identity)
+            return current
+        if identity in (known_identity, None):
+            return current
+        fresh = create_read_engine(db_file, ENGINE_PROFILE)
+        catalog.invalidate()
+        result_cache.clear()
+        engine, _engine_identity = fresh, (fresh, identity)
+        database_reloads += 1
+        current.dispose()
+        # stdout carries the MCP stdio protocol.
+        print(f"Database file {db_file} was replaced; reopened it.", file=sys.stderr)
+        return fresh
+
+
+def _database_stamp(engine: Engine) -> Optional[Tuple[int, ...]]:
+    """
+    Returns a stamp that changes whenever the SQLite file's contents may have changed.
+
+    The stamp is built from (inode, mtime_ns, size) of the database file and of its
+    WAL file, since in WAL mode commits only touch the latter. `PRAGMA data_version`
+    is not used because it is per-connection and pooled connections disagree.
+    Returns None for non-file databases.
+    """
+    db_file = sqlite_file_path(engine)
+    if not db_file:
+        return None
+    try:
+        st = os.stat(db_file)
+    except OSError:
+        return None
+    stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+    try:
+        wal = os.stat(db_file + "-wal")
+        stamp += (wal.st_mtime_ns, wal.st_size)
+    except OSError:
+        pass
+    return stamp
+
 
-mcp = FastMCP(name="sql-mcp-server")
+def _query_digest(query: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Digest of the query text and its bound parameters."""
+    key = repr((" ".join(query.split()), freeze_params(params)))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def _encode_cursor(
+    query: str,
+    params: Optional[Dict[str, Any]],
+    offset: int,
+    page_size: int,
+    keyset: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    Builds the opaque continuation token for the page starting at `offset`, or
+    after the sort key in `keyset` (see sql_mcp/pagination.py).
+    """
+    state = {
+        "q": _query_digest(query, params),
+        "o": offset,
+        "n": page_size,
+        "s": _database_stamp(get_engine()),
+    }
+    if keyset is not None:
+        state["k"] = keyset
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(
+    query: str, params: Optional[Dict[str, Any]], token: str
+) -> Dict[str, Any]:
+    """Validates a continuation token against `query`, `params` and the current database."""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        offset, page_size = int(state["o"]), int(state["n"])
+        keyset = state.get("k")
+        if keyset is not None:
+            keyset = {
+                "c": [str(name) for name in keyset["c"]],
+                "v": list(keyset["v"]),
+                "e": int(keyset["e"]),
+            }
+            if len(keyset["c"]) != len(keyset["v"]) or keyset["e"] < 0:
+                raise ValueError
+    except Exception:
+        raise ValueError("Invalid cursor.")
+    if state.get("q") != _query_digest(query, params):
+        raise ValueError("Cursor does not belong to this query and params.")
+    stamp = _database_stamp(get_engine())
+    if state.get("s") != (list(stamp) if stamp else None):
+        raise ValueError(
+            "Cursor expired because the database changed; rerun the query."
+        )
+    return {"offset": offset, "page_size": page_size, "keyset": keyset}
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _compiled_statement(statement: str) -> TextClause:
+    """
+    Returns a shared text() construct for a normalized statement.
+
+    Reusing the construct skips re-parsing bind parameters and lets SQLAlchemy's
+    compiled cache hit; the sqlite3 driver's per-connection statement cache then
+    reuses the prepared statement for the identical SQL string.
+    """
+    return text(statement)
+
+
+def _check_select(query: str) -> Optional[str]:
+    """Returns an error message unless `query` is a comment-free SELECT statement."""
+    if not query.strip().upper().startswith("SELECT"):
+        return "For security reasons, only SELECT queries are allowed. Ensure your query is a SELECT statement."
+    # Internal check for common SQL comment markers
+    if "--" in query or "/*" in query:
+        return "For security reasons, queries containing SQL comment markers (--, /*) are not allowed."
+    return None
+
+
+def _validate_params(params: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Returns an error message if `params` cannot be bound, else None."""
+    if params is None:
+        return None
+    if not isinstance(params, dict):
+        return "params must be an object mapping parameter names to values."
+    for name, value in params.items():
+        if not isinstance(name, str) or not name.isidentifier():
+            return f"Invalid parameter name: {name!r}."
+        if name.startswith(_RESERVED_PARAM_PREFIX):
+            return f"Parameter names starting with '{_RESERVED_PARAM_PREFIX}' are reserved."
+        if not isinstance(value, _PARAM_TYPES):
+            return f"Parameter '{name}' must be a string, number, boolean or null."
+    return None
+
+
+def _fetch_rows(
+    result_set, max_rows: int, rows: Optional[List[tuple]] = None
+) -> Tuple[List[str], List[tuple]]:
+    """
+    Streams up to `max_rows` rows from an open result with fetchmany().
+
+    Rows are appended to `rows` when given, so a caller still holds the rows
+    fetched so far if the statement is interrupted. Batches start small and
+    double up to FETCH_BATCH_SIZE, so an interruption loses at most one batch
+    even for slow, sparse results.
+    """
+    columns = list(result_set.keys())
+    rows = [] if rows is None else rows
+    batch_size = 1
+    while len(rows) < max_rows:
+        batch = result_set.fetchmany(min(batch_size, max_rows - len(rows)))
+        if not batch:
+            break
+        rows.extend(batch)
+        batch_size = min(batch_size * 2, FETCH_BATCH_SIZE)
+    result_set.close()
+    return columns, rows
+
+
+def _rows_to_records(columns: List[str], rows: List[tuple]) -> List[Dict[str, Any]]:
+    return [{key: _jsonable(value) for key, value in zip(columns, row)} for row in rows]
+
+
+# Result encodings accepted by the `format` argument of the query tools.
+# 'records' repeats column names on every row; 'columnar' sends them once.
+RESULT_FORMATS = ("records", "columnar")
+
+
+def _format_error(format: str) -> Optional[str]:
+    if format in RESULT_FORMATS:
+        return None
+    return f"Unsupported format '{format}'. Use one of: {', '.join(RESULT_FORMATS)}."
+
+
+def _timeout_error(timeout_ms: Optional[int]) -> Optional[str]:
+    # A non-positive deadline has already passed; it is not a request for the default.
+    if timeout_ms is None or timeout_ms > 0:
+        return None
+    return f"timeout_ms must be a positive number of milliseconds, got {timeout_ms}."
+
+
+def _encode_rows(
+    columns: List[str], rows: List[tuple], format: str
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """Encodes rows as per-row dicts, or as one 'columns' header plus 'rows' arrays."""
+    if format == "columnar":
+        return {
+            "columns": columns,
+            "rows": [[_jsonable(value) for value in row] for row in rows],
+        }
+    return _rows_to_records(columns, rows)
 
 
 # @mcp.tool()
@@ -96,13 +576,37 @@ mcp = FastMCP(name="sql-mcp-server")
 #         return {"status": "error", "message": error_message}
 
 
+@_profiled("inspect_database")
+def _inspect_database() -> List[Dict[str, Any]]:
+    """Synchronous implementation of `inspect_database`; runs on the database thread pool."""
+    try:
+        with phase("catalog"):
+            snapshot = catalog.get(get_engine())
+        add_rows(len(snapshot.tables))
+        return [
+            {
+                "schema_name": table["schema_name"],
+                "table_name": table["table_name"],
+                "description": table["description"],
+                "indexes": table["indexes"],
+                "foreign_keys": table["foreign_keys"],
+            }
+            for table in snapshot.tables
+        ]
+    except Exception as e:
+        return [{"error": f"An error occurred while inspecting the database: {str(e)}"}]
+
+
 @mcp.tool()
-def inspect_database() -> List[Dict[str, Any]]:
+@_instrumented
+async def inspect_database() -> List[Dict[str, Any]]:
     """
     Inspects the connected database and retrieves a comprehensive list of all user-defined tables.
-    For each table, it provides the schema name, table name, and a description.
+    For each table, it provides the schema name, table name, a description, and the
+    table's secondary indexes and foreign keys, which show the cheap join and filter paths.
     The description is sourced from table comments (for PostgreSQL) or a 'data/schema.yaml' file (for SQLite).
-    This tool utilizes SQLAlchemy Inspector for database-agnostic metadata retrieval.
+    Metadata is served from the in-process schema catalog, which is rebuilt only when
+    schema.yaml or the database schema changes.
 
     Args:
         None
@@ -112,90 +616,267 @@ def inspect_database() -> List[Dict[str, Any]]:
             'schema_name' (str): The name of the schema the table belongs to.
             'table_name' (str): The name of the table.
             'description' (str): A description of the table.
+            'indexes' (list): One dictionary per index or UNIQUE constraint with
+                'name', 'columns' and 'unique'; the primary key is not listed.
+            'foreign_keys' (list): One dictionary per foreign key with 'columns',
+                'references_table' and 'references_columns'.
         If an error occurs during inspection, it returns a list containing a single
         dictionary with an 'error' key and a message describing the issue.
     """
-    try:
-        schema_path = Path(__file__).parent / "data" / "schema.yaml"
-        with open(schema_path, "r") as f:
-            schema_data = yaml.safe_load(f)
-        yaml_tables = schema_data.get("tables", {})
-    except Exception as e:
-        # If schema.yaml is not found or is invalid, proceed without it
-        # but log the error or notify. For simplicity here, we'll just initialize to empty.
-        print(f"Could not load or parse data/schema.yaml: {e}")
-        yaml_tables = {}
+    return await _run_db(_inspect_database)
 
-    try:
-        inspector = inspect(engine)
-        tables_info = []
-
-        # Get all schema names. For SQLite, this will usually just be ['main'].
-        # For PostgreSQL, it can include 'public' and user-defined schemas.
-        schemas = inspector.get_schema_names()
-
-        for schema in schemas:
-            # Exclude common system schemas. This list can be expanded if needed.
-            if engine.name == "postgresql" and schema in (
-                "pg_catalog",
-                "information_schema",
-                "pg_toast",
-                "pg_temp_1",
-                "pg_toast_temp_1",
-            ):
-                continue
-            if (
-                engine.name == "sqlite" and schema != "main"
-            ):  # For SQLite, only process 'main' for user tables
-                continue
-
-            for table_name in inspector.get_table_names(schema=schema):
-                description = "No description available"
-                if (
-                    engine.name == "postgresql"
-                ):  # Table comments are more reliably supported in PostgreSQL
-                    try:
-                        # Attempt to get table comment for PostgreSQL
-                        # This requires the table to have an OID, which is typical.
-                        comment_query = text(
-                            "SELECT obj_description(oid, 'pg_class') FROM pg_class WHERE relname = :table AND relnamespace = (SELECT oid FROM pg_namespace WHERE nspname = :schema)"
-                        )
-                        with engine.connect() as conn:
-                            result = conn.execute(
-                                comment_query, {"table": table_name, "schema": schema}
-                            ).scalar_one_or_none()
-                        if result:
-                            description = result
-                    except Exception:
-                        # If getting comment fails, stick to the default
-                        pass  # Keep "No description available"
-                elif engine.name == "sqlite":
-                    if table_name in yaml_tables:
-                        # If schema.yaml has a description field for the table, use it.
-                        # For now, assuming 'description' key might exist directly under the table name.
-                        # If schema.yaml structure is different, this lookup needs adjustment.
-                        description = yaml_tables[table_name].get(
-                            "description",
-                            "Defined in schema.yaml; description pending.",
-                        )
-                    else:
-                        description = "No description available (not in schema.yaml)"
 
-                tables_info.append(
+@_profiled("execute_query")
+def _execute_query(
+    query: str,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+    format: str = "records",
+    timeout_ms: Optional[int] = None,
+    include_partial: bool = False,
+    params: Optional[Dict[str, Any]] = None,
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """Synchronous implementation of `execute_query`; runs on the database thread pool."""
+    with phase("validate"):
+        format_error = (
+            _check_select(query)
+            or _format_error(format)
+            or _timeout_error(timeout_ms)
+            or _validate_params(params)
+        )
+        if format_error:
+            return [{"error": format_error}]
+
+        paginated = page_size is not None or cursor is not None
+        offset = 0
+        keyset = None
+        if paginated:
+            # Without a total order, rows can move between pages.
+            order_terms = order_by_terms(query)
+            if not order_terms:
+                return [
                     {
-                        "schema_name": schema,
-                        "table_name": table_name,
-                        "description": description,
+                        "error": "Paginated queries need a top-level ORDER BY, ideally "
+                        "ending in a unique column, so pages do not repeat or skip rows."
+                    }
+                ]
+        if cursor is not None:
+            try:
+                state = _decode_cursor(query, params, cursor)
+            except ValueError as e:
+                return [{"error": str(e)}]
+            offset = state["offset"]
+            keyset = state["keyset"]
+            page_size = page_size or state["page_size"]
+            if keyset is not None and len(keyset["c"]) != len(order_terms):
+                return [{"error": "Invalid cursor."}]
+    if paginated:
+        page_size = max(1, min(page_size or DEFAULT_PAGE_SIZE, MAX_RESULT_ROWS))
+
+    if paginated:
+        # One extra row tells us whether another page exists.
+        if keyset is not None:
+            statement, key_params = keyset_statement(
+                query, order_terms, keyset["c"], keyset["v"]
+            )
+            skip = keyset["e"]
+        else:
+            statement = (
+                f"SELECT * FROM ({query.strip().rstrip(';')}) "
+                "LIMIT :_page_limit OFFSET :_page_offset"
+            )
+            key_params, skip = {}, offset
+        bind_params = {
+            **(params or {}),
+            **key_params,
+            "_page_limit": page_size + 1,
+            "_page_offset": skip,
+        }
+        fetch_limit = page_size + 1
+    else:
+        statement, bind_params = query, dict(params or {})
+        fetch_limit = MAX_RESULT_ROWS + 1
+
+    engine = get_engine()
+    started = time.perf_counter()
+    stamp = _database_stamp(engine)
+    statement = normalize_sql(statement)
+    cache_key = (statement, freeze_params(bind_params), fetch_limit)
+    cached = result_cache.get(cache_key, stamp)
+    if cached is not None:
+        columns, rows = cached
+    else:
+        if timeout_ms is None:
+            timeout_ms = QUERY_TIMEOUT_MS
+        timeout_ms = min(timeout_ms, MAX_QUERY_TIMEOUT_MS)
+        guard = QueryGuard(timeout_ms, MAX_VM_STEPS)
+        columns, rows = [], []
+        failure = None
+        with phase("connect"):
+            connection = engine.connect()
+        with connection:
+            started = time.perf_counter()
+            try:
+                with guard.installed(connection):
+                    # Execute the query and get a Result object
+                    # SQLAlchemy's text() construct itself encourages parameterization if used correctly by the caller
+                    # when building the query string. For example, text("SELECT * FROM users WHERE id = :user_id")
+                    with phase("execute"):
+                        result_set = connection.execute(
+                            _compiled_statement(statement), bind_params
+                        )
+                    columns = list(result_set.keys())
+                    with phase("fetch"):
+                        _fetch_rows(result_set, fetch_limit, rows)
+            except Exception as e:
+                if guard.reason:
+                    failure = _interrupted_error(
+                        guard, columns, rows, format, include_partial
+                    )
+                else:
+                    failure = {
+                        "error": f"An error occurred while executing the query: {str(e)}"
                     }
+            duration_ms = (time.perf_counter() - started) * 1000
+            if slow_log.is_slow(duration_ms):
+                _log_slow_query(
+                    connection,
+                    query,
+                    statement,
+                    params,
+                    bind_params,
+                    duration_ms,
+                    len(rows),
+                    guard,
+                    failure,
                 )
-        return tables_info
+        if failure:
+            workload_stats.record(
+                query, params, _elapsed_ms(started), len(rows), error=True
+            )
+            return [failure]
+        result_cache.put(
+            cache_key, (columns, rows), estimate_result_size(columns, rows), stamp
+        )
+    query_log.record(query, params)
+
+    if paginated:
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        add_rows(len(rows))
+        with phase("serialize"):
+            encoded = _encode_rows(columns, rows, format)
+        page = encoded if format == "columnar" else {"rows": encoded}
+        page["row_count"] = len(rows)
+        next_cursor = None
+        if has_more:
+            # Continue by sort key when the ORDER BY names result columns and
+            # every earlier page did too; otherwise by offset.
+            names = None
+            if keyset is not None or offset == 0:
+                names = keyset_columns(order_terms, columns)
+            next_cursor = _encode_cursor(
+                query,
+                params,
+                offset + page_size,
+                page_size,
+                next_keyset(names, columns, rows, keyset) if names else None,
+            )
+        page["next_cursor"] = next_cursor
+        workload_stats.record(
+            query, params, _elapsed_ms(started), len(rows), cached=cached is not None
+        )
+        return page
+
+    add_rows(min(len(rows), MAX_RESULT_ROWS))
+    with phase("serialize"):
+        results = _encode_rows(columns, rows[:MAX_RESULT_ROWS], format)
+    if len(rows) > MAX_RESULT_ROWS:
+        warning = (
+            f"Result truncated at {MAX_RESULT_ROWS} rows. Pass page_size to paginate."
+        )
+        if format == "columnar":
+            results["warning"] = warning
+        else:
+            results.append({"warning": warning})
+    workload_stats.record(
+        query,
+        params,
+        _elapsed_ms(started),
+        min(len(rows), MAX_RESULT_ROWS),
+        cached=cached is not None,
+    )
+    return results
+
+
+def _elapsed_ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
+
 
+def _log_slow_query(
+    connection,
+    query: str,
+    statement: str,
+    params: Optional[Dict[str, Any]],
+    bind_params: Dict[str, Any],
+    duration_ms: float,
+    rows: int,
+    guard: QueryGuard,
+    failure: Optional[Dict[str, Any]],
+) -> None:
+    """Writes a slow statement, its current query plan and the plan's problems to the slow-query log."""
+    extra: Dict[str, Any] = {}
+    try:
+        analysis = analyze_query(
+            connection.connection.driver_connection, statement, bind_params
+        )
+        plan, issues = analysis["plan"], analysis["issues"]
     except Exception as e:
-        return [{"error": f"An error occurred while inspecting the database: {str(e)}"}]
+        plan, issues = None, []
+        extra["plan_error"] = str(e)
+    if failure:
+        extra["error"] = failure["error"]
+        if guard.reason:
+            extra["reason"] = guard.reason
+    slow_log.record(query, params, duration_ms, rows, plan, issues, **extra)
+
+
+def _interrupted_error(
+    guard: QueryGuard,
+    columns: List[str],
+    rows: List[tuple],
+    format: str,
+    include_partial: bool,
+) -> Dict[str, Any]:
+    """Describes a statement stopped by its QueryGuard."""
+    if guard.reason == "vm_budget":
+        cause = f"exceeded the budget of {MAX_VM_STEPS} VM steps"
+    else:
+        cause = "timed out"
+    error = {
+        "error": f"Query {cause} after {guard.elapsed_ms} ms, {len(rows)} rows produced.",
+        "timed_out": True,
+        "reason": guard.reason,
+        "elapsed_ms": guard.elapsed_ms,
+        "vm_steps": guard.vm_steps,
+        "rows_produced": len(rows),
+    }
+    if include_partial:
+        error["partial_rows"] = _encode_rows(columns, rows, format)
+    return error
 
 
 @mcp.tool()
-def execute_query(query: str) -> List[Dict[str, Any]]:
+@_instrumented
+async def execute_query(
+    query: str,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+    format: str = "records",
+    timeout_ms: Optional[int] = None,
+    include_partial: bool = False,
+    params: Optional[Dict[str, Any]] = None,
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
     """
     Execute a SQL SELECT query and return the results.
     For security reasons, only SELECT queries are permitted.
@@ -209,186 +890,372 @@ def execute_query(query: str) -> List[Dict[str, Any]]:
       SELECT query string is constructed dynamically (e.g., incorporating user input),
       the calling agent/client MUST STILL use parameterized queries (prepared statements)
       during the construction of that query string. This is the most robust defense
-      against SQL injection vulnerabilities.
+      against SQL injection vulnerabilities. Pass values through `params` with named
+      placeholders, e.g. query="SELECT * FROM Orders WHERE CustomerID = :cid" and
+      params={"cid": "CU001"}; repeated query shapes then also reuse the compiled statement.
     - This tool executes the provided query string after these checks. The responsibility
       for ensuring the internal components of the SELECT query are safe beyond these specific
       checks (e.g., properly escaped or parameterized if built dynamically) lies with the caller.
 
+    RESULT SIZE:
+    - At most SQL_MCP_MAX_ROWS rows (default 1000) are returned per call. Without
+      pagination, a longer result is cut off and ends with a {'warning': ...} entry.
+    - Pass `page_size` to paginate. The response then carries a `next_cursor`; pass
+      it back as `cursor` together with the same query and params to fetch the
+      next page.
+      A paginated query must have a top-level ORDER BY, ideally ending in a
+      unique column. When it sorts by result columns, the next page resumes
+      after the last row's sort key rather than re-reading earlier rows. Pages
+      are read from a fixed database version, and the cursor expires if the
+      database file changes.
+
     Args:
         query: The SQL SELECT query to execute.
+        page_size: Optional number of rows per page; enables paginated mode.
+        cursor: Optional continuation token returned by a previous page of this query.
+        format: 'records' (default) for one dictionary per row, or 'columnar' for a
+                single 'columns' header plus 'rows' as arrays, which is much smaller
+                for wide or long results.
+        timeout_ms: Optional deadline for this call in milliseconds, greater than 0
+                (server default SQL_MCP_QUERY_TIMEOUT_MS=10000, capped at
+                SQL_MCP_MAX_QUERY_TIMEOUT_MS).
+        include_partial: If the query is interrupted, also return the rows produced
+                before the interruption under 'partial_rows'.
+        params: Optional named bind parameters for ':name' placeholders in the query.
+                Values must be strings, numbers, booleans or null.
     Returns:
         List of dictionaries containing the query results, or an error message
         if the query is not a SELECT statement, contains disallowed characters,
         or if execution fails.
+        With format='columnar', a dictionary with 'columns' and 'rows' (and a
+        'warning' key if the result was truncated).
+        In paginated mode, a dictionary with 'rows' (encoded per `format`, plus
+        'columns' when columnar), 'row_count' (int) and 'next_cursor' (str, or
+        None on the last page).
+        A query that exceeds its deadline or the server's VM-instruction budget
+        (SQL_MCP_MAX_VM_STEPS) is interrupted and returns an error entry with
+        'timed_out': True, 'reason', 'elapsed_ms' and 'rows_produced'.
     """
-    query_upper = query.strip().upper()
-    if not query_upper.startswith("SELECT"):
-        return [
-            {
-                "error": "For security reasons, only SELECT queries are allowed. Ensure your query is a SELECT statement."
-            }
-        ]
+    return await _run_db(
+        _execute_query,
+        query,
+        page_size=page_size,
+        cursor=cursor,
+        format=format,
+        timeout_ms=timeout_ms,
+        include_partial=include_partial,
+        params=params,
+    )
 
-    # Internal check for common SQL comment markers
-    if "--" in query or "/*" in query:
-        return [
-            {
-                "error": "For security reasons, queries containing SQL comment markers (--, /*) are not allowed."
-            }
-        ]
 
-    with engine.connect() as connection:
-        try:
-            # Execute the query and get a Result object
-            # SQLAlchemy's text() construct itself encourages parameterization if used correctly by the caller
-            # when building the query string. For example, text("SELECT * FROM users WHERE id = :user_id")
-            result_set = connection.execute(text(query))
-
-            # Process query results
-            results = [
-                {
-                    key: (value.isoformat() if hasattr(value, "isoformat") else value)
-                    for key, value in row_mapping.items()
-                }
-                for row_mapping in result_set.mappings()
-            ]
-            return results
-        except Exception as e:
-            return [{"error": f"An error occurred while executing the query: {str(e)}"}]
+# Columns returned by search_customers.
+CUSTOMER_SEARCH_COLUMNS = (
+    "CustomerID",
+    "CompanyName",
+    "ContactName",
+    "ContactTitle",
+    "Address",
+    "City",
+    "Region",
+    "PostalCode",
+    "Country",
+    "Phone",
+    "Fax",
+)
+# The FTS5 trigram tokenizer cannot match terms shorter than three characters.
+FTS_TRIGRAM_MIN_LENGTH = 3
+
+
+def _fts_phrase(search_term: str) -> str:
+    """Quotes `search_term` as a single FTS5 phrase so operators in it are literal."""
+    return '"' + search_term.replace('"', '""') + '"'
+
+
+@_profiled("search_customers")
+def _search_customers(
+    search_term: str, limit: int = 10, format: str = "records"
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """Synchronous implementation of `search_customers`; runs on the database thread pool."""
+    format_error = _format_error(format)
+    if format_error:
+        return [{"error": format_error}]
+
+    try:
+        engine = get_engine()
+        # Resolve the 'Customers' table from the catalog, being mindful of case
+        with phase("catalog"):
+            snapshot = catalog.get(engine)
+        customer_table_name_actual = snapshot.resolve("Customers")
+
+        if not customer_table_name_actual:
+            return [{"error": "Table 'Customers' not found in the database."}]
+
+        fts_table = snapshot.fts_index(customer_table_name_actual)
+        if fts_table and len(search_term.strip()) >= FTS_TRIGRAM_MIN_LENGTH:
+            select_list = ", ".join(f"c.{col}" for col in CUSTOMER_SEARCH_COLUMNS)
+            query_string = f"""
+                SELECT {select_list}
+                FROM {fts_table}
+                JOIN {customer_table_name_actual} AS c ON c.rowid = {fts_table}.rowid
+                WHERE {fts_table} MATCH :match
+                ORDER BY bm25({fts_table}), c.CompanyName
+                LIMIT :limit
+            """
+            params = {"match": _fts_phrase(search_term.strip()), "limit": limit}
+        else:
+            query_string = f"""
+                SELECT {", ".join(CUSTOMER_SEARCH_COLUMNS)}
+                FROM {customer_table_name_actual}
+                WHERE CompanyName LIKE :search_pattern OR
+                      ContactName LIKE :search_pattern OR
+                      Phone LIKE :search_pattern
+                ORDER BY CompanyName
+                LIMIT :limit
+            """
+            params = {"search_pattern": f"%{search_term}%", "limit": limit}
+
+        with phase("connect"):
+            connection = engine.connect()
+        with connection:
+            with phase("execute"):
+                result_set = connection.execute(text(query_string), params)
+            with phase("fetch"):
+                columns, rows = _fetch_rows(result_set, MAX_RESULT_ROWS)
+        add_rows(len(rows))
+        if not rows:
+            message = "No customers found matching your search term."
+            if format == "columnar":
+                return {"columns": columns, "rows": [], "message": message}
+            return [{"message": message}]
+        with phase("serialize"):
+            return _encode_rows(columns, rows, format)
+    except Exception as e:
+        # This will catch errors from inspection or query execution
+        return [{"error": f"Error searching customers: {str(e)}"}]
 
 
 @mcp.tool()
-def search_customers(search_term: str, limit: int = 10) -> List[Dict[str, Any]]:
+@_instrumented
+async def search_customers(
+    search_term: str, limit: int = 10, format: str = "records"
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
     """
     Search for customers.
+    Uses the FTS5 trigram index built by the loader, ranked by relevance, when it exists
+    and the term is at least three characters long; otherwise falls back to a LIKE scan
+    of the whole Customers table. Terms of one or two characters, which includes most
+    Chinese given names such as "俊凱", always take the slower scan; search for the full
+    name (e.g. "陳俊凱") or a longer part of it to use the index.
 
     Args:
-        search_term: The keyword to search for (searches in Name, Email, and Phone).
+        search_term: The keyword to search for (searches in CompanyName, ContactName, and Phone).
         limit: The maximum number of results to return (default is 10).
+        format: 'records' (default) or 'columnar' ('columns' header plus 'rows' arrays).
 
     Returns:
-        A list of customer information.
+        A list of customer information, or a dictionary with 'columns' and 'rows'
+        when format='columnar'.
     """
-    inspector = inspect(engine)
-    customer_table_name_actual = None
+    return await _run_db(_search_customers, search_term, limit=limit, format=format)
+
+
+@_profiled("get_customer_info")
+def _get_customer_info(customer_id: str, format: str = "records") -> Dict[str, Any]:
+    """Synchronous implementation of `get_customer_info`; runs on the database thread pool."""
+    format_error = _format_error(format)
+    if format_error:
+        return {"error": format_error}
 
     try:
-        # Find the 'Customers' table, being mindful of schema and case
-        for schema_name in inspector.get_schema_names():
-            # Skip system schemas based on database type
-            if engine.name == "postgresql" and schema_name in (
-                "pg_catalog",
-                "information_schema",
-                "pg_toast",
-                "pg_temp_1",
-                "pg_toast_temp_1",
-            ):
-                continue
-            if engine.name == "sqlite" and schema_name != "main":
-                continue
-
-            for table_name in inspector.get_table_names(schema=schema_name):
-                if table_name.lower() == "customers":
-                    customer_table_name_actual = (
-                        table_name  # Use the actual casing from DB
-                    )
-                    break
-            if customer_table_name_actual:
-                break
+        engine = get_engine()
+        # Resolve the 'Customers' table from the catalog, being mindful of case
+        with phase("catalog"):
+            customer_table_name_actual = catalog.get(engine).resolve("Customers")
 
         if not customer_table_name_actual:
-            return [{"error": "Table 'Customers' not found in the database."}]
+            return {"error": "Table 'Customers' not found in the database."}
 
-        query_string = f"""
-            SELECT CustomerID, CompanyName, ContactName, ContactTitle, Address, City, Region, PostalCode, Country, Phone, Fax
-            FROM {customer_table_name_actual}
-            WHERE CompanyName LIKE :search_pattern OR
-                  ContactName LIKE :search_pattern OR
-                  Phone LIKE :search_pattern
-            ORDER BY CompanyName
-            LIMIT :limit
-        """
+        query_string = f"SELECT * FROM {customer_table_name_actual} WHERE CustomerID = :customer_id"
         query = text(query_string)
-        search_pattern = f"%{search_term}%"
 
-        with engine.connect() as connection:
-            result_set = connection.execute(
-                query, {"search_pattern": search_pattern, "limit": limit}
-            )
-            results = [
-                {
-                    key: (value.isoformat() if hasattr(value, "isoformat") else value)
-                    for key, value in row_mapping.items()
-                }
-                for row_mapping in result_set.mappings()
-            ]
-            if not results:
-                return [{"message": "No customers found matching your search term."}]
-            return results
+        with phase("connect"):
+            connection = engine.connect()
+        with connection:
+            with phase("execute"):
+                result_set = connection.execute(query, {"customer_id": customer_id})
+            with phase("fetch"):
+                columns, rows = _fetch_rows(result_set, 1)
+        add_rows(len(rows))
+
+        if not rows:
+            return {"error": f"No customer found with ID: {customer_id}"}
+
+        # Process the row into a dictionary, handling data types
+        with phase("serialize"):
+            if format == "columnar":
+                return _encode_rows(columns, rows, format)
+            return _rows_to_records(columns, rows)[0]
     except Exception as e:
-        # This will catch errors from inspection or query execution
-        return [{"error": f"Error searching customers: {str(e)}"}]
+        return {"error": f"Error retrieving customer info: {str(e)}"}
 
 
 @mcp.tool()
-def get_customer_info(customer_id: str) -> Dict[str, Any]:
+@_instrumented
+async def get_customer_info(
+    customer_id: str, format: str = "records"
+) -> Dict[str, Any]:
     """
     Get detailed information for a specific customer.
 
     Args:
         customer_id: The ID of the customer.
+        format: 'records' (default) or 'columnar' ('columns' header plus a one-element 'rows').
 
     Returns:
         A dictionary containing customer information.
     """
-    inspector = inspect(engine)
-    customer_table_name_actual = None
+    return await _run_db(_get_customer_info, customer_id, format=format)
 
+
+@_profiled("recommend_indexes")
+def _recommend_indexes(queries: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Synchronous implementation of `recommend_indexes`; runs on the database thread pool."""
+    engine = get_engine()
+    if engine.name != "sqlite":
+        return {"error": "The index advisor only supports SQLite databases."}
+    if queries:
+        for query in queries:
+            error = _check_select(query)
+            if error:
+                return {"error": error}
+        workload = [{"query": q, "params": {}, "count": 1} for q in queries]
+    else:
+        workload = query_log.workload()
+    if not workload:
+        return {
+            "error": "No queries to analyze. Pass `queries` or run execute_query first."
+        }
     try:
-        # Find the 'Customers' table, being mindful of schema and case
-        for schema_name in inspector.get_schema_names():
-            # Skip system schemas based on database type
-            if engine.name == "postgresql" and schema_name in (
-                "pg_catalog",
-                "information_schema",
-                "pg_toast",
-                "pg_temp_1",
-                "pg_toast_temp_1",
-            ):
-                continue
-            if engine.name == "sqlite" and schema_name != "main":
-                continue
-
-            for table_name in inspector.get_table_names(schema=schema_name):
-                if table_name.lower() == "customers":
-                    customer_table_name_actual = (
-                        table_name  # Use the actual casing from DB
-                    )
-                    break
-            if customer_table_name_actual:
-                break
+        with engine.connect() as connection:
+            return _advise(connection.connection.driver_connection, workload)
+    except Exception as e:
+        return {"error": f"An error occurred while analyzing queries: {str(e)}"}
 
-        if not customer_table_name_actual:
-            return {"error": "Table 'Customers' not found in the database."}
 
-        query_string = f"SELECT * FROM {customer_table_name_actual} WHERE CustomerID = :customer_id"
-        query = text(query_string)
+@mcp.tool()
+@_instrumented
+async def recommend_indexes(queries: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Recommends indexes for slow query shapes using SQLite's EXPLAIN QUERY PLAN.
+    Each statement is explained, not executed. Full table scans, automatic
+    indexes and temporary B-tree sorts (ORDER BY / GROUP BY) are reported, and
+    the filter, join and sort columns behind them become CREATE INDEX suggestions.
+    Indexes that already exist are not suggested again. The server database is
+    read-only, so the statements are for an operator to review and apply; the
+    `python -m sql_mcp.advisor` CLI can also time them against a workload file.
 
-        with engine.connect() as connection:
-            result_set = connection.execute(query, {"customer_id": customer_id})
-            row_mapping = result_set.mappings().fetchone()
+    Args:
+        queries: Optional SELECT statements to analyze. Defaults to the statements
+                 recently run through execute_query (SQL_MCP_QUERY_LOG_SIZE distinct
+                 statements), weighted by how often each ran.
 
-            if not row_mapping:
-                return {"error": f"No customer found with ID: {customer_id}"}
+    Returns:
+        A dictionary with 'queries' (per statement: 'query', 'count', 'plan',
+        'issues') and 'recommendations' (per index: 'table', 'columns', 'name',
+        'sql', 'reasons', 'queries' and 'weight', most used first), or a
+        dictionary with an 'error' key.
+    """
+    return await _run_db(_recommend_indexes, queries)
 
-            # Process the row into a dictionary, handling data types
-            result = {
-                key: (value.isoformat() if hasattr(value, "isoformat") else value)
-                for key, value in row_mapping.items()
-            }
-            return result
-    except Exception as e:
-        return {"error": f"Error retrieving customer info: {str(e)}"}
+
+@mcp.tool()
+@_instrumented
+async def cache_stats() -> Dict[str, Any]:
+    """
+    Reports the execute_query result cache counters.
+
+    Returns:
+        A dictionary with 'entries', 'bytes', 'max_bytes', 'hits', 'misses',
+        'hit_ratio', 'evictions' and 'invalidations' (cache drops caused by a
+        change to the database file), plus 'statement_cache' counters for the
+        compiled-statement cache and 'database_reloads' (times a replaced
+        database file was reopened).
+    """
+    stats = result_cache.stats()
+    info = _compiled_statement.cache_info()
+    stats["statement_cache"] = {
+        "entries": info.currsize,
+        "max_entries": info.maxsize,
+        "hits": info.hits,
+        "misses": info.misses,
+    }
+    stats["database_reloads"] = database_reloads
+    return stats
+
+
+@_profiled("query_workload")
+def _query_workload(
+    order_by: str = "total_ms", limit: int = 20, as_workload: bool = False
+) -> Dict[str, Any]:
+    """Synchronous implementation of `query_workload`."""
+    if as_workload:
+        return {"workload": workload_stats.workload()}
+    if order_by not in ORDER_KEYS:
+        return {
+            "error": f"Unsupported order_by '{order_by}'. Use one of: {', '.join(ORDER_KEYS)}."
+        }
+    return workload_stats.top(order_by, max(1, limit))
+
+
+@mcp.tool()
+@_instrumented
+async def query_workload(
+    order_by: str = "total_ms", limit: int = 20, as_workload: bool = False
+) -> Dict[str, Any]:
+    """
+    Reports which query shapes dominate execute_query time.
+    Every statement is fingerprinted: literals become '?', IN lists of literals
+    become 'in (?+)', and whitespace and letter case are normalized, so calls
+    that differ only in their values share one entry.
+
+    Args:
+        order_by: 'total_ms' (default), 'calls', 'mean_ms', 'max_ms', 'rows' or 'errors'.
+        limit: Number of fingerprints to return (default 20).
+        as_workload: Return every fingerprint as a replayable workload instead:
+                     {'workload': [{'query', 'params', 'count'}, ...]}, using the
+                     latest successful statement of each shape. The same format
+                     is read by `python -m sql_mcp.advisor --workload` and
+                     benchmarks/bench_tools.py --workload.
+
+    Returns:
+        A dictionary with 'fingerprints', 'tracked' (fingerprints held, at most
+        SQL_MCP_WORKLOAD_SIZE), 'evicted' (dropped for having the least total
+        time) and 'total_ms'. Each fingerprint has 'id', 'fingerprint', 'calls',
+        'errors', 'cache_hits', 'total_ms', 'mean_ms', 'max_ms', 'rows',
+        'time_pct' (share of total time), 'example' and 'params'.
+    """
+    return _query_workload(order_by, limit, as_workload)
+
+
+@mcp.tool()
+async def server_stats() -> Dict[str, Any]:
+    """
+    Reports per-tool call metrics since the server started.
+    Use it to see where the time of a slow session went: schema catalog
+    lookups, waiting for a pooled connection, SQL execution, row fetching or
+    result encoding.
+
+    Returns:
+        A dictionary with 'enabled' (False when SQL_MCP_METRICS=0),
+        'uptime_s', 'in_flight' (tool calls running now) and 'tools'. Per tool:
+        'calls', 'errors', 'error_rate', 'rows' (rows read from the database),
+        'bytes' and 'max_bytes' (JSON response size), 'latency' and 'phases'.
+        'latency' and each phase ('validate', 'catalog', 'connect', 'execute',
+        'fetch', 'serialize') carry 'count', 'total_ms', 'mean_ms', 'p50_ms',
+        'p95_ms', 'p99_ms' and 'max_ms'; percentiles are estimated from
+        histogram buckets. server_stats calls are not counted.
+    """
+    return metrics.snapshot()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,300 @@
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Slow-query log for execute_query.
+
+Statements slower than a threshold are appended to a JSONL file, one object per
+statement, with the EXPLAIN QUERY PLAN captured right after the statement ran
+and the plan problems (full scans, automatic indexes, temp B-trees) the index
+advisor finds in it.
+The file is rotated by size like logging's RotatingFileHandler (slow.jsonl,
+slow.jsonl.1, ...). The CLI summarizes a log and its rotated files:
+
+    python -m sql_mcp.slowlog sql_mcp/data/slow_queries.jsonl --top 20
+    python -m sql_mcp.slowlog slow.jsonl --workload workload.jsonl
+    python -m sql_mcp.advisor --db sql_mcp/data/erp_demo.db --workload workload.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from .cache import normalize_sql
+
+
+class SlowQueryLog:
+    """
+    Thread-safe, size-rotated JSONL log of statements slower than `threshold_ms`.
+
+    Disabled when `path` is None. Write errors are reported once on stderr and
+    never reach the tool call that triggered them.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        threshold_ms: float = 500.0,
+        max_bytes: int = 10 * 1024 * 1024,
+        backups: int = 5,
+    ):
+        self.path = path
+        self.threshold_ms = threshold_ms
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+        self._warned = False
+        self.entries = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def is_slow(self, duration_ms: float) -> bool:
+        return self.enabled and duration_ms >= self.threshold_ms
+
+    def record(
+        self,
+        query: str,
+        params: Optional[Dict[str, Any]],
+        duration_ms: float,
+        rows: int,
+        plan: Optional[List[str]],
+        issues: Optional[List[Dict[str, Any]]] = None,
+        **extra: Any,
+    ) -> None:
+        """
+        Appends one entry. `issues` are `advisor.analyze_query` issues; `extra`
+        keys (e.g. 'error', 'reason') are stored as given.
+        """
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "query": normalize_sql(query),
+            "params": dict(params or {}),
+            "duration_ms": round(duration_ms, 3),
+            "rows": rows,
+            "plan": plan,
+            "issues": issues or [],
+            **extra,
+        }
+        line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+        data = line.encode("utf-8")
+        with self._lock:
+            try:
+                self._rotate_if_needed(len(data))
+                with open(self.path, "ab") as f:
+                    f.write(data)
+                self.entries += 1
+            except OSError as e:
+                if not self._warned:
+                    self._warned = True
+                    # stdout carries the MCP stdio protocol.
+                    print(
+                        f"Cannot write slow-query log {self.path}: {e}", file=sys.stderr
+                    )
+
+    def _rotate_if_needed(self, incoming: int) -> None:
+        if self.max_bytes <= 0:
+            return
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size == 0 or size + incoming <= self.max_bytes:
+            return
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+def slow_log_from_env() -> SlowQueryLog:
+    """Builds the log from SQL_MCP_SLOW_LOG, SQL_MCP_SLOW_QUERY_MS, SQL_MCP_SLOW_LOG_MAX_BYTES and SQL_MCP_SLOW_LOG_BACKUPS."""
+    return SlowQueryLog(
+        os.environ.get("SQL_MCP_SLOW_LOG") or None,
+        threshold_ms=float(os.environ.get("SQL_MCP_SLOW_QUERY_MS", "500")),
+        max_bytes=int(
+            os.environ.get("SQL_MCP_SLOW_LOG_MAX_BYTES", str(10 * 1024 * 1024))
+        ),
+        backups=int(os.environ.get("SQL_MCP_SLOW_LOG_BACKUPS", "5")),
+    )
+
+
+def log_files(path: Path) -> List[Path]:
+    """Returns `path` and its rotated files, oldest first."""
+    rotated = sorted(
+        (p for p in path.parent.glob(path.name + ".*") if p.suffix[1:].isdigit()),
+        key=lambda p: int(p.suffix[1:]),
+        reverse=True,
+    )
+    return rotated + ([path] if path.exists() else [])
+
+
+def read_entries(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yields the entries of a slow log and its rotated files; bad lines are skipped."""
+    for file in log_files(path):
+        with open(file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash
+                if isinstance(entry, dict) and entry.get("query"):
+                    yield entry
+
+
+def issue_labels(issues: List[Dict[str, Any]]) -> List[str]:
+    """Short labels such as 'full scan Orders' or 'temp b-tree order by'."""
+    labels = []
+    for issue in issues:
+        kind = issue.get("type", "").replace("_", " ")
+        target = issue.get("table") or issue.get("purpose", "").lower()
+        labels.append(f"{kind.replace('temp btree', 'temp b-tree')} {target}".strip())
+    return labels
+
+
+def summarize(entries: Iterator[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Groups entries by normalized query text.
+
+    Returns:
+        A dictionary with 'entries', 'queries' (per statement: 'query',
+        'count', 'total_ms', 'mean_ms', 'max_ms', 'max_rows', 'errors',
+        'issues', 'last_seen' and 'params' of the slowest run, by total time)
+        and 'full_scans' (per table: 'queries', 'count', 'total_ms').
+    """
+    groups: Dict[str, Dict[str, Any]] = {}
+    total = 0
+    for entry in entries:
+        total += 1
+        group = groups.get(entry["query"])
+        if group is None:
+            group = groups[entry["query"]] = {
+                "query": entry["query"],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "max_rows": 0,
+                "errors": 0,
+                "issues": [],
+                "params": {},
+                "last_seen": None,
+            }
+        duration = float(entry.get("duration_ms") or 0)
+        group["count"] += 1
+        group["total_ms"] += duration
+        group["max_rows"] = max(group["max_rows"], entry.get("rows") or 0)
+        group["errors"] += bool(entry.get("error"))
+        group["last_seen"] = entry.get("ts")
+        if duration >= group["max_ms"]:
+            group["max_ms"] = duration
+            group["params"] = entry.get("params") or {}
+        for issue in issue_labels(entry.get("issues") or []):
+            if issue not in group["issues"]:
+                group["issues"].append(issue)
+
+    queries = sorted(groups.values(), key=lambda g: g["total_ms"], reverse=True)
+    scans: Dict[str, Dict[str, Any]] = defaultdict(
+        lambda: {"queries": 0, "count": 0, "total_ms": 0.0}
+    )
+    for group in queries:
+        group["mean_ms"] = round(group["total_ms"] / group["count"], 3)
+        group["total_ms"] = round(group["total_ms"], 3)
+        for issue in group["issues"]:
+            if issue.startswith("full scan "):
+                table = scans[issue[len("full scan ") :]]
+                table["queries"] += 1
+                table["count"] += group["count"]
+                table["total_ms"] = round(table["total_ms"] + group["total_ms"], 3)
+    return {
+        "entries": total,
+        "queries": queries,
+        "full_scans": dict(
+            sorted(scans.items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        ),
+    }
+
+
+def _print_summary(summary: Dict[str, Any], top: int) -> None:
+    print(f"{summary['entries']} slow statements, {len(summary['queries'])} distinct")
+    if summary["full_scans"]:
+        print("\nFull table scans:")
+        for table, stats in summary["full_scans"].items():
+            print(
+                f"  {table:<24}{stats['queries']:>5} queries{stats['count']:>7} runs"
+                f"{stats['total_ms']:>12.1f} ms"
+            )
+    print(f"\nTop {min(top, len(summary['queries']))} by total time:")
+    for group in summary["queries"][:top]:
+        print(
+            f"* {group['total_ms']:.1f} ms total, {group['count']} runs, "
+            f"mean {group['mean_ms']:.1f} ms, max {group['max_ms']:.1f} ms, "
+            f"max rows {group['max_rows']}"
+            + (f", {group['errors']} errors" if group["errors"] else "")
+        )
+        print(f"    {group['query']}")
+        if group["issues"]:
+            print(f"    {'; '.join(group['issues'])}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument(
+        "log", type=Path, help="Slow-query log (rotated files are read too)."
+    )
+    parser.add_argument(
+        "--top", type=int, default=10, help="Statements to list (default: 10)."
+    )
+    parser.add_argument(
+        "--workload",
+        type=Path,
+        help="Also write the statements as a workload file for `python -m sql_mcp.advisor`.",
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Print the summary as JSON."
+    )
+    args = parser.parse_args(argv)
+    if not log_files(args.log):
+        parser.error(f"slow-query log not found: {args.log}")
+
+    summary = summarize(read_entries(args.log))
+    if args.workload:
+        with open(args.workload, "w", encoding="utf-8") as f:
+            for group in summary["queries"]:
+                item = {
+                    "query": group["query"],
+                    "params": group["params"],
+                    "count": group["count"],
+                }
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    if args.json:
+        json.dump(summary, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        _print_summary(summary, args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,498 @@
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Spans for the agent → MCP → SQL path, written to a local JSONL file.
+
+With SQL_MCP_TRACE_FILE set, crm_agent records a span per agent turn, model
+call and tool call, and passes the W3C traceparent of each tool span to the
+MCP server (as the `trace_context` tool argument or as `traceparent` in the
+request `_meta`). The server continues that trace with a span per tool call,
+per tool phase (validate, catalog, connect, execute, fetch, serialize) and per
+SQL statement. Both processes append to the same file, one span per line.
+
+The CLI converts the file for chrome://tracing or https://ui.perfetto.dev and
+prints the critical path of each trace:
+
+    python -m sql_mcp.tracing traces.jsonl --chrome trace.json
+    python -m sql_mcp.tracing traces.jsonl --trace 4bf92f3577b34da6a3ce929d0e0e4736
+
+When SQL_MCP_TRACE_FILE is unset, `Tracer.span()` returns a shared no-op
+context manager and no SQLAlchemy listeners are installed.
+"""
+
+import argparse
+import contextlib
+import contextvars
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# (trace ID, span ID) of a parent span, local or from a traceparent header.
+SpanContext = Tuple[str, str]
+
+_TRACEPARENT_RE = re.compile(
+    r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$"
+)
+# Longest SQL text stored on a statement span.
+MAX_STATEMENT_CHARS = 2000
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """Returns (trace ID, parent span ID) of a W3C traceparent, or None if it is not one."""
+    if not value or not isinstance(value, str):
+        return None
+    match = _TRACEPARENT_RE.match(value.strip().lower())
+    if not match:
+        return None
+    version, trace_id, span_id = match.groups()
+    if version == "ff" or not int(trace_id, 16) or not int(span_id, 16):
+        return None
+    return trace_id, span_id
+
+
+def format_traceparent(context: SpanContext) -> str:
+    trace_id, span_id = context
+    return f"00-{trace_id}-{span_id}-01"
+
+
+class Span:
+    """One timed operation; `end()` records it, later calls are ignored."""
+
+    __slots__ = (
+        "tracer",
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "attributes",
+        "start_us",
+        "error",
+        "_start",
+        "_ended",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        parent: Optional[SpanContext],
+        attributes: Dict[str, Any],
+    ):
+        self.tracer = tracer
+        self.name = name
+        if parent is None:
+            self.trace_id = f"{random.getrandbits(128):032x}"
+            self.parent_id = None
+        else:
+            self.trace_id, self.parent_id = parent
+        self.span_id = f"{random.getrandbits(64) or 1:016x}"
+        self.attributes = attributes
+        self.error: Optional[str] = None  # set to mark the span as failed
+        # Wall clock for lining up processes, monotonic clock for the duration.
+        self.start_us = time.time_ns() // 1000
+        self._start = time.perf_counter_ns()
+        self._ended = False
+
+    @property
+    def context(self) -> SpanContext:
+        return self.trace_id, self.span_id
+
+    @property
+    def traceparent(self) -> str:
+        return format_traceparent(self.context)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def end(self, error: Optional[str] = None) -> None:
+        if self._ended:
+            return
+        self._ended = True
+        error = error or self.error
+        duration_us = (time.perf_counter_ns() - self._start) // 1000
+        thread = threading.current_thread()
+        self.tracer.export(
+            {
+                "trace_id": self.trace_id,
+                "span_id": self.span_id,
+                "parent_id": self.parent_id,
+                "name": self.name,
+                "service": self.tracer.service,
+                "start_us": self.start_us,
+                "duration_us": duration_us,
+                "pid": os.getpid(),
+                "thread": thread.name,
+                "status": "error" if error else "ok",
+                "error": error,
+                "attributes": self.attributes,
+            }
+        )
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "sql_mcp_span", default=None
+)
+
+
+def current_span() -> Optional[Span]:
+    """The innermost span opened with `Tracer.span()` in this context."""
+    return _current_span.get()
+
+
+class Tracer:
+    """
+    Creates spans and appends them to `path` as JSONL, one line per span.
+
+    Disabled when `path` is None. Every span is written with a single append,
+    so several processes can share one file. Write errors are reported once
+    on stderr and never reach the traced code.
+    """
+
+    def __init__(self, path: Optional[str], service: str = "sql_mcp"):
+        self.path = path
+        self.service = service
+        self.spans = 0
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._warned = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def start_span(
+        self, name: str, parent: Optional[SpanContext] = None, **attributes: Any
+    ) -> Optional[Span]:
+        """
+        Starts a span under `parent`, or under the current span when `parent`
+        is None; a new trace when there is neither. None when disabled.
+        """
+        if not self.enabled:
+            return None
+        if parent is None:
+            current = _current_span.get()
+            parent = current.context if current is not None else None
+        return Span(self, name, parent, attributes)
+
+    def span(self, name: str, parent: Optional[SpanContext] = None, **attributes: Any):
+        """Context manager that makes a new span current; yields None when disabled."""
+        if not self.enabled:
+            return _NO_SPAN
+        return self._span(name, parent, attributes)
+
+    @contextlib.contextmanager
+    def _span(
+        self, name: str, parent: Optional[SpanContext], attributes: Dict[str, Any]
+    ) -> Iterator[Span]:
+        span = self.start_span(name, parent, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(error=f"{type(e).__name__}: {e}")
+            raise
+        else:
+            span.end()
+        finally:
+            _current_span.reset(token)
+
+    def export(self, record: Dict[str, Any]) -> None:
+        data = (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode(
+            "utf-8"
+        )
+        with self._lock:
+            try:
+                if self._fd is None:
+                    self._fd = os.open(
+                        self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644
+                    )
+                os.write(self._fd, data)
+                self.spans += 1
+            except OSError as e:
+                if not self._warned:
+                    self._warned = True
+                    # stdout carries the MCP stdio protocol.
+                    print(f"Cannot write trace file {self.path}: {e}", file=sys.stderr)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+def tracer_from_env(service: str = "sql_mcp") -> Tracer:
+    """Builds the tracer from SQL_MCP_TRACE_FILE."""
+    return Tracer(os.environ.get("SQL_MCP_TRACE_FILE") or None, service)
+
+
+def instrument_sqlalchemy() -> None:
+    """
+    Records a span per SQL statement, on every Engine, for statements that run
+    inside a current span (under that span's tracer). The span covers
+    cursor.execute(); rows fetched afterwards count toward the enclosing
+    'fetch' phase.
+    """
+    for name, listener in _SQL_LISTENERS:
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+
+
+def uninstrument_sqlalchemy() -> None:
+    for name, listener in _SQL_LISTENERS:
+        if event.contains(Engine, name, listener):
+            event.remove(Engine, name, listener)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    current = _current_span.get()
+    if current is None or context is None:
+        return
+    context._sql_mcp_span = current.tracer.start_span(
+        "sql",
+        current.context,
+        **{
+            "db.system": conn.dialect.name,
+            "db.statement": statement[:MAX_STATEMENT_CHARS],
+            "db.executemany": executemany,
+        },
+    )
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = getattr(context, "_sql_mcp_span", None)
+    if span is not None:
+        context._sql_mcp_span = None
+        span.end()
+
+
+def _handle_error(exception_context):
+    span = getattr(exception_context.execution_context, "_sql_mcp_span", None)
+    if span is not None:
+        exception_context.execution_context._sql_mcp_span = None
+        error = exception_context.original_exception
+        span.end(error=f"{type(error).__name__}: {error}")
+
+
+_SQL_LISTENERS = (
+    ("before_cursor_execute", _before_cursor_execute),
+    ("after_cursor_execute", _after_cursor_execute),
+    ("handle_error", _handle_error),
+)
+
+
+def read_spans(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yields the spans of a trace file; bad lines are skipped."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                span = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a crash
+            if isinstance(span, dict) and span.get("trace_id") and span.get("span_id"):
+                yield span
+
+
+def group_traces(spans: Iterator[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Groups spans by trace ID, each trace ordered by start time."""
+    traces: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for span in spans:
+        traces[span["trace_id"]].append(span)
+    for spans_of_trace in traces.values():
+        spans_of_trace.sort(key=lambda s: (s["start_us"], -s["duration_us"]))
+    return dict(traces)
+
+
+def _end_us(span: Dict[str, Any]) -> int:
+    return span["start_us"] + span["duration_us"]
+
+
+def critical_path(trace: List[Dict[str, Any]]) -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    Returns the critical path of a trace as (depth, span) pairs.
+
+    Starting at the longest root, the path descends into the child that ends
+    last, then, walking back in time, into each earlier child that ended
+    before the previous one started: the chain of work the root waited for.
+    Spans whose parent is not in the trace (e.g. the agent side was not
+    traced) are treated as roots.
+    """
+    ids = {span["span_id"] for span in trace}
+    children: Dict[Optional[str], List[Dict[str, Any]]] = defaultdict(list)
+    for span in trace:
+        parent = span.get("parent_id")
+        children[parent if parent in ids else None].append(span)
+    if not children[None]:
+        return []
+    path: List[Tuple[int, Dict[str, Any]]] = []
+
+    def visit(span: Dict[str, Any], depth: int):
+        path.append((depth, span))
+        chain = []
+        limit = _end_us(span)
+        for child in sorted(
+            children.get(span["span_id"], ()), key=_end_us, reverse=True
+        ):
+            if _end_us(child) <= limit:
+                chain.append(child)
+                limit = child["start_us"]
+        for child in reversed(chain):
+            visit(child, depth + 1)
+
+    visit(max(children[None], key=lambda s: s["duration_us"]), 0)
+    return path
+
+
+def to_chrome_trace(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Converts spans to the Chrome trace event format: one process per
+    service and process ID, one thread row per thread name.
+    """
+    events: List[Dict[str, Any]] = []
+    threads: Dict[Tuple[int, str], int] = {}
+    processes = set()
+    for span in spans:
+        pid = span.get("pid", 0)
+        if pid not in processes:
+            processes.add(pid)
+            events.append(
+                {
+                    "ph": "M",
+                    "name": "process_name",
+                    "pid": pid,
+                    "args": {"name": f"{span.get('service', '?')} ({pid})"},
+                }
+            )
+        key = (pid, span.get("thread", ""))
+        if key not in threads:
+            threads[key] = len(threads) + 1
+            events.append(
+                {
+                    "ph": "M",
+                    "name": "thread_name",
+                    "pid": pid,
+                    "tid": threads[key],
+                    "args": {"name": key[1]},
+                }
+            )
+        events.append(
+            {
+                "ph": "X",
+                "name": span["name"],
+                "cat": span.get("service", ""),
+                "ts": span["start_us"],
+                "dur": span["duration_us"],
+                "pid": pid,
+                "tid": threads[key],
+                "args": {
+                    **(span.get("attributes") or {}),
+                    "trace_id": span["trace_id"],
+                    "span_id": span["span_id"],
+                    "parent_id": span.get("parent_id"),
+                    "status": span.get("status"),
+                    **({"error": span["error"]} if span.get("error") else {}),
+                },
+            }
+        )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def _print_trace(trace_id: str, trace: List[Dict[str, Any]]) -> None:
+    path = critical_path(trace)
+    if not path:
+        return
+    root = path[0][1]
+    errors = sum(span.get("status") == "error" for span in trace)
+    print(
+        f"trace {trace_id}: {root['name']} {root['duration_us'] / 1000:.1f} ms, "
+        f"{len(trace)} spans" + (f", {errors} errors" if errors else "")
+    )
+    # Runs of same-named leaf spans (e.g. catalog reflection queries) share a line.
+    lines: List[List[Any]] = []
+    for i, (depth, span) in enumerate(path):
+        leaf = i + 1 == len(path) or path[i + 1][0] <= depth
+        previous = lines[-1] if lines else None
+        if (
+            leaf
+            and previous is not None
+            and previous[3]
+            and previous[0] == depth
+            and previous[1]["name"] == span["name"]
+        ):
+            previous[2] += span["duration_us"]
+            previous[4] += 1
+            continue
+        lines.append([depth, span, span["duration_us"], leaf, 1])
+    for depth, span, duration_us, _, count in lines:
+        if count > 1:
+            detail = f"  x{count}"
+        else:
+            detail = span.get("attributes", {}).get("db.statement", "")
+            detail = f"  {' '.join(detail.split())[:80]}" if detail else ""
+        print(
+            f"  {duration_us / 1000:>10.1f} ms  {'  ' * depth}{span['name']}"
+            f" [{span.get('service', '?')}]{detail}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("file", type=Path, help="Trace file (SQL_MCP_TRACE_FILE).")
+    parser.add_argument(
+        "--chrome",
+        type=Path,
+        help="Write the spans in the Chrome trace event format (chrome://tracing, Perfetto).",
+    )
+    parser.add_argument("--trace", help="Only this trace ID.")
+    parser.add_argument(
+        "--last",
+        type=int,
+        default=5,
+        help="Critical paths to print, most recent traces (default: 5).",
+    )
+    args = parser.parse_args(argv)
+    if not args.file.exists():
+        parser.error(f"trace file not found: {args.file}")
+
+    traces = group_traces(read_spans(args.file))
+    if args.trace:
+        traces = {k: v for k, v in traces.items() if k == args.trace}
+        if not traces:
+            parser.error(f"trace not found: {args.trace}")
+    if args.chrome:
+        spans = [span for trace in traces.values() for span in trace]
+        with open(args.chrome, "w", encoding="utf-8") as f:
+            json.dump(to_chrome_trace(spans), f, ensure_ascii=False)
+        print(f"Wrote {len(spans)} spans to {args.chrome}")
+    recent = sorted(traces.items(), key=lambda item: item[1][0]["start_us"])
+    for trace_id, trace in recent[-args.last :] if args.last > 0 else []:
+        _print_trace(trace_id, trace)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Query fingerprints and per-fingerprint workload aggregates for execute_query.
+
+A fingerprint is the statement with string, numeric and blob literals replaced
+by '?', IN lists of literals collapsed to 'in (?+)', whitespace collapsed and
+made uniform around operators, and everything outside quoted identifiers
+lower-cased, so 'SELECT * FROM Orders WHERE OrderID = 'SO001'' and
+'select *  from orders where orderid='SO002'' are the same query shape.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+# Quoted strings, quoted identifiers, or a bare literal outside of them.
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<string>'(?:[^']|'')*')
+    | (?P<identifier>"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])
+    | (?P<blob>\b[xX]'[0-9A-Fa-f]*')
+    | (?P<number>(?<![\w:@$])-?(?:0[xX][0-9A-Fa-f]+|\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?))
+    """,
+    re.VERBOSE,
+)
+_IN_LIST_RE = re.compile(r"\bin\s*\(\?(?:, \?)*\)")
+_SPACE_RE = re.compile(r"\s+")
+_OPERATOR_RE = re.compile(r"\s*(<=|>=|<>|!=|==|=|<|>)\s*")
+_COMMA_RE = re.compile(r"\s*,\s*")
+_OPEN_PAREN_RE = re.compile(r"\(\s+")
+_CLOSE_PAREN_RE = re.compile(r"\s+\)")
+# Fields of a fingerprint's aggregate that `top()` can order by.
+ORDER_KEYS = ("total_ms", "calls", "mean_ms", "max_ms", "rows", "errors")
+
+
+def _normalize_text(text: str) -> str:
+    """Lower-cases SQL outside quotes and spaces operators, commas and parentheses uniformly."""
+    text = _OPERATOR_RE.sub(r" \1 ", text.lower())
+    text = _COMMA_RE.sub(", ", text)
+    return _CLOSE_PAREN_RE.sub(")", _OPEN_PAREN_RE.sub("(", text))
+
+
+def fingerprint(query: str) -> str:
+    """Returns the literal-free, lower-cased shape of a SQL statement."""
+    parts: List[str] = []
+    position = 0
+    for match in _TOKEN_RE.finditer(query):
+        parts.append(_normalize_text(query[position : match.start()]))
+        if match.lastgroup == "identifier":
+            parts.append(match.group().lower())
+        else:
+            parts.append("?")
+        position = match.end()
+    parts.append(_normalize_text(query[position:]))
+    shape = _SPACE_RE.sub(" ", "".join(parts)).strip().rstrip(";").strip()
+    return _IN_LIST_RE.sub("in (?+)", shape)
+
+
+def fingerprint_id(shape: str) -> str:
+    """Short stable ID of a fingerprint."""
+    return hashlib.sha256(shape.encode("utf-8")).hexdigest()[:16]
+
+
+class WorkloadStats:
+    """
+    Thread-safe running aggregates per query fingerprint.
+
+    At most `max_entries` fingerprints are tracked; when a new one arrives at
+    the limit, the fingerprint with the least total time is dropped, so the
+    shapes that dominate the workload stay. 0 turns recording off.
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self.evicted = 0
+
+    def record(
+        self,
+        query: str,
+        params: Optional[Dict[str, Any]],
+        duration_ms: float,
+        rows: int,
+        cached: bool = False,
+        error: bool = False,
+    ) -> None:
+        if self.max_entries <= 0:
+            return
+        shape = fingerprint(query)
+        with self._lock:
+            entry = self._entries.get(shape)
+            if entry is None:
+                if len(self._entries) >= self.max_entries:
+                    smallest = min(
+                        self._entries, key=lambda k: self._entries[k]["total_ms"]
+                    )
+                    del self._entries[smallest]
+                    self.evicted += 1
+                entry = self._entries[shape] = {
+                    "id": fingerprint_id(shape),
+                    "fingerprint": shape,
+                    "calls": 0,
+                    "errors": 0,
+                    "cache_hits": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "rows": 0,
+                    "example": None,
+                    "params": {},
+                }
+            entry["calls"] += 1
+            entry["errors"] += error
+            entry["cache_hits"] += cached
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+            entry["rows"] += rows
+            if not error:
+                # The latest statement that worked, for replaying the shape.
+                entry["example"] = query
+                entry["params"] = dict(params or {})
+
+    def top(self, order_by: str = "total_ms", limit: int = 20) -> Dict[str, Any]:
+        """
+        Returns the `limit` fingerprints with the largest `order_by` value.
+
+        Each entry carries 'id', 'fingerprint', 'calls', 'errors', 'cache_hits',
+        'total_ms', 'mean_ms', 'max_ms', 'rows', 'time_pct' (share of the total
+        time of all tracked fingerprints), 'example' and 'params'.
+        """
+        if order_by not in ORDER_KEYS:
+            raise ValueError(
+                f"Unknown order_by '{order_by}'. Use one of: {', '.join(ORDER_KEYS)}."
+            )
+        with self._lock:
+            entries = [dict(entry) for entry in self._entries.values()]
+            evicted = self.evicted
+        total_ms = sum(entry["total_ms"] for entry in entries)
+        for entry in entries:
+            entry["mean_ms"] = entry["total_ms"] / entry["calls"]
+            entry["time_pct"] = (
+                round(100 * entry["total_ms"] / total_ms, 2) if total_ms else 0.0
+            )
+            for key in ("total_ms", "mean_ms", "max_ms"):
+                entry[key] = round(entry[key], 3)
+        entries.sort(key=lambda entry: entry[order_by], reverse=True)
+        return {
+            "fingerprints": entries[:limit],
+            "tracked": len(entries),
+            "evicted": evicted,
+            "total_ms": round(total_ms, 3),
+        }
+
+    def workload(self) -> List[Dict[str, Any]]:
+        """
+        Returns one replayable item per fingerprint, most total time first, in
+        the workload format of `python -m sql_mcp.advisor` and
+        benchmarks/bench_tools.py: {'query', 'params', 'count'}.
+        """
+        with self._lock:
+            entries = sorted(
+                self._entries.values(), key=lambda e: e["total_ms"], reverse=True
+            )
+            return [
+                {
+                    "query": entry["example"],
+                    "params": dict(entry["params"]),
+                    "count": entry["calls"],
+                }
+                for entry in entries
+                if entry["example"] is not None
+            ]
+
+    def export(self, path: str) -> int:
+        """Writes `workload()` as a JSONL file atomically; returns the item count."""
+        items = self.workload()
+        temp = f"{path}.{os.getpid()}.tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            for item in items:
+                f.write(json.dumps(item, ensure_ascii=False, default=str) + "\n")
+        os.replace(temp, path)
+        return len(items)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.evicted = 0
@@ -14,6 +14,7 @@
 
 import logging
 import os
+import sys
 
 logging.basicConfig(level=logging.INFO)
 
@@ -28,6 +29,13 @@ if os.environ.get("GOOGLE_API_KEY") == "NOT_SET" or not os.environ.get(
 from google.adk.agents import Agent
 from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StdioServerParameters
 
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+# `adk web` runs from src/; sql_mcp lives in the project root.
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from .tracing import callbacks, tracer
+
 
 async def get_tools_async():
     """Gets tools from the MCP Server."""
@@ -40,7 +48,14 @@ async def get_tools_async():
                 "-m",
                 "sql_mcp.server",
             ],  # Command line arguments to pass to the server
-            cwd=os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")),
+            cwd=PROJECT_ROOT,
+            # The server appends its spans to the agent's trace file.
+            # It runs in PROJECT_ROOT, so pass the path resolved against ours.
+            env=(
+                {"SQL_MCP_TRACE_FILE": os.path.abspath(tracer.path)}
+                if tracer.enabled
+                else None
+            ),
         ),
     )
     thinking_tool, exit_stack = await MCPToolset.from_server(
@@ -79,6 +94,7 @@ async def create_agent():
         - Track branches and alternatives
         """,
         tools=tools,
+        **callbacks(),
     )
 
     return agent, exit_stack
@@ -0,0 +1,134 @@
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+ADK callbacks that trace an agent turn into SQL_MCP_TRACE_FILE.
+
+Each turn gets a root span with a child per model call and per tool call.
+Tools whose input schema has a `trace_context` argument (the sql_mcp tools)
+receive the traceparent of their span in it, so the server's tool, phase and
+SQL spans join the same trace. Pass `callbacks()` to the Agent:
+
+    agent = Agent(..., **callbacks())
+"""
+
+from typing import Any, Dict, Optional
+
+from sql_mcp.tracing import Span, tracer_from_env
+
+tracer = tracer_from_env("crm_agent")
+# Open spans by invocation ID, and by invocation ID + function call ID for tools.
+_open_spans: Dict[str, Span] = {}
+
+
+def _accepts_trace_context(tool: Any) -> bool:
+    mcp_tool = getattr(tool, "_mcp_tool", None)
+    schema = (
+        getattr(mcp_tool, "inputSchema", None)
+        or getattr(mcp_tool, "input_schema", None)
+        or {}
+    )
+    return "trace_context" in (schema.get("properties") or {})
+
+
+def _turn(invocation_id: str) -> Optional[Span]:
+    return _open_spans.get(invocation_id)
+
+
+def _start(key: str, name: str, invocation_id: str, **attributes: Any) -> Span:
+    turn = _turn(invocation_id)
+    span = tracer.start_span(
+        name, turn.context if turn is not None else None, **attributes
+    )
+    _open_spans[key] = span
+    return span
+
+
+def _end(key: str, error: Optional[str] = None) -> None:
+    span = _open_spans.pop(key, None)
+    if span is not None:
+        span.end(error)
+
+
+def before_agent(callback_context: Any) -> None:
+    invocation_id = callback_context.invocation_id
+    _open_spans[invocation_id] = tracer.start_span(
+        "agent turn", agent=callback_context.agent_name, invocation_id=invocation_id
+    )
+
+
+def after_agent(callback_context: Any) -> None:
+    invocation_id = callback_context.invocation_id
+    # Tools that raised never reach after_tool; close them with the turn.
+    for key in [k for k in _open_spans if k.startswith(f"{invocation_id}/")]:
+        _end(key, "not finished when the turn ended")
+    _end(invocation_id)
+
+
+def before_model(callback_context: Any, llm_request: Any) -> None:
+    invocation_id = callback_context.invocation_id
+    _start(
+        f"{invocation_id}/model",
+        f"model {getattr(llm_request, 'model', None) or ''}".strip(),
+        invocation_id,
+    )
+
+
+def after_model(callback_context: Any, llm_response: Any) -> None:
+    key = f"{callback_context.invocation_id}/model"
+    span = _open_spans.get(key)
+    usage = getattr(llm_response, "usage_metadata", None)
+    if span is not None and usage is not None:
+        span.set(
+            prompt_tokens=getattr(usage, "prompt_token_count", None),
+            output_tokens=getattr(usage, "candidates_token_count", None),
+        )
+    _end(key, getattr(llm_response, "error_message", None))
+
+
+def before_tool(tool: Any, args: Dict[str, Any], tool_context: Any) -> None:
+    invocation_id = tool_context.invocation_id
+    span = _start(
+        f"{invocation_id}/{tool_context.function_call_id}",
+        f"call {tool.name}",
+        invocation_id,
+        tool=tool.name,
+    )
+    if _accepts_trace_context(tool):
+        args["trace_context"] = span.traceparent
+
+
+def after_tool(
+    tool: Any, args: Dict[str, Any], tool_context: Any, tool_response: Any
+) -> None:
+    if isinstance(tool_response, dict):
+        failed = tool_response.get("isError")
+    else:
+        failed = getattr(tool_response, "isError", False)
+    error = "tool returned an error" if failed else None
+    _end(f"{tool_context.invocation_id}/{tool_context.function_call_id}", error)
+
+
+def callbacks() -> Dict[str, Any]:
+    """Agent keyword arguments that install the tracing callbacks; empty when tracing is off."""
+    if not tracer.enabled:
+        return {}
+    return {
+        "before_agent_callback": before_agent,
+        "after_agent_callback": after_agent,
+        "before_model_callback": before_model,
+        "after_model_callback": after_model,
+        "before_tool_callback": before_tool,
+        "after_tool_callback": after_tool,
+    }
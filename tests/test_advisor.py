@@ -0,0 +1,163 @@
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+import json
+import pathlib
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+project_root = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from sql_mcp.advisor import (
+    QueryLog,
+    analyze_query,
+    estimate_benefits,
+    load_workload,
+    main,
+    recommend_indexes,
+)
+
+
+class TestIndexAdvisor(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = pathlib.Path(self.temp_dir.name)
+        self.db_path = self.temp_path / "erp_demo.db"
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript("""
+            CREATE TABLE Customers (CustomerID TEXT PRIMARY KEY, City TEXT);
+            CREATE TABLE Orders (OrderID TEXT PRIMARY KEY, CustomerID TEXT,
+                OrderDate TEXT);
+            CREATE TABLE OrderLines (LineID INTEGER PRIMARY KEY, OrderID TEXT,
+                ProductID TEXT, Qty INTEGER);
+            """)
+        conn.executemany(
+            "INSERT INTO Customers VALUES (?, ?)",
+            ((f"CU{i:03d}", "台北市") for i in range(100)),
+        )
+        conn.executemany(
+            "INSERT INTO Orders VALUES (?, ?, ?)",
+            (
+                (f"SO{i:05d}", f"CU{i % 100:03d}", f"2025-01-{i % 28 + 1:02d}")
+                for i in range(2000)
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO OrderLines (OrderID, ProductID, Qty) VALUES (?, ?, ?)",
+            ((f"SO{i // 3:05d}", f"P{i % 50:03d}", 1) for i in range(6000)),
+        )
+        conn.commit()
+        self.conn = conn
+
+    def tearDown(self):
+        self.conn.close()
+        self.temp_dir.cleanup()
+
+    def test_join_and_filter_columns_are_recommended(self):
+        analysis = analyze_query(
+            self.conn,
+            "SELECT ol.ProductID FROM OrderLines AS ol "
+            "JOIN Orders o ON o.OrderID = ol.OrderID WHERE o.CustomerID = 'CU001'",
+        )
+        self.assertIn(
+            {
+                "table": "OrderLines",
+                "columns": ["OrderID"],
+                "reason": "full scan of OrderLines",
+            },
+            analysis["candidates"],
+        )
+
+    def test_prefix_recommendations_are_merged(self):
+        report = recommend_indexes(
+            self.conn,
+            [
+                {"query": "SELECT * FROM Orders WHERE CustomerID = :cid", "count": 5},
+                {
+                    "query": "SELECT * FROM Orders WHERE CustomerID = :cid ORDER BY OrderDate",
+                    "params": {"cid": "CU001"},
+                    "count": 2,
+                },
+            ],
+        )
+        [rec] = report["recommendations"]
+        self.assertEqual(rec["columns"], ["CustomerID", "OrderDate"])
+        self.assertEqual((rec["queries"], rec["weight"]), (2, 7))
+        self.assertEqual(
+            rec["sql"],
+            "CREATE INDEX IF NOT EXISTS idx_Orders_CustomerID_OrderDate "
+            "ON Orders (CustomerID, OrderDate)",
+        )
+
+    def test_estimate_benefits_leaves_database_untouched(self):
+        workload = [
+            {"query": "SELECT * FROM OrderLines WHERE OrderID = 'SO00042'", "count": 10}
+        ]
+        report = recommend_indexes(self.conn, workload)
+        summary = estimate_benefits(
+            self.db_path, workload, report["recommendations"], repeat=1
+        )
+        benefit = report["recommendations"][0]["benefit"]
+        self.assertGreater(benefit["workload_ms_before"], 0)
+        self.assertIn("saved_pct", summary)
+        indexes = self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'"
+        ).fetchall()
+        self.assertEqual(indexes, [])
+
+    def test_cli_reads_workload_file(self):
+        workload_file = self.temp_path / "workload.jsonl"
+        workload_file.write_text(
+            json.dumps(
+                {"query": "SELECT * FROM Orders WHERE CustomerID = :c", "count": 3}
+            )
+            + "\n\n",
+            encoding="utf-8",
+        )
+        self.assertEqual(load_workload(workload_file)[0]["count"], 3)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            main(
+                [
+                    "--db",
+                    str(self.db_path),
+                    "--workload",
+                    str(workload_file),
+                    "--repeat",
+                    "1",
+                    "--json",
+                ]
+            )
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["recommendations"][0]["name"], "idx_Orders_CustomerID")
+        self.assertEqual(len(report["summary"]["skipped_queries"]), 1)
+
+    def test_query_log_counts_normalized_statements(self):
+        log = QueryLog(max_entries=2)
+        log.record("SELECT 1")
+        log.record("SELECT   1;")
+        log.record("SELECT 2")
+        log.record("SELECT 3")
+        self.assertEqual([e["query"] for e in log.workload()], ["SELECT 2", "SELECT 3"])
+        log.record("SELECT 2", {"a": 1})
+        self.assertEqual(log.workload()[-1]["count"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
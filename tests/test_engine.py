@@ -0,0 +1,100 @@
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+import os
+import pathlib
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from sqlalchemy.exc import OperationalError
+
+project_root = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from sql_mcp.engine import (
+    create_read_engine,
+    engine_profile_from_env,
+    is_wal_database,
+    sqlite_file_path,
+)
+
+
+class TestReadEngineProfile(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = pathlib.Path(self.temp_dir.name) / "erp_demo.db"
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE Orders (OrderID TEXT PRIMARY KEY)")
+        conn.execute("INSERT INTO Orders VALUES ('SO001')")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_read_only_engine_applies_pragmas_and_rejects_writes(self):
+        engine = create_read_engine(self.db_path, engine_profile_from_env(mode="ro"))
+        try:
+            with engine.connect() as conn:
+                self.assertEqual(conn.exec_driver_sql("PRAGMA query_only").scalar(), 1)
+                self.assertEqual(
+                    conn.exec_driver_sql("PRAGMA mmap_size").scalar(), 256 * 1024 * 1024
+                )
+                self.assertEqual(
+                    conn.exec_driver_sql("SELECT OrderID FROM Orders").scalar(), "SO001"
+                )
+                with self.assertRaises(OperationalError):
+                    conn.exec_driver_sql("DELETE FROM Orders")
+            self.assertEqual(sqlite_file_path(engine), str(self.db_path.resolve()))
+        finally:
+            engine.dispose()
+
+    def test_immutable_falls_back_to_ro_for_wal_databases(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.close()
+        self.assertTrue(is_wal_database(self.db_path))
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            engine = create_read_engine(
+                self.db_path, engine_profile_from_env(mode="immutable")
+            )
+        # stdout is the MCP stdio channel; the notice must not land there.
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertIn("WAL mode", stderr.getvalue())
+        try:
+            self.assertEqual(engine.url.query.get("mode"), "ro")
+            self.assertNotIn("immutable", engine.url.query)
+        finally:
+            engine.dispose()
+
+    def test_env_overrides_defaults(self):
+        with mock.patch.dict(
+            os.environ, {"SQL_MCP_MMAP_SIZE": "0", "SQL_MCP_QUERY_ONLY": "off"}
+        ):
+            profile = engine_profile_from_env()
+        self.assertEqual(profile["mmap_size"], 0)
+        self.assertFalse(profile["query_only"])
+        with self.assertRaises(ValueError):
+            engine_profile_from_env(mode="readwrite")
+
+
+if __name__ == "__main__":
+    unittest.main()
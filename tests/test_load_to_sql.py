@@ -12,12 +12,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import contextlib
+import gzip
+import io
 import json
+import os
 import pathlib
 import sqlite3
 import sys
 import tempfile
 import unittest
+from unittest import mock
 
 import yaml
 
@@ -26,7 +31,22 @@ import yaml
 script_dir = pathlib.Path(__file__).resolve().parent.parent / "scripts"
 sys.path.append(str(script_dir))
 
-from load_to_sql import create_tables_from_yaml, load_jsonl
+import load_to_sql
+from load_to_sql import (
+    MANIFEST_TABLE,
+    apply_fast_pragmas,
+    build_fts_indexes,
+    check_foreign_keys,
+    create_indexes_from_yaml,
+    create_tables_from_yaml,
+    end_fast_load,
+    find_sources,
+    load_incremental,
+    load_jsonl,
+    load_parallel,
+    read_manifest,
+    split_jsonl,
+)
 
 
 class TestLoadToSql(unittest.TestCase):
@@ -97,6 +117,403 @@ class TestLoadToSql(unittest.TestCase):
         # (e.g., "group") to be more robust, if necessary.
         # For now, "order" should suffice to demonstrate the fix.
 
+    def test_fast_load_uses_one_transaction(self):
+        """Test that --fast loading reports stats and commits once at the end."""
+        apply_fast_pragmas(self.conn)
+        create_tables_from_yaml(self.schema_content, self.conn)
+        stats = load_jsonl(
+            "keyword_table", self.data_file, self.conn, fast=True, commit=False
+        )
+        self.assertEqual(stats["rows"], 2)
+        self.assertEqual(stats["bytes"], self.data_file.stat().st_size)
+        self.assertTrue(self.conn.in_transaction)
+        end_fast_load(self.conn)
+        self.assertFalse(self.conn.in_transaction)
+        self.assertEqual(
+            self.conn.execute("PRAGMA journal_mode").fetchone()[0].lower(), "off"
+        )
+        rows = self.conn.execute(
+            'SELECT "order" FROM keyword_table ORDER BY id'
+        ).fetchall()
+        self.assertEqual(rows, [("first_order",), ("second_order",)])
+
+    def test_parallel_load_splits_files_on_line_boundaries(self):
+        """Test that byte-range workers load exactly the rows of a sequential load."""
+        schema = {
+            "tables": {
+                "Orders": {
+                    "columns": {
+                        "OrderID": {"type": "TEXT", "pk": True},
+                        "Note": {"type": "TEXT"},
+                    }
+                },
+                "keyword_table": self.schema_content["tables"]["keyword_table"],
+            }
+        }
+        orders_file = self.temp_path / "orders.jsonl"
+        with open(orders_file, "w", encoding="utf-8") as f:
+            for i in range(200):
+                f.write(
+                    json.dumps(
+                        {"OrderID": f"SO{i:03d}", "Note": "急件" * (i % 7)},
+                        ensure_ascii=False,
+                    )
+                    + "\n"
+                )
+        # Ranges much smaller than a line still cover every line exactly once.
+        self.assertGreater(len(split_jsonl(orders_file, 64)), 100)
+
+        create_tables_from_yaml(schema, self.conn)
+        totals = load_parallel(
+            [("Orders", orders_file), ("keyword_table", self.data_file)],
+            self.conn,
+            workers=2,
+            chunk_bytes=64,
+        )
+        self.assertEqual(totals["rows"], 202)
+        self.assertEqual(
+            totals["bytes"], orders_file.stat().st_size + self.data_file.stat().st_size
+        )
+        self.assertEqual(
+            self.conn.execute("SELECT COUNT(DISTINCT OrderID) FROM Orders").fetchone(),
+            (200,),
+        )
+        self.assertEqual(
+            self.conn.execute(
+                "SELECT Note FROM Orders WHERE OrderID = 'SO013'"
+            ).fetchone(),
+            ("急件" * 6,),
+        )
+        self.assertEqual(
+            self.conn.execute("SELECT COUNT(*) FROM keyword_table").fetchone(), (2,)
+        )
+
+    def test_compressed_and_stdin_sources(self):
+        """Test that .jsonl.gz files and stdin stream into the matching table."""
+        create_tables_from_yaml(self.schema_content, self.conn)
+        gz_file = self.temp_path / "Keyword_Table.jsonl.gz"
+        with gzip.open(gz_file, "wb") as f:
+            f.write(self.data_file.read_bytes())
+        shard = self.temp_path / "keyword_table.01.jsonl"
+        self.assertEqual(
+            find_sources(self.schema_content, [gz_file, shard]),
+            [("keyword_table", gz_file), ("keyword_table", shard)],
+        )
+
+        stats = load_jsonl("keyword_table", gz_file, self.conn)
+        self.assertEqual(stats["rows"], 2)
+        self.assertEqual(stats["bytes"], self.data_file.stat().st_size)
+
+        # Compressed files are not split; one worker reads the whole stream.
+        self.conn.execute("DELETE FROM keyword_table")
+        stats = load_parallel(
+            [("keyword_table", gz_file)], self.conn, workers=2, chunk_bytes=8
+        )
+        self.assertEqual(stats["rows"], 2)
+
+        row = {"id": 3, "order": "third_order", "description": "Item C"}
+        stdin = mock.Mock(buffer=io.BytesIO((json.dumps(row) + "\n").encode()))
+        with mock.patch.object(sys, "stdin", stdin):
+            load_jsonl("keyword_table", pathlib.Path("-"), self.conn)
+        self.assertEqual(
+            [
+                r[0]
+                for r in self.conn.execute("SELECT id FROM keyword_table ORDER BY id")
+            ],
+            [1, 2, 3],
+        )
+
+    def test_table_without_inputs_is_rejected(self):
+        """Test that --table alone errors out instead of replacing the database."""
+        self.conn.execute("CREATE TABLE live (id INTEGER)")
+        self.conn.commit()
+        with mock.patch.object(load_to_sql, "SCHEMA_FILE", str(self.schema_file)):
+            with contextlib.redirect_stderr(io.StringIO()) as errors:
+                with self.assertRaises(SystemExit):
+                    load_to_sql.main(
+                        ["--db", str(self.db_path), "--table", "keyword_table"]
+                    )
+        self.assertIn("--table requires input files", errors.getvalue())
+        self.assertEqual(
+            self.conn.execute("SELECT name FROM sqlite_master").fetchall(), [("live",)]
+        )
+
+    def test_build_fts_indexes_trigram(self):
+        """Test that the Customers FTS5 index supports CJK substring matches."""
+        schema = {
+            "tables": {
+                "Customers": {
+                    "columns": {
+                        "CustomerID": {"type": "TEXT", "pk": True},
+                        "CompanyName": {"type": "TEXT"},
+                        "ContactName": {"type": "TEXT"},
+                    }
+                }
+            }
+        }
+        data_file = self.temp_path / "customers.jsonl"
+        with open(data_file, "w", encoding="utf-8") as f:
+            f.write(
+                json.dumps(
+                    {
+                        "CustomerID": "CU001",
+                        "CompanyName": "台灣中鋼",
+                        "ContactName": "俊凱王",
+                    }
+                )
+                + "\n"
+            )
+            f.write(
+                json.dumps(
+                    {
+                        "CustomerID": "CU002",
+                        "CompanyName": "台灣電力",
+                        "ContactName": "雅婷林",
+                    }
+                )
+                + "\n"
+            )
+        create_tables_from_yaml(schema, self.conn)
+        load_jsonl("Customers", data_file, self.conn)
+        build_fts_indexes(schema, self.conn)
+
+        cur = self.conn.cursor()
+        cur.execute(
+            "SELECT c.CustomerID FROM Customers_fts JOIN Customers c ON c.rowid = Customers_fts.rowid "
+            "WHERE Customers_fts MATCH ?",
+            ('"俊凱王"',),
+        )
+        self.assertEqual(cur.fetchall(), [("CU001",)])
+
+    def test_indexes_and_foreign_keys_from_yaml(self):
+        """Test that declared indexes are deferred and foreign keys are created."""
+        schema = {
+            "tables": {
+                "Customers": {
+                    "columns": {
+                        "CustomerID": {"type": "TEXT", "pk": True},
+                        "UBN": {"type": "TEXT", "unique": True},
+                    }
+                },
+                "Orders": {
+                    "columns": {
+                        "OrderID": {"type": "TEXT", "pk": True},
+                        "CustomerID": {
+                            "type": "TEXT",
+                            "references": "Customers.CustomerID",
+                            "index": True,
+                        },
+                        "OrderDate": {"type": "TEXT"},
+                    },
+                    "indexes": [
+                        {"columns": ["CustomerID", "OrderDate"]},
+                        {
+                            "name": "ux_orders_date",
+                            "columns": "OrderDate",
+                            "unique": True,
+                        },
+                    ],
+                },
+            }
+        }
+        create_tables_from_yaml(schema, self.conn)
+        self.conn.execute("INSERT INTO Customers VALUES ('CU001', '30414175')")
+        self.conn.execute("INSERT INTO Orders VALUES ('SO1', 'CU001', '2025-01-01')")
+        self.conn.execute("INSERT INTO Orders VALUES ('SO2', 'CU404', '2025-01-02')")
+
+        def index_names():
+            return {
+                row[1] for row in self.conn.execute("PRAGMA index_list(Orders)")
+            } - {"sqlite_autoindex_Orders_1"}
+
+        self.assertEqual(index_names(), set())
+        create_indexes_from_yaml(schema, self.conn)
+        self.assertEqual(
+            index_names(),
+            {
+                "idx_Orders_CustomerID",
+                "idx_Orders_CustomerID_OrderDate",
+                "ux_orders_date",
+            },
+        )
+        columns = [
+            row[2]
+            for row in self.conn.execute(
+                "PRAGMA index_info(idx_Orders_CustomerID_OrderDate)"
+            )
+        ]
+        self.assertEqual(columns, ["CustomerID", "OrderDate"])
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            create_indexes_from_yaml(schema, self.conn)  # as on an --incremental run
+        self.assertIn("ux_orders_date exists on Orders(OrderDate)", output.getvalue())
+        self.assertNotIn("created", output.getvalue())
+
+        fk = self.conn.execute("PRAGMA foreign_key_list(Orders)").fetchone()
+        self.assertEqual(
+            (fk[2], fk[3], fk[4]), ("Customers", "CustomerID", "CustomerID")
+        )
+        self.assertEqual(check_foreign_keys(self.conn), 1)
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.conn.execute("INSERT INTO Customers VALUES ('CU002', '30414175')")
+
+    def test_foreign_key_mismatch_is_reported_not_raised(self):
+        """Test that a reference to a non-key column warns instead of aborting the load."""
+        schema = {
+            "tables": {
+                "Customers": {"columns": {"CustomerID": {"type": "TEXT", "pk": True}}},
+                "Orders": {
+                    "columns": {
+                        "OrderID": {"type": "TEXT", "pk": True},
+                        "CustomerID": {"references": "Customers.CustomerID"},
+                    }
+                },
+                "Notes": {
+                    "columns": {
+                        "NoteID": {"type": "INTEGER", "pk": True},
+                        "OrderID": {"references": "Orders.CustomerID"},  # not a key
+                    }
+                },
+            }
+        }
+        create_tables_from_yaml(schema, self.conn)
+        self.conn.execute("INSERT INTO Orders VALUES ('SO1', 'CU404')")
+        self.conn.execute("INSERT INTO Notes VALUES (1, 'SO1')")
+        with self.assertRaises(sqlite3.OperationalError):
+            self.conn.execute("PRAGMA foreign_key_check").fetchall()
+
+        errors = io.StringIO()
+        with contextlib.redirect_stderr(errors):
+            self.assertEqual(
+                check_foreign_keys(self.conn), 1
+            )  # Orders is still checked
+        self.assertIn("Could not check foreign keys of Notes", errors.getvalue())
+        self.assertIn("foreign key mismatch", errors.getvalue())
+
+    def test_incremental_reload_merges_changes(self):
+        """Test that --incremental skips unchanged files and applies edits and deletions."""
+        self.conn.close()
+        data_dir = self.temp_path / "data"
+        data_dir.mkdir()
+        (data_dir / "notes.jsonl").write_text(
+            json.dumps({"id": 1, "body": "unchanged"}) + "\n", encoding="utf-8"
+        )
+        keyword_file = data_dir / "keyword_table.jsonl"
+        keyword_file.write_text(self.data_file.read_text(), encoding="utf-8")
+        schema = dict(self.schema_content)
+        schema["tables"] = dict(
+            schema["tables"],
+            notes={"columns": {"id": {"type": "INTEGER", "pk": True}, "body": {}}},
+        )
+        self.schema_file.write_text(yaml.dump(schema), encoding="utf-8")
+
+        with mock.patch.multiple(
+            load_to_sql,
+            DB_PATH=str(self.db_path),
+            SCHEMA_FILE=str(self.schema_file),
+            DATA_DIR=data_dir,
+        ):
+            load_to_sql.main([])
+            self.conn = sqlite3.connect(self.db_path)
+            manifest = read_manifest(self.conn)
+            self.assertEqual(manifest[str(keyword_file)]["rows"], 2)
+            self.assertEqual(manifest[str(keyword_file)]["table"], "keyword_table")
+            self.assertIn(str(self.schema_file), manifest)
+            self.conn.close()
+
+            # id 1 edited, id 2 deleted, id 3 added
+            rows = [
+                {"id": 1, "order": "first_order", "description": "Item A v2"},
+                {"id": 3, "order": "third_order", "description": "Item C"},
+            ]
+            keyword_file.write_text(
+                "".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8"
+            )
+            load_to_sql.main(["--incremental"])
+        # Both runs built in a temp file and renamed it into place.
+        self.assertEqual(list(self.temp_path.glob(".*.tmp")), [])
+
+        self.conn = sqlite3.connect(self.db_path)
+        self.assertEqual(
+            self.conn.execute(
+                'SELECT id, "order", description FROM keyword_table ORDER BY id'
+            ).fetchall(),
+            [(1, "first_order", "Item A v2"), (3, "third_order", "Item C")],
+        )
+        self.assertEqual(read_manifest(self.conn)[str(keyword_file)]["rows"], 2)
+        files = [("keyword_table", keyword_file), ("notes", data_dir / "notes.jsonl")]
+        self.assertEqual(load_incremental(files, self.conn), [])
+
+        # A table whose only file disappeared is emptied.
+        self.assertEqual(load_incremental(files[:1], self.conn), ["notes"])
+        self.assertEqual(
+            self.conn.execute("SELECT COUNT(*) FROM notes").fetchone(), (0,)
+        )
+        self.assertEqual(
+            self.conn.execute(
+                f'SELECT COUNT(*) FROM "{MANIFEST_TABLE}" WHERE table_name = ?',
+                ("notes",),
+            ).fetchone(),
+            (0,),
+        )
+
+    def test_manifest_skips_hashing_unchanged_files(self):
+        """Test that full loads don't hash, and --incremental hashes only files whose size or mtime moved."""
+        self.conn.close()
+        data_dir = self.temp_path / "data"
+        data_dir.mkdir()
+        keyword_file = data_dir / "keyword_table.jsonl"
+        keyword_file.write_text(self.data_file.read_text(), encoding="utf-8")
+        # A database from before the manifest existed.
+        with sqlite3.connect(self.db_path) as old:
+            create_tables_from_yaml(self.schema_content, old)
+        before = self.db_path.read_bytes()
+
+        with mock.patch.multiple(
+            load_to_sql,
+            DB_PATH=str(self.db_path),
+            SCHEMA_FILE=str(self.schema_file),
+            DATA_DIR=data_dir,
+        ):
+            # The live database is read without being written to.
+            with mock.patch.object(load_to_sql.os, "replace") as replace:
+                load_to_sql.main(["--incremental"])
+            self.assertEqual(self.db_path.read_bytes(), before)
+            pathlib.Path(replace.call_args.args[0]).unlink()
+
+            with mock.patch.object(
+                load_to_sql, "file_digest", wraps=load_to_sql.file_digest
+            ) as digest:
+                load_to_sql.main(["--fast"])
+                self.assertEqual(digest.call_args_list, [mock.call(self.schema_file)])
+                self.conn = sqlite3.connect(self.db_path)
+                entry = read_manifest(self.conn)[str(keyword_file)]
+                self.assertIsNone(entry["sha256"])
+                stat = keyword_file.stat()
+                self.assertEqual(
+                    (entry["size"], entry["mtime_ns"]), (stat.st_size, stat.st_mtime_ns)
+                )
+
+                files = [("keyword_table", keyword_file)]
+                digest.reset_mock()
+                self.assertEqual(load_incremental(files, self.conn), [])
+                digest.assert_not_called()
+
+                # Touched but not edited: hashed once, then the new mtime is kept.
+                os.utime(keyword_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+                self.assertEqual(load_incremental(files, self.conn), ["keyword_table"])
+                self.assertEqual(load_incremental(files, self.conn), [])
+                self.assertEqual(digest.call_count, 1)
+                os.utime(
+                    keyword_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9)
+                )
+                self.assertEqual(load_incremental(files, self.conn), [])
+                self.assertEqual(digest.call_count, 2)
+                self.assertEqual(
+                    read_manifest(self.conn)[str(keyword_file)]["mtime_ns"],
+                    stat.st_mtime_ns + 2 * 10**9,
+                )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,107 @@
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+import json
+import pathlib
+import sys
+import tempfile
+import unittest
+from collections import Counter
+
+script_dir = pathlib.Path(__file__).resolve().parent.parent / "scripts"
+sys.path.append(str(script_dir))
+
+import make_samples
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+class TestMakeSamples(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = pathlib.Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def generate(self, out, *args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            make_samples.main(["--out", str(out), *args])
+        return {path.name: path.read_bytes() for path in sorted(out.glob("*.jsonl"))}
+
+    def test_default_writes_only_handwritten_records(self):
+        files = self.generate(self.temp_path / "data")
+        self.assertEqual(files["orders.jsonl"].count(b"\n"), len(make_samples.orders))
+        self.assertTrue((self.temp_path / "data" / "schema.yaml").exists())
+
+    def test_scale_is_deterministic_and_referentially_consistent(self):
+        out = self.temp_path / "a"
+        first = self.generate(out, "--scale", "0.1", "--seed", "7")
+        self.assertEqual(
+            first, self.generate(self.temp_path / "b", "--scale", "0.1", "--seed", "7")
+        )
+        self.assertNotEqual(
+            first, self.generate(self.temp_path / "c", "--scale", "0.1", "--seed", "8")
+        )
+
+        customers = {c["CustomerID"]: c for c in read_jsonl(out / "customers.jsonl")}
+        contacts = {c["ContactID"] for c in read_jsonl(out / "contacts.jsonl")}
+        products = {p["ProductID"] for p in read_jsonl(out / "products.jsonl")}
+        orders = read_jsonl(out / "orders.jsonl")
+        order_ids = {o["OrderID"] for o in orders}
+        lines = read_jsonl(out / "order_lines.jsonl")
+        self.assertEqual(len(orders), len(order_ids))
+        self.assertEqual(len(lines), len({l["LineID"] for l in lines}))
+        self.assertGreater(len(orders), 1000)
+        for customer in customers.values():
+            self.assertIn(customer["ContactID"], contacts | {None})
+        for order in orders:
+            self.assertEqual(customers[order["CustomerID"]]["Status"], "Active")
+        for line in lines:
+            self.assertIn(line["OrderID"], order_ids)
+            self.assertIn(line["ProductID"], products)
+        for opportunity in read_jsonl(out / "opportunities.jsonl"):
+            self.assertIn(opportunity["CustomerID"], customers)
+
+        # A few VIP customers place a disproportionate share of the orders.
+        per_customer = Counter(order["CustomerID"] for order in orders)
+        vips = [c for c, row in customers.items() if row["VIPFlag"] == "Y"]
+        vip_share = sum(per_customer[c] for c in vips) / len(orders)
+        self.assertGreater(vip_share, 10 * len(vips) / len(customers))
+
+    def test_shards_do_not_depend_on_worker_count(self):
+        args = ("--scale", "0.05", "--shards", "3")
+        serial = self.generate(self.temp_path / "a", *args)
+        pooled = self.generate(self.temp_path / "b", *args, "--workers", "2")
+        self.assertEqual(serial, pooled)
+        self.assertIn("orders.02.jsonl", serial)
+        self.assertNotIn("orders.jsonl", serial)
+        order_ids = [
+            json.loads(line)["OrderID"]
+            for name in ("orders.00.jsonl", "orders.01.jsonl", "orders.02.jsonl")
+            for line in serial[name].splitlines()
+        ]
+        self.assertEqual(len(order_ids), len(set(order_ids)))
+        self.assertEqual(
+            len(order_ids), len(make_samples.orders) + round(10_000 * 0.05)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pathlib
+import sqlite3
+import sys
+import unittest
+
+project_root = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from sql_mcp.pagination import (
+    keyset_columns,
+    keyset_statement,
+    next_keyset,
+    order_by_terms,
+)
+
+
+class TestOrderByTerms(unittest.TestCase):
+    def test_only_the_top_level_order_by_counts(self):
+        self.assertIsNone(order_by_terms("SELECT * FROM Orders"))
+        self.assertIsNone(
+            order_by_terms(
+                "SELECT *, ROW_NUMBER() OVER (ORDER BY OrderID) FROM Orders "
+                "WHERE Note = 'order by x' -- order by y"
+            )
+        )
+        terms = order_by_terms(
+            'SELECT a, "b c" FROM t ORDER BY a DESC NULLS LAST, "b c", '
+            "substr(a, 1, 2) COLLATE NOCASE LIMIT 5;"
+        )
+        self.assertEqual(
+            [(t["expr"], t["desc"], t["nulls"], t["collate"]) for t in terms],
+            [
+                ("a", True, "last", False),
+                ('"b c"', False, None, False),
+                ("substr(a, 1, 2)", False, None, True),
+            ],
+        )
+
+    def test_keyset_columns(self):
+        terms = order_by_terms('SELECT a, b FROM t ORDER BY "A", 2')
+        self.assertEqual(keyset_columns(terms, ["a", "b"]), ["a", "b"])
+        self.assertIsNone(keyset_columns(terms, ["a", "a", "b"]))
+        self.assertIsNone(
+            keyset_columns(order_by_terms("SELECT a FROM t ORDER BY a + 1"), ["a"])
+        )
+
+
+class TestKeysetStatement(unittest.TestCase):
+    def test_resumes_after_ties_and_nulls(self):
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE t (k TEXT, id INTEGER)")
+        data = [("a", 1), ("a", 2), ("a", 3), (None, 4), ("b", 5), (None, 6)]
+        conn.executemany("INSERT INTO t VALUES (?, ?)", data)
+        for query in (
+            "SELECT k, id FROM t ORDER BY k",
+            "SELECT k, id FROM t ORDER BY k DESC",
+            "SELECT k, id FROM t ORDER BY k NULLS LAST, id DESC",
+        ):
+            expected = conn.execute(query).fetchall()
+            terms = order_by_terms(query)
+            names = keyset_columns(terms, ["k", "id"])
+            rows = conn.execute(query + " LIMIT 2").fetchall()
+            keyset = next_keyset(names, ["k", "id"], rows, None)
+            while len(rows) < len(expected):
+                statement, params = keyset_statement(
+                    query, terms, keyset["c"], keyset["v"]
+                )
+                page = conn.execute(
+                    statement, {**params, "_page_limit": 2, "_page_offset": keyset["e"]}
+                ).fetchall()
+                self.assertTrue(page, query)
+                rows += page
+                keyset = next_keyset(names, ["k", "id"], page, keyset)
+            self.assertEqual(sorted(rows, key=repr), sorted(expected, key=repr))
+            self.assertEqual([r[0] for r in rows], [r[0] for r in expected], query)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+import os
+import pathlib
+import pstats
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+project_root = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from sql_mcp.profiling import ToolProfiler, profiler_from_env
+
+
+def squares(n):
+    return sum(i * i for i in range(n))
+
+
+def busy(calls):
+    return [squares(20_000) for _ in range(calls)]
+
+
+class TestToolProfiler(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.out_dir = pathlib.Path(self.temp_dir.name) / "profiles"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def profile(self, mode, **options):
+        profiler = ToolProfiler(frozenset({"busy"}), self.out_dir, mode, **options)
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertEqual(profiler.wrap("busy")(busy)(20), busy(20))
+        return profiler
+
+    def artifacts(self):
+        pstats_files = sorted(self.out_dir.glob("*-busy-*.pstats"))
+        collapsed_files = sorted(self.out_dir.glob("*-busy-*.collapsed"))
+        self.assertEqual(len(pstats_files), 1)
+        self.assertEqual(len(collapsed_files), 1)
+        stats = pstats.Stats(str(pstats_files[0])).stats
+        stacks = {}
+        for line in collapsed_files[0].read_text(encoding="utf-8").splitlines():
+            stack, micros = line.rsplit(" ", 1)
+            stacks[stack] = int(micros)
+        return stats, stacks
+
+    def test_cprofile_writes_pstats_and_collapsed_stacks(self):
+        self.profile("cprofile")
+        stats, stacks = self.artifacts()
+        calls = {key[2]: entry[1] for key, entry in stats.items()}
+        self.assertEqual(calls["squares"], 20)
+        self.assertTrue(any(stack.startswith("busy (") for stack in stacks))
+        self.assertTrue(any("squares (test_profiling.py:" in stack for stack in stacks))
+
+    def test_sampling_attributes_time_to_the_call_stack(self):
+        self.profile("sample", interval_ms=0.5)
+        stats, stacks = self.artifacts()
+        self.assertIn("busy", {key[2] for key in stats})
+        self.assertTrue(all(stack.startswith("busy (") for stack in stacks))
+        self.assertTrue(any("squares" in stack for stack in stacks))
+
+    def test_overlapping_cprofile_calls_fall_back_to_sampling(self):
+        profiler = ToolProfiler(frozenset({"busy"}), self.out_dir, "cprofile")
+        profiled = profiler.wrap("busy")(busy)
+        start = threading.Barrier(3)
+        results, errors = [], []
+
+        def run():
+            start.wait()
+            try:
+                results.append(profiled(20))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run) for _ in range(3)]
+        with contextlib.redirect_stderr(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(results, [busy(20)] * 3)
+        self.assertEqual(len(list(self.out_dir.glob("*-busy-*.pstats"))), 3)
+
+    def test_unselected_tools_and_fast_calls(self):
+        profiler = ToolProfiler(frozenset({"other"}), self.out_dir)
+        self.assertIs(profiler.wrap("busy")(busy), busy)
+        self.profile("cprofile", min_ms=60_000)
+        self.assertFalse(self.out_dir.exists())
+
+    def test_profiling_is_off_without_the_variable(self):
+        with mock.patch.dict(os.environ, {"SQL_MCP_PROFILE": ""}):
+            self.assertIsNone(profiler_from_env())
+        with mock.patch.dict(
+            os.environ, {"SQL_MCP_PROFILE": "all", "SQL_MCP_PROFILE_MODE": "sample"}
+        ):
+            profiler = profiler_from_env()
+            self.assertTrue(profiler.selects("execute_query"))
+            self.assertEqual(profiler.mode, "sample")
+
+
+if __name__ == "__main__":
+    unittest.main()
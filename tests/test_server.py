@@ -0,0 +1,778 @@
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import inspect
+import json
+import os
+import pathlib
+import time
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+import yaml
+from fastmcp import Client
+from sqlalchemy import create_engine
+
+# Add the project root and scripts directory to the Python path
+# to allow importing sql_mcp.server and load_to_sql
+project_root = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.append(str(project_root / "scripts"))
+
+from load_to_sql import build_fts_indexes, create_tables_from_yaml, load_jsonl
+from sql_mcp import server
+from sql_mcp.advisor import QueryLog
+from sql_mcp.cache import ResultCache, normalize_sql
+from sql_mcp.catalog import SchemaCatalog
+from sql_mcp.metrics import ToolMetrics
+from sql_mcp.slowlog import SlowQueryLog, read_entries
+from sql_mcp.tracing import (
+    Tracer,
+    format_traceparent,
+    instrument_sqlalchemy,
+    read_spans,
+    uninstrument_sqlalchemy,
+)
+from sql_mcp.workload import WorkloadStats
+
+SCHEMA = {
+    "tables": {
+        "Customers": {
+            "description": "Customer accounts.",
+            "columns": {
+                "CustomerID": {"type": "TEXT", "pk": True},
+                "CompanyName": {"type": "TEXT"},
+                "ContactName": {"type": "TEXT"},
+                "ContactTitle": {"type": "TEXT"},
+                "Address": {"type": "TEXT"},
+                "City": {"type": "TEXT"},
+                "Region": {"type": "TEXT"},
+                "PostalCode": {"type": "TEXT"},
+                "Country": {"type": "TEXT"},
+                "Phone": {"type": "TEXT"},
+                "Fax": {"type": "TEXT"},
+            },
+        },
+        "Orders": {
+            "description": "Sales orders.",
+            "columns": {
+                "OrderID": {"type": "TEXT", "pk": True},
+                "CustomerID": {"type": "TEXT"},
+                "TotalAmount": {"type": "REAL"},
+            },
+        },
+    }
+}
+
+CUSTOMERS = [
+    {
+        "CustomerID": "CU001",
+        "CompanyName": "台灣中鋼股份有限公司",
+        "ContactName": "俊凱王",
+        "Phone": "07-331-1711",
+        "City": "高雄市",
+    },
+    {
+        "CustomerID": "CU002",
+        "CompanyName": "台灣電力公司",
+        "ContactName": "雅婷林",
+        "Phone": "02-2365-1234",
+        "City": "台北市",
+    },
+    {
+        "CustomerID": "CU003",
+        "CompanyName": "Acme Trading",
+        "ContactName": "Jane Doe",
+        "Phone": "03-500-8800",
+        "City": "桃園市",
+    },
+]
+
+ORDERS = [
+    {"OrderID": f"SO{i:03d}", "CustomerID": f"CU00{i % 3 + 1}", "TotalAmount": i * 10.0}
+    for i in range(1, 26)
+]
+
+
+class ServerTestCase(unittest.TestCase):
+    """Points the server module at a temporary database for each test."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = pathlib.Path(self.temp_dir.name)
+        self.db_path = self.temp_path / "erp_demo.db"
+        self.schema_file = self.temp_path / "schema.yaml"
+        self.schema_file.write_text(yaml.dump(SCHEMA), encoding="utf-8")
+
+        conn = sqlite3.connect(self.db_path)
+        create_tables_from_yaml(SCHEMA, conn)
+        for table, rows in (("Customers", CUSTOMERS), ("Orders", ORDERS)):
+            data_file = self.temp_path / f"{table.lower()}.jsonl"
+            with open(data_file, "w", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            load_jsonl(table, data_file, conn)
+        build_fts_indexes(SCHEMA, conn)
+        conn.close()
+
+        self._saved = (
+            server.engine,
+            server.catalog,
+            server.result_cache,
+            server.query_log,
+            server.metrics,
+            server.slow_log,
+            server.workload_stats,
+            server.tracer,
+        )
+        server.engine = create_engine(f"sqlite:///{self.db_path}")
+        server.catalog = SchemaCatalog(self.schema_file)
+        server.result_cache = ResultCache(1024 * 1024)
+        server.query_log = QueryLog()
+        server.metrics = ToolMetrics()
+        server.slow_log = SlowQueryLog(None)
+        server.workload_stats = WorkloadStats()
+        server.tracer = Tracer(None)
+
+    def call(self, tool, *args, **kwargs):
+        """Runs an async MCP tool to completion."""
+        return asyncio.run(tool(*args, **kwargs))
+
+    def tearDown(self):
+        server.engine.dispose()
+        (
+            server.engine,
+            server.catalog,
+            server.result_cache,
+            server.query_log,
+            server.metrics,
+            server.slow_log,
+            server.workload_stats,
+            server.tracer,
+        ) = self._saved
+        self.temp_dir.cleanup()
+
+
+class TestSchemaCatalog(ServerTestCase):
+    def test_inspect_database_reports_yaml_descriptions(self):
+        tables = {t["table_name"]: t for t in self.call(server.inspect_database)}
+        self.assertEqual(set(tables), {"Customers", "Orders"})
+        self.assertEqual(tables["Orders"]["description"], "Sales orders.")
+        self.assertEqual(tables["Orders"]["schema_name"], "main")
+
+    def test_snapshot_is_reused_until_schema_changes(self):
+        first = server.catalog.get(server.engine)
+        self.assertIs(server.catalog.get(server.engine), first)
+        self.assertEqual(first.resolve("customers"), "Customers")
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE Notes (NoteID TEXT PRIMARY KEY)")
+        conn.commit()
+        conn.close()
+
+        second = server.catalog.get(server.engine)
+        self.assertIsNot(second, first)
+        self.assertEqual(second.resolve("NOTES"), "Notes")
+
+    def test_inspect_database_reports_indexes_and_foreign_keys(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            "CREATE TABLE Notes (NoteID TEXT PRIMARY KEY, "
+            "CustomerID TEXT REFERENCES Customers(CustomerID), Slug TEXT UNIQUE)"
+        )
+        conn.execute("CREATE INDEX idx_Notes_CustomerID ON Notes (CustomerID)")
+        conn.commit()
+        conn.close()
+
+        tables = {t["table_name"]: t for t in self.call(server.inspect_database)}
+        self.assertEqual(
+            tables["Notes"]["indexes"],
+            [
+                {
+                    "name": "idx_Notes_CustomerID",
+                    "columns": ["CustomerID"],
+                    "unique": False,
+                },
+                {"name": None, "columns": ["Slug"], "unique": True},
+            ],
+        )
+        self.assertEqual(
+            tables["Notes"]["foreign_keys"],
+            [
+                {
+                    "columns": ["CustomerID"],
+                    "references_table": "Customers",
+                    "references_columns": ["CustomerID"],
+                }
+            ],
+        )
+        self.assertEqual(tables["Orders"]["indexes"], [])
+
+    def test_customer_tools_use_catalog(self):
+        info = self.call(server.get_customer_info, "CU002")
+        self.assertEqual(info["CompanyName"], "台灣電力公司")
+        results = self.call(server.search_customers, "Acme")
+        self.assertEqual([r["CustomerID"] for r in results], ["CU003"])
+
+
+class TestSearchCustomers(ServerTestCase):
+    def test_fts_index_is_hidden_from_inspect_database(self):
+        table_names = {t["table_name"] for t in self.call(server.inspect_database)}
+        self.assertNotIn("Customers_fts", table_names)
+        self.assertEqual(
+            server.catalog.get(server.engine).fts_index("customers"), "Customers_fts"
+        )
+
+    def test_fts_matches_cjk_substring(self):
+        results = self.call(server.search_customers, "中鋼股份")
+        self.assertEqual([r["CustomerID"] for r in results], ["CU001"])
+        results = self.call(server.search_customers, "2365")
+        self.assertEqual([r["CustomerID"] for r in results], ["CU002"])
+
+    def test_short_terms_and_missing_index_fall_back_to_like(self):
+        # Two characters is below the trigram minimum.
+        results = self.call(server.search_customers, "俊凱")
+        self.assertEqual([r["CustomerID"] for r in results], ["CU001"])
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("DROP TABLE Customers_fts")
+        conn.commit()
+        conn.close()
+        results = self.call(server.search_customers, "台灣")
+        self.assertEqual([r["CustomerID"] for r in results], ["CU001", "CU002"])
+        self.assertIsNone(server.catalog.get(server.engine).fts_index("Customers"))
+
+
+class TestExecuteQueryPagination(ServerTestCase):
+    QUERY = "SELECT OrderID, TotalAmount FROM Orders ORDER BY OrderID"
+
+    def test_pages_resume_from_cursor(self):
+        seen = []
+        page = self.call(server.execute_query, self.QUERY, page_size=10)
+        while True:
+            self.assertLessEqual(page["row_count"], 10)
+            seen.extend(row["OrderID"] for row in page["rows"])
+            if page["next_cursor"] is None:
+                break
+            page = self.call(
+                server.execute_query, self.QUERY, cursor=page["next_cursor"]
+            )
+        self.assertEqual(seen, [o["OrderID"] for o in ORDERS])
+
+    def read_pages(self, query, page_size):
+        rows, cursor = [], None
+        while True:
+            page = self.call(
+                server.execute_query, query, page_size=page_size, cursor=cursor
+            )
+            rows.extend(page["rows"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return rows
+
+    def test_keyset_pages_keep_ties_and_nulls(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany(
+            "INSERT INTO Orders VALUES (?, ?, ?)",
+            [("SO100", None, 5.0), ("SO101", None, 7.0)],
+        )
+        conn.commit()
+        conn.close()
+        for query in (
+            "SELECT CustomerID, OrderID FROM Orders ORDER BY CustomerID",
+            "SELECT CustomerID AS c, TotalAmount FROM Orders ORDER BY c DESC",
+            "SELECT OrderID, CustomerID FROM Orders ORDER BY 2 DESC, OrderID",
+            "SELECT OrderID, TotalAmount * 2 AS t FROM Orders ORDER BY TotalAmount * 2",
+        ):
+            expected = self.call(server.execute_query, query)
+            for page_size in (1, 2, 4):
+                rows = self.read_pages(query, page_size)
+                self.assertEqual(
+                    sorted(rows, key=json.dumps),
+                    sorted(expected, key=json.dumps),
+                    f"{query} / {page_size}",
+                )
+                keys = [list(row.values())[0] for row in rows]
+                self.assertEqual(keys, [list(r.values())[0] for r in expected])
+
+    def test_unordered_pagination_is_rejected(self):
+        result = self.call(
+            server.execute_query,
+            "SELECT OrderID FROM Orders WHERE OrderID IN "
+            "(SELECT OrderID FROM Orders ORDER BY OrderID)",
+            page_size=5,
+        )
+        self.assertIn("ORDER BY", result[0]["error"])
+
+    def test_cursor_is_bound_to_its_query(self):
+        page = self.call(server.execute_query, self.QUERY, page_size=5)
+        result = self.call(
+            server.execute_query, "SELECT * FROM Customers", cursor=page["next_cursor"]
+        )
+        self.assertIn("error", result[0])
+
+    def test_unpaginated_results_respect_row_budget(self):
+        saved = server.MAX_RESULT_ROWS
+        server.MAX_RESULT_ROWS = 20
+        try:
+            results = self.call(server.execute_query, self.QUERY)
+        finally:
+            server.MAX_RESULT_ROWS = saved
+        self.assertEqual(len(results), 21)
+        self.assertIn("warning", results[-1])
+
+
+class TestColumnarFormat(ServerTestCase):
+    def test_execute_query_columnar_matches_records(self):
+        query = "SELECT OrderID, CustomerID, TotalAmount FROM Orders ORDER BY OrderID"
+        records = self.call(server.execute_query, query)
+        columnar = self.call(server.execute_query, query, format="columnar")
+        self.assertEqual(columnar["columns"], ["OrderID", "CustomerID", "TotalAmount"])
+        self.assertEqual(
+            [dict(zip(columnar["columns"], row)) for row in columnar["rows"]], records
+        )
+        self.assertLess(len(json.dumps(columnar)), len(json.dumps(records)))
+
+    def test_columnar_pagination_and_customer_tools(self):
+        page = self.call(
+            server.execute_query,
+            "SELECT OrderID FROM Orders ORDER BY OrderID",
+            page_size=3,
+            format="columnar",
+        )
+        self.assertEqual(page["columns"], ["OrderID"])
+        self.assertEqual(page["rows"], [["SO001"], ["SO002"], ["SO003"]])
+        self.assertIsNotNone(page["next_cursor"])
+
+        info = self.call(server.get_customer_info, "CU001", format="columnar")
+        self.assertEqual(info["rows"][0][info["columns"].index("CustomerID")], "CU001")
+        found = self.call(server.search_customers, "Acme", format="columnar")
+        self.assertEqual(found["rows"][0][0], "CU003")
+
+    def test_unknown_format_is_rejected(self):
+        self.assertIn(
+            "error", self.call(server.execute_query, "SELECT 1", format="xml")[0]
+        )
+        self.assertIn(
+            "error", self.call(server.get_customer_info, "CU001", format="xml")
+        )
+
+
+class TestResultCache(ServerTestCase):
+    QUERY = (
+        "SELECT CustomerID, SUM(TotalAmount) AS Revenue FROM Orders GROUP BY CustomerID"
+    )
+
+    def test_repeated_query_is_served_from_cache(self):
+        first = self.call(server.execute_query, self.QUERY)
+        second = self.call(
+            server.execute_query, "  " + self.QUERY.replace(" FROM", "\n  FROM") + ";"
+        )
+        self.assertEqual(first, second)
+        stats = self.call(server.cache_stats)
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_database_change_invalidates_cache(self):
+        before = self.call(server.execute_query, self.QUERY)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO Orders VALUES ('SO999', 'CU001', 1000.0)")
+        conn.commit()
+        conn.close()
+        after = self.call(server.execute_query, self.QUERY)
+        self.assertNotEqual(before, after)
+        self.assertEqual(self.call(server.cache_stats)["invalidations"], 1)
+
+    def test_size_based_eviction(self):
+        server.result_cache = ResultCache(4096, max_entry_fraction=1.0)
+        for i in range(1, 26):
+            self.call(
+                server.execute_query,
+                f"SELECT * FROM Orders WHERE OrderID = 'SO{i:03d}'",
+            )
+        stats = self.call(server.cache_stats)
+        self.assertGreater(stats["evictions"], 0)
+        self.assertLessEqual(stats["bytes"], 4096)
+
+    def test_normalize_sql_keeps_literals_and_case(self):
+        self.assertEqual(
+            normalize_sql("SELECT  a,\n b FROM t WHERE c = 'x  y' ;"),
+            "SELECT a, b FROM t WHERE c = 'x  y'",
+        )
+
+
+class TestHotReload(ServerTestCase):
+    QUERY = "SELECT COUNT(*) AS n FROM Customers"
+
+    def test_replaced_database_file_is_reopened(self):
+        self.assertEqual(
+            self.call(server.execute_query, self.QUERY), [{"n": len(CUSTOMERS)}]
+        )
+        old_engine = server.engine
+        reloads = server.database_reloads
+
+        next_db = self.temp_path / "next.db"
+        conn = sqlite3.connect(next_db)
+        create_tables_from_yaml(SCHEMA, conn)
+        conn.execute("INSERT INTO Customers (CustomerID) VALUES ('CU900')")
+        conn.commit()
+        conn.close()
+        os.replace(next_db, self.db_path)
+
+        self.assertEqual(self.call(server.execute_query, self.QUERY), [{"n": 1}])
+        self.assertIsNot(server.engine, old_engine)
+        self.assertEqual(self.call(server.cache_stats)["database_reloads"], reloads + 1)
+        # The catalog was rebuilt from the new file, which has no FTS index.
+        self.assertIsNone(server.catalog.get(server.engine).fts_index("Customers"))
+
+
+class TestAsyncTools(ServerTestCase):
+    def test_slow_query_does_not_block_other_tools(self):
+        slow_query = (
+            "SELECT COUNT(*) AS n FROM Orders a, Orders b, Orders c, Orders d, Orders e"
+        )
+        finished = {}
+
+        async def timed(name, tool, *args):
+            result = await tool(*args)
+            finished[name] = time.perf_counter()
+            return result
+
+        async def run():
+            return await asyncio.gather(
+                timed("slow", server.execute_query, slow_query),
+                timed("inspect", server.inspect_database),
+                timed("lookup", server.get_customer_info, "CU001"),
+            )
+
+        slow, tables, info = asyncio.run(run())
+        self.assertEqual(slow, [{"n": len(ORDERS) ** 5}])
+        self.assertEqual(info["CustomerID"], "CU001")
+        self.assertLess(finished["inspect"], finished["slow"])
+        self.assertLess(finished["lookup"], finished["slow"])
+
+
+class TestQueryDeadlines(ServerTestCase):
+    CROSS_JOIN = "SELECT COUNT(*) FROM Orders a, Orders b, Orders c, Orders d, Orders e"
+
+    def test_runaway_query_is_interrupted_at_deadline(self):
+        result = self.call(server.execute_query, self.CROSS_JOIN, timeout_ms=50)
+        self.assertTrue(result[0]["timed_out"])
+        self.assertEqual(result[0]["reason"], "deadline")
+        self.assertIn("timed out after", result[0]["error"])
+        # The pooled connection is still usable afterwards.
+        self.assertEqual(
+            self.call(server.execute_query, "SELECT COUNT(*) AS n FROM Orders"),
+            [{"n": len(ORDERS)}],
+        )
+
+    def test_non_positive_timeout_is_rejected(self):
+        for timeout_ms in (0, -5):
+            result = self.call(
+                server.execute_query,
+                "SELECT COUNT(*) FROM Orders",
+                timeout_ms=timeout_ms,
+            )
+            self.assertEqual(len(result), 1)
+            self.assertIn("timeout_ms must be a positive", result[0]["error"])
+            self.assertNotIn("timed_out", result[0])
+
+    def test_vm_budget_interrupts_with_partial_rows(self):
+        saved = server.MAX_VM_STEPS
+        server.MAX_VM_STEPS = 50_000
+        try:
+            # Sparse matches: rows trickle out while the join runs.
+            result = self.call(
+                server.execute_query,
+                "SELECT a.OrderID FROM Orders a, Orders b, Orders c, Orders d "
+                "WHERE (a.TotalAmount + b.TotalAmount + c.TotalAmount + d.TotalAmount) % 100 = 0",
+                include_partial=True,
+            )
+        finally:
+            server.MAX_VM_STEPS = saved
+        error = result[0]
+        self.assertEqual(error["reason"], "vm_budget")
+        self.assertGreater(error["rows_produced"], 0)
+        self.assertEqual(len(error["partial_rows"]), error["rows_produced"])
+
+
+class TestParameterizedQueries(ServerTestCase):
+    QUERY = "SELECT OrderID FROM Orders WHERE CustomerID = :cid ORDER BY OrderID"
+
+    def test_params_are_bound_and_shapes_reuse_compiled_statement(self):
+        server._compiled_statement.cache_clear()
+        first = self.call(server.execute_query, self.QUERY, params={"cid": "CU001"})
+        second = self.call(server.execute_query, self.QUERY, params={"cid": "CU002"})
+        self.assertEqual(
+            [r["OrderID"] for r in first],
+            [o["OrderID"] for o in ORDERS if o["CustomerID"] == "CU001"],
+        )
+        self.assertNotEqual(first, second)
+        stats = self.call(server.cache_stats)
+        self.assertEqual(stats["statement_cache"]["misses"], 1)
+        self.assertEqual(stats["statement_cache"]["hits"], 1)
+        # Different parameter values are different result-cache entries.
+        self.assertEqual(stats["hits"], 0)
+
+    def test_params_work_with_pagination(self):
+        page = self.call(
+            server.execute_query, self.QUERY, page_size=2, params={"cid": "CU003"}
+        )
+        self.assertEqual(page["row_count"], 2)
+        self.assertIsNotNone(page["next_cursor"])
+
+    def test_cursor_is_bound_to_its_params(self):
+        page = self.call(
+            server.execute_query, self.QUERY, page_size=2, params={"cid": "CU003"}
+        )
+        result = self.call(
+            server.execute_query,
+            self.QUERY,
+            params={"cid": "CU001"},
+            cursor=page["next_cursor"],
+        )
+        self.assertIn("error", result[0])
+        following = self.call(
+            server.execute_query,
+            self.QUERY,
+            params={"cid": "CU003"},
+            cursor=page["next_cursor"],
+        )
+        self.assertNotIn("error", following)
+
+    def test_invalid_params_are_rejected(self):
+        for params in ({"_page_limit": 1}, {"cid": ["CU001"]}, {"1x": 1}):
+            result = self.call(server.execute_query, self.QUERY, params=params)
+            self.assertIn("error", result[0])
+
+
+class TestRecommendIndexes(ServerTestCase):
+    QUERY = "SELECT OrderID FROM Orders WHERE CustomerID = :cid ORDER BY TotalAmount"
+
+    def test_recorded_queries_get_index_recommendations(self):
+        for cid in ("CU001", "CU002", "CU001"):
+            self.call(server.execute_query, self.QUERY, params={"cid": cid})
+        report = self.call(server.recommend_indexes)
+        [analysis] = report["queries"]
+        self.assertEqual(analysis["count"], 3)
+        self.assertIn("full_scan", [issue["type"] for issue in analysis["issues"]])
+        [rec] = report["recommendations"]
+        self.assertEqual(rec["columns"], ["CustomerID", "TotalAmount"])
+        self.assertEqual(rec["weight"], 3)
+
+        # Once the index exists the advisor stops suggesting it.
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(rec["sql"])
+        conn.close()
+        report = self.call(server.recommend_indexes, [self.QUERY])
+        self.assertEqual(report["recommendations"], [])
+        self.assertEqual(report["queries"][0]["issues"], [])
+
+    def test_supplied_queries_are_checked(self):
+        report = self.call(server.recommend_indexes, ["DELETE FROM Orders"])
+        self.assertIn("error", report)
+        self.assertIn("error", self.call(server.recommend_indexes))
+
+
+class TestSlowQueryLog(ServerTestCase):
+    def test_slow_statement_is_logged_with_its_plan(self):
+        log_path = self.temp_path / "slow.jsonl"
+        server.slow_log = SlowQueryLog(str(log_path), threshold_ms=0)
+        query = (
+            "SELECT * FROM Orders o WHERE o.TotalAmount > :min ORDER BY o.TotalAmount"
+        )
+        self.call(server.execute_query, query, params={"min": 0})
+        self.call(server.execute_query, query, params={"min": 0})  # cache hit
+        self.call(server.execute_query, "SELECT * FROM Missing")
+
+        first, failed = list(read_entries(log_path))
+        self.assertEqual(first["query"], query)
+        self.assertEqual((first["params"], first["rows"]), ({"min": 0}, len(ORDERS)))
+        self.assertIn("SCAN o", first["plan"])
+        self.assertIn(
+            {"type": "full_scan", "table": "Orders", "detail": "SCAN o"},
+            first["issues"],
+        )
+        self.assertIn("no such table", failed["error"])
+        self.assertIsNone(failed["plan"])
+
+    def test_fast_statements_are_not_logged(self):
+        log_path = self.temp_path / "slow.jsonl"
+        server.slow_log = SlowQueryLog(str(log_path), threshold_ms=60_000)
+        self.call(server.execute_query, "SELECT * FROM Orders")
+        self.assertFalse(log_path.exists())
+
+
+class TestQueryWorkload(ServerTestCase):
+    def test_statements_are_aggregated_by_fingerprint(self):
+        for customer_id in ("CU001", "CU002", "CU001"):
+            self.call(
+                server.execute_query,
+                f"SELECT * FROM Orders WHERE CustomerID = '{customer_id}'",
+            )
+        self.call(
+            server.execute_query, "SELECT * FROM Orders ORDER BY OrderID", page_size=5
+        )
+        self.call(server.execute_query, "SELECT * FROM Missing")
+        self.call(server.execute_query, "DELETE FROM Orders")  # rejected, not recorded
+
+        report = self.call(server.query_workload, order_by="calls")
+        self.assertEqual(report["tracked"], 3)
+        top = report["fingerprints"][0]
+        self.assertEqual(
+            top["fingerprint"], "select * from orders where customerid = ?"
+        )
+        self.assertEqual((top["calls"], top["cache_hits"]), (3, 1))
+        paged = next(
+            e
+            for e in report["fingerprints"]
+            if e["fingerprint"] == "select * from orders order by orderid"
+        )
+        self.assertEqual(paged["rows"], 5)
+        missing = next(e for e in report["fingerprints"] if e["errors"])
+        self.assertIsNone(missing["example"])
+
+        workload = self.call(server.query_workload, as_workload=True)["workload"]
+        self.assertEqual(len(workload), 2)
+        self.assertIn("error", self.call(server.query_workload, order_by="bogus"))
+
+
+class TestServerStats(ServerTestCase):
+    def test_tool_calls_are_measured_by_phase(self):
+        self.call(server.execute_query, "SELECT * FROM Orders")
+        self.call(server.execute_query, "SELECT * FROM Orders")  # result cache hit
+        self.call(server.get_customer_info, "CU999")
+        self.call(server.search_customers, "俊凱")
+
+        stats = self.call(server.server_stats)
+        self.assertEqual(stats["in_flight"], 0)
+        query = stats["tools"]["execute_query"]
+        self.assertEqual((query["calls"], query["errors"]), (2, 0))
+        self.assertEqual(query["rows"], 2 * len(ORDERS))
+        self.assertEqual(query["bytes"], 0)  # measured by the MCP layer only
+        self.assertEqual(query["phases"]["execute"]["count"], 1)
+        self.assertEqual(query["phases"]["serialize"]["count"], 2)
+        self.assertEqual(
+            list(query["phases"]),
+            ["validate", "connect", "execute", "fetch", "serialize"],
+        )
+        self.assertEqual(stats["tools"]["get_customer_info"]["error_rate"], 1.0)
+        self.assertIn("catalog", stats["tools"]["search_customers"]["phases"])
+        self.assertNotIn("server_stats", stats["tools"])
+
+    def test_response_bytes_come_from_the_encoded_response(self):
+        async def run():
+            async with Client(server.mcp) as client:
+                return await client.call_tool(
+                    "search_customers", {"search_term": "俊凱"}
+                )
+
+        result = asyncio.run(run())
+        size = sum(len(block.text.encode("utf-8")) for block in result.content)
+        stats = self.call(server.server_stats)["tools"]["search_customers"]
+        self.assertEqual((stats["calls"], stats["bytes"]), (1, size))
+        self.assertEqual(stats["max_bytes"], size)
+        self.assertGreater(size, 0)
+
+    def test_server_stats_is_not_measured(self):
+        async def run():
+            async with Client(server.mcp) as client:
+                await client.call_tool("server_stats", {})
+                return await client.call_tool("server_stats", {})
+
+        tools = asyncio.run(run()).structured_content["tools"]
+        self.assertNotIn("server_stats", tools)
+        self.assertNotIn("server_stats", server.metrics.snapshot()["tools"])
+
+    def test_prometheus_textfile(self):
+        textfile = self.temp_path / "sql_mcp.prom"
+        server.metrics = ToolMetrics(textfile=str(textfile), interval=0)
+        self.call(server.inspect_database)
+
+        text = textfile.read_text(encoding="utf-8")
+        self.assertIn('sql_mcp_tool_calls_total{tool="inspect_database"} 1', text)
+        self.assertIn(
+            'sql_mcp_tool_duration_seconds_bucket{tool="inspect_database",le="+Inf"} 1',
+            text,
+        )
+        self.assertIn('phase="catalog"', text)
+
+    def test_disabled_metrics_record_nothing(self):
+        server.metrics = ToolMetrics(enabled=False)
+        self.assertEqual(
+            self.call(server.get_customer_info, "CU001")["CustomerID"], "CU001"
+        )
+        self.assertEqual(self.call(server.server_stats)["tools"], {})
+
+
+class TestTracing(ServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.trace_file = self.temp_path / "traces.jsonl"
+        server.tracer = Tracer(str(self.trace_file))
+        instrument_sqlalchemy()
+
+    def tearDown(self):
+        uninstrument_sqlalchemy()
+        server.tracer.close()
+        super().tearDown()
+
+    def test_tool_phase_and_sql_spans_join_the_callers_trace(self):
+        caller = ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7")
+        self.call(
+            server.execute_query,
+            "SELECT * FROM Orders WHERE CustomerID = :id",
+            params={"id": "CU001"},
+            trace_context=format_traceparent(caller),
+        )
+        self.call(server.execute_query, "SELECT missing FROM Orders")
+
+        spans = list(read_spans(self.trace_file))
+        by_name = {}
+        for span in spans:
+            by_name.setdefault(span["name"], []).append(span)
+        traced, untraced = by_name["execute_query"]
+        self.assertEqual((traced["trace_id"], traced["parent_id"]), caller)
+        self.assertEqual(traced["status"], "ok")
+        self.assertIsNone(untraced["parent_id"])
+        self.assertEqual(untraced["status"], "error")
+
+        phases = [s for s in spans if s["parent_id"] == traced["span_id"]]
+        self.assertEqual(
+            [s["name"] for s in phases],
+            ["validate", "connect", "execute", "fetch", "serialize"],
+        )
+        execute = phases[2]
+        sql = [s for s in by_name["sql"] if s["parent_id"] == execute["span_id"]]
+        self.assertEqual(len(sql), 1)
+        self.assertEqual(sql[0]["trace_id"], caller[0])
+        self.assertIn("WHERE CustomerID = ?", sql[0]["attributes"]["db.statement"])
+
+    def test_tools_accept_trace_context_when_tracing_is_off(self):
+        server.tracer = Tracer(None)
+        result = self.call(
+            server.get_customer_info, "CU001", trace_context="not a traceparent"
+        )
+        self.assertEqual(result["CustomerID"], "CU001")
+        self.assertFalse(self.trace_file.exists())
+        # Not advertised to the model unless the server was started with tracing.
+        self.assertNotIn(
+            "trace_context", inspect.signature(server.execute_query).parameters
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
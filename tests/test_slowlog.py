@@ -0,0 +1,103 @@
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+import json
+import pathlib
+import sys
+import tempfile
+import unittest
+
+project_root = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from sql_mcp.slowlog import SlowQueryLog, log_files, main, read_entries
+
+SCAN_PLAN = ["SCAN o", "USE TEMP B-TREE FOR ORDER BY"]
+SCAN_ISSUES = [
+    {"type": "full_scan", "table": "Orders", "detail": "SCAN o"},
+    {"type": "temp_btree", "purpose": "ORDER BY", "detail": SCAN_PLAN[1]},
+]
+SEARCH_PLAN = ["SEARCH Orders USING INDEX idx_Orders_CustomerID (CustomerID=?)"]
+
+
+class TestSlowQueryLog(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_path = pathlib.Path(self.temp_dir.name) / "slow.jsonl"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_rotation_keeps_every_entry_up_to_the_backup_count(self):
+        log = SlowQueryLog(str(self.log_path), max_bytes=400, backups=2)
+        for i in range(6):
+            log.record(
+                f"SELECT * FROM Orders WHERE OrderID = 'SO{i:03d}'", {}, 600, 1, []
+            )
+        files = log_files(self.log_path)
+        self.assertEqual(
+            [f.name for f in files], ["slow.jsonl.2", "slow.jsonl.1", "slow.jsonl"]
+        )
+        for f in files:
+            self.assertLessEqual(f.stat().st_size, 400)
+        queries = [entry["query"] for entry in read_entries(self.log_path)]
+        # Oldest first; entries rotated past the last backup are dropped.
+        self.assertEqual(queries, sorted(queries))
+        self.assertTrue(queries[-1].endswith("'SO005'"))
+
+    def test_cli_summarizes_full_scans_and_writes_a_workload(self):
+        log = SlowQueryLog(str(self.log_path))
+        scan = "SELECT * FROM Orders o ORDER BY o.TotalAmount"
+        log.record(scan, {}, 900, 5000, SCAN_PLAN, SCAN_ISSUES)
+        log.record(scan + " ;", {}, 1100, 5000, SCAN_PLAN, SCAN_ISSUES[:1])
+        log.record(
+            "SELECT * FROM Orders WHERE CustomerID = :c",
+            {"c": "CU001"},
+            510,
+            3,
+            SEARCH_PLAN,
+        )
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write('{"query": "SELECT truncat')
+
+        workload = pathlib.Path(self.temp_dir.name) / "workload.jsonl"
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            main([str(self.log_path), "--json", "--workload", str(workload)])
+        summary = json.loads(out.getvalue())
+
+        self.assertEqual(summary["entries"], 3)
+        top = summary["queries"][0]
+        self.assertEqual((top["query"], top["count"], top["max_ms"]), (scan, 2, 1100))
+        self.assertEqual(top["issues"], ["full scan Orders", "temp b-tree order by"])
+        self.assertEqual(summary["queries"][1]["issues"], [])
+        self.assertEqual(summary["full_scans"]["Orders"]["count"], 2)
+        items = [
+            json.loads(line)
+            for line in workload.read_text(encoding="utf-8").splitlines()
+        ]
+        self.assertEqual(
+            items[1],
+            {
+                "query": "SELECT * FROM Orders WHERE CustomerID = :c",
+                "params": {"c": "CU001"},
+                "count": 1,
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+import json
+import pathlib
+import sys
+import tempfile
+import unittest
+
+project_root = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from sql_mcp.tracing import (
+    Tracer,
+    critical_path,
+    group_traces,
+    main,
+    parse_traceparent,
+    read_spans,
+    to_chrome_trace,
+)
+
+
+def span(span_id, parent_id, start, duration, name=None):
+    return {
+        "trace_id": "t" * 32,
+        "span_id": span_id,
+        "parent_id": parent_id,
+        "name": name or span_id,
+        "service": "sql_mcp",
+        "start_us": start,
+        "duration_us": duration,
+        "pid": 1,
+        "thread": "MainThread",
+        "status": "ok",
+        "attributes": {},
+    }
+
+
+class TestTraceparent(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(
+            parse_traceparent(
+                "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+            ),
+            ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"),
+        )
+        for invalid in (
+            None,
+            "",
+            "not a traceparent",
+            "00-00000000000000000000000000000000-00f067aa0ba902b7-01",
+            "ff-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01",
+            "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7",
+        ):
+            self.assertIsNone(parse_traceparent(invalid), invalid)
+
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.temp_dir.name) / "traces.jsonl"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_nested_spans_share_a_trace(self):
+        tracer = Tracer(str(self.path), "crm_agent")
+        with tracer.span("turn") as turn:
+            with tracer.span("tool", tool="execute_query"):
+                pass
+            with self.assertRaises(ValueError):
+                with tracer.span("failing"):
+                    raise ValueError("boom")
+        remote = parse_traceparent(turn.traceparent)
+        with Tracer(str(self.path)).span("execute_query", remote):
+            pass
+        tracer.close()
+
+        spans = {s["name"]: s for s in read_spans(self.path)}
+        self.assertEqual(len(spans), 4)
+        self.assertEqual(len({s["trace_id"] for s in spans.values()}), 1)
+        self.assertIsNone(spans["turn"]["parent_id"])
+        for name in ("tool", "failing", "execute_query"):
+            self.assertEqual(spans[name]["parent_id"], spans["turn"]["span_id"])
+        self.assertEqual(spans["tool"]["attributes"], {"tool": "execute_query"})
+        self.assertEqual(spans["failing"]["status"], "error")
+        self.assertEqual(spans["failing"]["error"], "ValueError: boom")
+        self.assertEqual(spans["execute_query"]["service"], "sql_mcp")
+
+    def test_disabled_tracer_writes_nothing(self):
+        tracer = Tracer(None)
+        with tracer.span("turn") as turn:
+            self.assertIsNone(turn)
+        self.assertIsNone(tracer.start_span("tool"))
+        self.assertFalse(self.path.exists())
+
+
+class TestTraceAnalysis(unittest.TestCase):
+    def test_critical_path_follows_what_the_root_waited_for(self):
+        trace = [
+            span("turn", None, 0, 100),
+            span("model", "turn", 0, 30),
+            span("fast", "turn", 30, 10),  # ran alongside 'slow'
+            span("slow", "turn", 30, 50),
+            span("sql", "slow", 35, 40),
+            span("answer", "turn", 80, 20),
+        ]
+        path = [(depth, s["name"]) for depth, s in critical_path(trace)]
+        self.assertEqual(
+            path,
+            [(0, "turn"), (1, "model"), (1, "slow"), (2, "sql"), (1, "answer")],
+        )
+
+    def test_chrome_trace_and_cli(self):
+        trace = [span("turn", None, 0, 100), span("sql", "turn", 10, 40)]
+        events = to_chrome_trace(trace)["traceEvents"]
+        complete = [e for e in events if e["ph"] == "X"]
+        self.assertEqual(
+            [(e["name"], e["ts"], e["dur"]) for e in complete],
+            [("turn", 0, 100), ("sql", 10, 40)],
+        )
+        self.assertEqual(complete[1]["args"]["parent_id"], "turn")
+        self.assertIn("process_name", {e["name"] for e in events if e["ph"] == "M"})
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = pathlib.Path(temp_dir) / "traces.jsonl"
+            chrome = pathlib.Path(temp_dir) / "trace.json"
+            with open(path, "w", encoding="utf-8") as f:
+                for item in trace:
+                    f.write(json.dumps(item) + "\n")
+                f.write('{"trace_id": "cut sho')
+            self.assertEqual(len(group_traces(read_spans(path))), 1)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                self.assertEqual(main([str(path), "--chrome", str(chrome)]), 0)
+            self.assertEqual(
+                len(json.loads(chrome.read_text(encoding="utf-8"))["traceEvents"]), 4
+            )
+        self.assertIn("turn 0.1 ms, 2 spans", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+# Copyright 2024 Jheng-Hong Yang
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pathlib
+import sys
+import tempfile
+import unittest
+
+project_root = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from sql_mcp.advisor import load_workload
+from sql_mcp.workload import WorkloadStats, fingerprint
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_literals_whitespace_and_case_are_normalized(self):
+        shape = "select * from orders where customerid = ? and totalamount > ?"
+        for query in (
+            "SELECT * FROM Orders WHERE CustomerID = 'CU001' AND TotalAmount > 100",
+            "select *\n  from orders where customerid='it''s' and totalamount>-2.5e3;",
+        ):
+            self.assertEqual(fingerprint(query), shape)
+
+    def test_in_lists_identifiers_and_bind_names(self):
+        self.assertEqual(
+            fingerprint(
+                'SELECT "Order ID", x2 FROM [T 1] WHERE id IN ( 1, 2,3 ) AND c = :cid'
+            ),
+            'select "order id", x2 from [t 1] where id in (?+) and c = :cid',
+        )
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE b = X'ff' LIMIT 10"),
+            "select * from t where b = ? limit ?",
+        )
+
+
+class TestWorkloadStats(unittest.TestCase):
+    def test_aggregates_and_replayable_export(self):
+        stats = WorkloadStats()
+        stats.record("SELECT * FROM Orders WHERE OrderID = 'SO001'", None, 4.0, 1)
+        stats.record(
+            "SELECT * FROM Orders WHERE OrderID = 'SO002'", None, 2.0, 1, cached=True
+        )
+        stats.record(
+            "SELECT * FROM Orders WHERE OrderID = 'bad", None, 1.0, 0, error=True
+        )
+        stats.record(
+            "SELECT COUNT(*) FROM Orders WHERE CustomerID = :c", {"c": "CU001"}, 3.0, 1
+        )
+
+        report = stats.top()
+        self.assertEqual((report["tracked"], report["total_ms"]), (3, 10.0))
+        top = report["fingerprints"][0]
+        self.assertEqual(top["fingerprint"], "select * from orders where orderid = ?")
+        self.assertEqual((top["calls"], top["cache_hits"], top["rows"]), (2, 1, 2))
+        self.assertEqual(
+            (top["mean_ms"], top["max_ms"], top["time_pct"]), (3.0, 4.0, 60.0)
+        )
+        self.assertEqual(stats.top("errors", limit=1)["fingerprints"][0]["errors"], 1)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = pathlib.Path(temp_dir) / "workload.jsonl"
+            self.assertEqual(stats.export(str(path)), 2)
+            items = load_workload(path)
+        self.assertEqual(
+            items[0],
+            {
+                "query": "SELECT * FROM Orders WHERE OrderID = 'SO002'",
+                "params": {},
+                "count": 2,
+            },
+        )
+        self.assertEqual(items[1]["params"], {"c": "CU001"})
+
+    def test_least_total_time_is_evicted(self):
+        stats = WorkloadStats(max_entries=2)
+        stats.record("SELECT 1 FROM a", None, 5.0, 1)
+        stats.record("SELECT 1 FROM b", None, 1.0, 1)
+        stats.record("SELECT 1 FROM c", None, 3.0, 1)
+        report = stats.top()
+        self.assertEqual(
+            [e["fingerprint"] for e in report["fingerprints"]],
+            ["select ? from a", "select ? from c"],
+        )
+        self.assertEqual(report["evicted"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()